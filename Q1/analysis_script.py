@@ -16,6 +16,7 @@
 # 3. [Part B: Similarity Computation](#part-b)
 # 4. [Part C: Visualization & Analysis](#part-c)
 # 5. [Conclusions](#conclusions)
+# 6. [Command-Line Driver](#cli)
 
 # ## 1. Setup & Installation <a name="setup"></a>
 # 
@@ -31,27 +32,47 @@
 # In[ ]:
 
 
-# Import libraries
+# Import libraries (heavy ones are imported by the functions that use them,
+# so a run only loads what its stages need)
+from __future__ import annotations
+
 import os
 import re
 import json
+import time
+import pickle
+import sqlite3
+import zlib
+import base64
+import hashlib
 import difflib
+import argparse
 import warnings
+import multiprocessing
+import cProfile
+import pstats
+import tracemalloc
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Tuple
+from collections import Counter
+from contextlib import contextmanager
+from functools import partial
+from array import array
+from typing import List, Dict, Tuple, Optional, Callable, Any, BinaryIO, Iterator, TYPE_CHECKING
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import Levenshtein
-import esprima
+
+# The comment stripper's possessive regex repeats (++, *+) need Python 3.11
+if sys.version_info < (3, 11):
+    raise RuntimeError("analysis_script.py requires Python 3.11 or newer")
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from sklearn.feature_extraction.text import TfidfVectorizer
 
 warnings.filterwarnings('ignore')
-plt.style.use('seaborn-v0_8-darkgrid')
 
-print("✓ All libraries imported successfully")
+print("✓ Core libraries imported (heavy libraries load with the stages that use them)")
 
 
 # ## 2. Part A: Preprocessing & Data Understanding <a name="part-a"></a>
@@ -65,21 +86,314 @@ print("✓ All libraries imported successfully")
 PROJECTS_DIR = "projects"  # Directory containing all 27 projects
 RESULTS_DIR = "results"
 VALID_EXTENSIONS = ('.js', '.jsx', '.json', '.css')
+# Gitignore-style path rules: last match wins, '!' re-includes, trailing '/' = directories only
+PATH_EXCLUDE_RULES = [
+    'node_modules/', '.*/', 'build/', 'dist/', 'coverage/', 'out/', 'vendor/',
+    'package-lock.json', 'npm-shrinkwrap.json', 'yarn.lock', 'pnpm-lock.yaml',
+    '*.min.js', '*.min.css', '*.bundle.js', '*.chunk.js', '*.chunk.css',
+]
+MAX_FILE_BYTES = 1024 * 1024  # Larger source files are skipped unread (None disables the cap)
+PROJECT_PATH_RULES = {}  # Per-team overrides, e.g. {'Team_05': {'rules': ['!dist/'], 'max_file_bytes': None}}
+ANALYSIS_WORKERS = os.cpu_count() or 1  # Processes used to analyze projects (1 = serial)
+PREPROCESS_CACHE_PATH = os.path.join(RESULTS_DIR, 'preprocess_cache.sqlite')  # None disables caching
+PREPROCESS_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Least recently used entries are evicted above this
+SPILL_PREPROCESSED = False  # Keep preprocessed code in per-project files instead of in memory (see README)
+SPILL_DIR = os.path.join(RESULTS_DIR, 'preprocessed')  # Where spilled per-project code is written
+PREPROCESS_VERSION = 6  # Bump whenever preprocessing or per-file counting logic changes
+MINIFIED_AVG_LINE_LENGTH = 500  # Files with longer average lines are treated as minified and skipped
+MINIFIED_SNIFF_BYTES = 256 * 1024  # Head of a file inspected by the streaming minification check
+READ_CHUNK_BYTES = 64 * 1024  # Block size for streaming file reads
+TEXTUAL_BACKEND = 'tfidf'  # 'tfidf' (5000-term vocabulary) or 'hashing' (fixed-size hashed n-grams)
+HASHING_FEATURES = 2 ** 20  # Feature dimension of the hashing textual backend
+HASHING_BATCH_SIZE = 16  # Projects hashed per batch while fitting the hashing backend's IDF weights
+MATRIX_FORMATS = ('condensed',)  # Any of 'condensed' (upper triangle + JSON header), 'npy' (full NxN), 'csv'
+MATRIX_DTYPE = 'float32'  # Storage dtype of condensed similarity matrices ('float32' or 'float16')
+PAIR_SCAN_BLOCK_CELLS = 4 * 1024 * 1024  # Matrix cells read per block when extracting extreme pairs (bounds memory)
+FILE_NEIGHBORS_K = 5  # Most similar files from other projects listed per file (0 disables the file index)
+LEVENSHTEIN_CHUNK_SIZE = 32  # Project pairs per Levenshtein worker task
+SHINGLE_SIZE = 5  # Tokens per shingle for MinHash token similarity
+MINHASH_PERMUTATIONS = 128  # MinHash signature length (more = lower estimation error)
+CLONE_MIN_TOKENS = 50  # Shortest exact shared token run that starts a clone fragment (0 disables clone detection)
+CLONE_KGRAM = 15  # Tokens per hashed k-gram; winnowing keeps one per CLONE_MIN_TOKENS - CLONE_KGRAM + 1 k-grams
+CLONE_MAX_OCCURRENCES = 20  # K-grams found in more files are masked as boilerplate before winnowing
+CLONE_MAX_GAP = 3  # Differing tokens tolerated inside one fragment (near-exact clones; 0 = exact runs only)
+HEADLESS_PLOTS = False  # Batch mode: Agg backend, no plt.show(), parallel rendering, skip unchanged figures
+PLOT_WORKERS = ANALYSIS_WORKERS  # Processes rendering figures in headless mode (1 = serial)
+PLOT_DPI = 300  # Resolution of saved figures
+PLOT_PREVIEW_DPI = None  # Also save '<name>_preview.png' at this DPI (e.g. 72); None disables
+NETWORK_THRESHOLD = 0.3  # Similarity network: only pairs above this become edges
+NETWORK_KNN = None  # Keep only each project's k most similar neighbors above the threshold (None = all)
+NETWORK_LAYOUT = 'auto'  # 'spring', 'spectral', or 'auto' (spectral above NETWORK_FAST_LAYOUT_NODES)
+NETWORK_FAST_LAYOUT_NODES = 500  # Graphs with more nodes use the spectral layout in 'auto' mode
+RUN_BENCHMARKS = False  # Run the optional performance benchmark cells
+SEMANTIC_BACKEND = 'codebert'  # 'codebert' (torch + transformers) or 'lsa' (scikit-learn only)
+LSA_COMPONENTS = 100  # Latent dimensions of the LSA semantic backend
+STRUCTURAL_BACKEND = 'metrics'  # 'metrics' (7 project counts) or 'ast' (esprima node-type n-grams)
+AST_NGRAM_SIZE = 3  # Longest root-to-leaf node-type path recorded by the AST backend
+AST_FEATURES_VERSION = 3  # Bump whenever AST feature extraction changes (part of the cache key)
+CODEBERT_MODEL = "microsoft/codebert-base"  # Model name or local path for semantic embeddings
+EMBEDDING_BATCH_SIZE = 16  # Chunks per padded CodeBERT forward pass
+EMBEDDING_MAX_CHUNKS_PER_FILE = 16  # Caps the cost of very large files (512 tokens per chunk)
+INCREMENTAL_SIMILARITY = False  # Opt-in: only recompute matrix rows of new or changed projects (--incremental)
+INCREMENTAL_MAX_STALE_FRACTION = 0.5  # Refit from scratch when more projects than this changed
+SIMILARITY_STATE_DIR = os.path.join(RESULTS_DIR, 'similarity_state')  # Fitted models and vectors
+SIMILARITY_STATE_VERSION = 1  # Bump whenever vectorization changes (part of every saved state's settings)
+PROFILE_STAGES = True  # Time every pipeline stage and write a profile report at the end
+PROFILE_CPROFILE = False  # Also run cProfile per stage (adds overhead; writes results/profiles/<stage>.prof)
+PROFILE_TRACEMALLOC = False  # Also trace the peak Python allocation per stage (slows allocation-heavy stages)
+PROFILE_TOP_FUNCTIONS = 15  # Functions by cumulative time listed per stage in the cProfile report
+PROFILE_PATH = os.path.join(RESULTS_DIR, 'pipeline_profile.json')  # Machine-readable stage profile
+
+def list_projects(projects_dir: str) -> List[str]:
+    """
+    List the team project folders.
 
-# Create results directory
-os.makedirs(RESULTS_DIR, exist_ok=True)
+    Args:
+        projects_dir: Directory containing one folder per project
+
+    Returns:
+        Sorted project folder names (empty if the directory is missing)
+    """
+    if not os.path.exists(projects_dir):
+        print(f"⚠ Projects directory not found: {projects_dir}")
+        print("Please create 'projects/' directory and add all 27 VidyaVichar project folders")
+        return []
 
-# Get list of project directories
-if os.path.exists(PROJECTS_DIR):
-    project_dirs = sorted([d for d in os.listdir(PROJECTS_DIR) 
-                          if os.path.isdir(os.path.join(PROJECTS_DIR, d))])
+    project_dirs = sorted([d for d in os.listdir(projects_dir)
+                           if os.path.isdir(os.path.join(projects_dir, d))])
     print(f"Found {len(project_dirs)} projects:")
     for i, proj in enumerate(project_dirs, 1):
         print(f"  {i}. {proj}")
-else:
-    print(f"⚠ Projects directory not found: {PROJECTS_DIR}")
-    print("Please create 'projects/' directory and add all 27 VidyaVichar project folders")
-    project_dirs = []
+    return project_dirs
+
+
+# In[ ]:
+
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def peak_rss_mb(children: bool = False) -> Optional[float]:
+    """Peak resident set size of this process (or of its finished workers) in MB."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def current_rss_mb() -> Optional[float]:
+    """Current resident set size of this process in MB (None where /proc is not available)."""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def worker_cpu_seconds() -> float:
+    """CPU time used by finished worker processes (process pools are joined on shutdown)."""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class StageProfiler:
+    """
+    Timing and memory instrumentation for the pipeline stages.
+
+    Each stage records wall time, CPU time of this process and of finished
+    worker processes, the process peak RSS at its end and the change of the
+    current RSS over the stage. Time reported by worker processes is kept
+    apart from wall time, so it never counts towards the shares. Optionally (outermost
+    stages only, since neither tool nests) a cProfile run and the peak
+    traced Python allocation (tracemalloc) are captured. Entering a stage
+    name again accumulates into the same record.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, cprofile: Optional[bool] = None,
+                 trace_memory: Optional[bool] = None, top_functions: Optional[int] = None):
+        """
+        Settings left at None follow the PROFILE_* constants at the time they
+        are used, so the module-level profiler picks up later configuration.
+
+        Args:
+            enabled: Record stages at all (False makes stage() a no-op; default: PROFILE_STAGES)
+            cprofile: Run cProfile per stage (default: PROFILE_CPROFILE)
+            trace_memory: Trace the peak Python allocation per stage with tracemalloc
+                (default: PROFILE_TRACEMALLOC)
+            top_functions: Functions by cumulative time kept per stage from cProfile
+                (default: PROFILE_TOP_FUNCTIONS)
+        """
+        self._enabled = enabled
+        self._cprofile = cprofile
+        self._trace_memory = trace_memory
+        self._top_functions_count = top_functions
+        self.stages = {}
+        self.stats = {}
+        self.depth = 0
+        self.started = time.perf_counter()
+
+    @property
+    def enabled(self) -> bool:
+        return PROFILE_STAGES if self._enabled is None else self._enabled
+
+    @property
+    def cprofile(self) -> bool:
+        return PROFILE_CPROFILE if self._cprofile is None else self._cprofile
+
+    @property
+    def trace_memory(self) -> bool:
+        return PROFILE_TRACEMALLOC if self._trace_memory is None else self._trace_memory
+
+    @property
+    def top_functions(self) -> int:
+        return PROFILE_TOP_FUNCTIONS if self._top_functions_count is None else self._top_functions_count
+
+    def _entry(self, name: str) -> Dict:
+        """Return the record of a stage, creating it on first use."""
+        if name not in self.stages:
+            self.stages[name] = {'stage': name, 'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                 'worker_cpu_s': 0.0, 'worker_wall_s': 0.0, 'peak_rss_mb': None,
+                                 'rss_growth_mb': None, 'traced_peak_mb': None}
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Profile the enclosed block as stage `name`.
+
+        Args:
+            name: Stage name used in the report
+        """
+        if not self.enabled:
+            yield
+            return
+
+        outermost = self.depth == 0
+        profiler = cProfile.Profile() if self.cprofile and outermost else None
+        tracing = self.trace_memory and outermost and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        rss_before = current_rss_mb()
+        workers_before = worker_cpu_seconds()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        self.depth += 1
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            self.depth -= 1
+            entry = self._entry(name)
+            entry['calls'] += 1
+            entry['wall_s'] += time.perf_counter() - wall_start
+            entry['cpu_s'] += time.process_time() - cpu_start
+            entry['worker_cpu_s'] += worker_cpu_seconds() - workers_before
+            entry['peak_rss_mb'] = peak_rss_mb()
+            rss_after = current_rss_mb()
+            if rss_before is not None and rss_after is not None:
+                entry['rss_growth_mb'] = (entry['rss_growth_mb'] or 0.0) + rss_after - rss_before
+            if tracing:
+                _, traced_peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                entry['traced_peak_mb'] = max(entry['traced_peak_mb'] or 0.0, traced_peak / (1024 * 1024))
+            if profiler is not None:
+                if name in self.stats:
+                    self.stats[name].add(profiler)
+                else:
+                    self.stats[name] = pstats.Stats(profiler)
+
+    def record(self, name: str, worker_wall_s: float, calls: int = 1) -> None:
+        """
+        Record time measured in worker processes, e.g. the per-project analysis times.
+
+        Workers overlap with each other and with the stage that waits for
+        them, so this time is reported in its own column, not as wall time.
+
+        Args:
+            name: Stage name used in the report
+            worker_wall_s: Seconds summed over the workers
+            calls: Number of calls the time covers
+        """
+        if self.enabled:
+            entry = self._entry(name)
+            entry['calls'] += calls
+            entry['worker_wall_s'] += worker_wall_s
+
+    def _top_functions(self, name: str) -> List[Dict]:
+        """Functions with the highest cumulative time in a stage's cProfile run."""
+        stats = self.stats[name]
+        rows = []
+        for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+            rows.append({'function': f'{os.path.basename(filename)}:{line}({function})',
+                         'calls': calls, 'own_s': own, 'cumulative_s': cumulative})
+        rows.sort(key=lambda row: row['cumulative_s'], reverse=True)
+        return rows[:self.top_functions]
+
+    def report(self) -> pd.DataFrame:
+        """
+        Summarize the recorded stages.
+
+        Returns:
+            One row per stage in execution order, with its share of the total
+            wall time (empty for time only reported by workers)
+        """
+        import pandas as pd
+
+        total = time.perf_counter() - self.started
+        rows = []
+        for entry in self.stages.values():
+            timed = entry['wall_s'] > 0 or not entry['worker_wall_s']
+            rows.append({
+                'Stage': entry['stage'],
+                'Calls': entry['calls'],
+                'Wall (s)': round(entry['wall_s'], 3) if timed else None,
+                'Share': f"{entry['wall_s'] / total:.1%}" if timed and total else '',
+                'CPU (s)': round(entry['cpu_s'], 3),
+                'Worker Time (s)': round(entry['worker_wall_s'], 3),
+                'Worker CPU (s)': round(entry['worker_cpu_s'], 3),
+                'Peak RSS (MB)': None if entry['peak_rss_mb'] is None else round(entry['peak_rss_mb'], 1),
+                'RSS Growth (MB)': None if entry['rss_growth_mb'] is None else round(entry['rss_growth_mb'], 1),
+                'Traced Peak (MB)': None if entry['traced_peak_mb'] is None else round(entry['traced_peak_mb'], 1),
+            })
+        return pd.DataFrame(rows)
+
+    def write(self, path: Optional[str] = None) -> None:
+        """
+        Write the stage profile as JSON, plus one .prof file per stage when cProfile ran.
+
+        Args:
+            path: Output JSON path (default: PROFILE_PATH)
+        """
+        if path is None:
+            path = PROFILE_PATH
+        profile_dir = os.path.join(os.path.dirname(path), 'profiles')
+        stages = []
+        for name, entry in self.stages.items():
+            entry = dict(entry)
+            if name in self.stats:
+                os.makedirs(profile_dir, exist_ok=True)
+                entry['cprofile_path'] = os.path.join(profile_dir, f'{name}.prof')
+                self.stats[name].dump_stats(entry['cprofile_path'])
+                entry['top_functions'] = self._top_functions(name)
+            stages.append(entry)
+
+        with open(path, 'w') as f:
+            json.dump({'total_wall_s': time.perf_counter() - self.started,
+                       'cpu_count': os.cpu_count(), 'cprofile': self.cprofile,
+                       'tracemalloc': self.trace_memory, 'stages': stages}, f, indent=2)
+
+
+pipeline_profiler = StageProfiler()
 
 
 # ### 2.2 Preprocessing Functions
@@ -87,16 +401,84 @@ else:
 # In[ ]:
 
 
-def remove_js_comments(code: str) -> str:
+# Building blocks for the single-pass comment stripper
+_JS_QUOTED = r""""[^"\\\n]*(?:\\.[^"\\\n]*)*"|'[^'\\\n]*(?:\\.[^'\\\n]*)*'"""
+
+
+def _js_template_pattern(depth: int) -> str:
+    """
+    Template literal pattern that keeps ${...} substitutions intact.
+
+    Substitutions may contain quoted strings, up to two levels of nested
+    braces and further template literals, nested up to depth levels (the
+    innermost level treats '${' as plain text).
+    """
+    if depth == 0:
+        return r"""`[^`\\]*(?:\\.[^`\\]*)*`"""
+    flat = r"""[^{}'"`]++|%s|%s""" % (_JS_QUOTED, _js_template_pattern(depth - 1))
+    code = r"""(?:%s)""" % flat
+    for _ in range(2):
+        code = r"""(?:%s|\{%s*+\})""" % (flat, code)
+    return r"""`(?:[^`\\$]++|\\.|\$(?!\{)|\$\{%s*+\})*+`""" % code
+
+
+_JS_STRING = r"""(?:%s|%s)""" % (_JS_QUOTED, _js_template_pattern(3))
+_JS_REGEX_BODY = r"""/(?![*/])(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[a-z]*"""
+# A '/' opens a regex literal only after one of these (allowing up to two spaces)
+_JS_REGEX_CONTEXT = '|'.join(r'(?<=[(,=:\[!&|?{};]%s)' % (r'\s' * k) for k in range(3))
+_JS_COMMENT = r"""/\*.*?\*/|//[^\n]*"""
+# console.*(...) with up to three levels of nested parentheses in its arguments
+_JS_CALL_ARG = r"""(?:[^()'"`]|%s|\((?:%%s)*\))""" % _JS_STRING
+_JS_CONSOLE_CALL = (r"""(?<![\w$.])console\s*\.\s*(?:log|debug|info|warn|error|trace)\s*\(%s*\)[ \t]*;?"""
+                    % (_JS_CALL_ARG % (_JS_CALL_ARG % (_JS_CALL_ARG % r'[^()]'))))
+
+
+def _compile_js_stripper(strip_console: bool) -> re.Pattern:
+    """
+    Build the pattern used by remove_js_comments.
+
+    Each match is a run of code to keep (group 1) followed by one comment,
+    console call or the end of input. The run uses possessive repeats over
+    alternatives that start on different characters, so the scan is linear
+    and runs entirely inside the regex engine.
+    """
+    plain = r"""[^/"'`c]++""" if strip_console else r"""[^/"'`]++"""
+    keep = [plain, _JS_STRING, r'(?:%s)%s' % (_JS_REGEX_CONTEXT, _JS_REGEX_BODY),
+            r'/(?![*/])', r"""["'`]"""]
+    drop = [_JS_COMMENT]
+    if strip_console:
+        keep.append(r'(?!%s)c' % _JS_CONSOLE_CALL)
+        drop.append(_JS_CONSOLE_CALL)
+    return re.compile(r'((?:%s)*+)(?:%s|$)' % ('|'.join(keep), '|'.join(drop)), re.DOTALL)
+
+
+_JS_STRIP_PATTERNS = {flag: _compile_js_stripper(flag) for flag in (False, True)}
+
+
+def remove_js_comments(code: str, strip_console: bool = True) -> str:
     """
     Remove single-line and multi-line comments from JavaScript code.
 
+    Single pass with one precompiled pattern. String, template and regex
+    literals are kept intact, so '//' inside URLs or strings is no longer
+    treated as a comment. Template ${...} substitutions are matched with
+    their nested braces, strings and template literals (three levels deep).
+    Console calls (console.log/debug/info/warn/error/trace) are dropped in
+    the same scan. This is several times slower than the previous two-pass
+    regex (_remove_js_comments_regex), which cut lines at '//' in strings.
+
     Args:
         code: JavaScript source code string
+        strip_console: Also remove console.* calls
 
     Returns:
         Code with comments removed
     """
+    return _JS_STRIP_PATTERNS[strip_console].sub(r'\1', code)
+
+
+def _remove_js_comments_regex(code: str) -> str:
+    """Previous two-pass regex comment stripper, kept as benchmark baseline."""
     # Remove multi-line comments /* ... */
     code = re.sub(r'/\*.*?\*/', '', code, flags=re.DOTALL)
     # Remove single-line comments //
@@ -114,16 +496,57 @@ def is_minified(code: str) -> bool:
     Returns:
         True if code appears to be minified
     """
-    lines = code.split('\n')
-    if not lines:
-        return False
+    # Count newlines instead of materializing the list of lines
+    newlines = code.count('\n')
+    line_count = newlines + 1
 
     # Check average line length
-    avg_line_length = sum(len(line) for line in lines) / len(lines)
+    avg_line_length = (len(code) - newlines) / line_count
 
     # Minified files typically have very long lines (> 500 chars)
     # and few newlines
-    return avg_line_length > 500 or (len(lines) < 10 and len(code) > 1000)
+    return avg_line_length > MINIFIED_AVG_LINE_LENGTH or (line_count < 10 and len(code) > 1000)
+
+
+def sniff_minified(f: BinaryIO, size: int) -> Tuple[bool, List[bytes]]:
+    """
+    Streaming minification check on an open binary file.
+
+    Reads READ_CHUNK_BYTES at a time and stops as soon as the verdict on the
+    first MINIFIED_SNIFF_BYTES (or the whole file, if smaller) is fixed, no
+    matter what the unread bytes contain. Uses the is_minified thresholds,
+    measured in bytes.
+
+    Args:
+        f: File opened in binary mode, positioned at the start
+        size: File size in bytes
+
+    Returns:
+        Tuple of (True if the file appears to be minified, chunks read so far)
+    """
+    window = min(size, MINIFIED_SNIFF_BYTES)
+    chunks = []
+    bytes_read = newlines = 0
+
+    while True:
+        chunk = f.read(READ_CHUNK_BYTES)
+        chunks.append(chunk)
+        bytes_read += len(chunk)
+        newlines += chunk.count(b'\n')
+        chars = bytes_read - newlines
+        unread = max(window - bytes_read, 0)
+
+        if not chunk or unread == 0:
+            line_count = newlines + 1
+            minified = (chars / line_count > MINIFIED_AVG_LINE_LENGTH
+                        or (line_count < 10 and bytes_read > 1000))
+            return minified, chunks
+        # Even if every unread byte were a newline, the average stays too long
+        if chars > MINIFIED_AVG_LINE_LENGTH * (newlines + 1 + unread):
+            return True, chunks
+        # Even if no unread byte were a newline, the average stays short enough
+        if newlines >= 9 and chars + unread <= MINIFIED_AVG_LINE_LENGTH * (newlines + 1):
+            return False, chunks
 
 
 def normalize_formatting(code: str) -> str:
@@ -173,586 +596,3507 @@ def preprocess_code(code: str, file_ext: str) -> str:
 print("✓ Preprocessing functions defined")
 
 
-# ### 2.3 Project Analysis Functions
+# ### 2.3 Preprocessing Cache
 
 # In[ ]:
 
 
-def count_react_components(file_path: str) -> int:
+class PreprocessCache:
     """
-    Count React components in a JS/JSX file.
-    Looks for: function components, class components, arrow functions returning JSX.
-
-    Args:
-        file_path: Path to JS/JSX file
+    Persistent SQLite cache of per-file results, keyed by content hash.
 
-    Returns:
-        Number of React components found
+    A stat index (path, size, mtime) maps unchanged files straight to their
+    content hash, so cached files are not even read on later runs. Entries are
+    evicted least-recently-used first once the cache exceeds its size budget.
+    Writes are buffered and flushed in one transaction so several analysis
+    processes can share the same database.
     """
-    try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
 
-        count = 0
-        # Class components: class X extends React.Component or Component
-        count += len(re.findall(r'class\s+\w+\s+extends\s+(React\.)?Component', content))
-        # Function components: function X() { return (...JSX...) }
-        count += len(re.findall(r'function\s+[A-Z]\w*\s*\([^)]*\)\s*{[^}]*return\s*\(', content))
-        # Arrow function components: const X = () => (...)
-        count += len(re.findall(r'const\s+[A-Z]\w*\s*=\s*\([^)]*\)\s*=>\s*[\({]', content))
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._pending_entries = []
+        self._pending_touches = []
+        self._pending_files = []
+
+        self.conn = sqlite3.connect(db_path, timeout=60)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'key TEXT PRIMARY KEY, digest TEXT, value TEXT, size INTEGER, last_used REAL)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT)'
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def content_digest(raw: bytes) -> str:
+        """Return the content hash used as cache key."""
+        return hashlib.sha256(raw).hexdigest()
+
+    def lookup_digest(self, file_path: str, stat: os.stat_result) -> Optional[str]:
+        """Return the recorded content hash if the file is unchanged since it was hashed."""
+        row = self.conn.execute(
+            'SELECT size, mtime_ns, digest FROM files WHERE path = ?',
+            (os.path.abspath(file_path),)
+        ).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        return None
+
+    def record_digest(self, file_path: str, stat: os.stat_result, digest: str) -> None:
+        """Remember the content hash of a file for the next run."""
+        self._pending_files.append(
+            (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, digest)
+        )
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Look up a cached value, counting the hit or miss."""
+        row = self.conn.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._pending_touches.append((time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, digest: str, value: Dict) -> None:
+        """Store a JSON-serializable value."""
+        payload = json.dumps(value)
+        self._pending_entries.append((key, digest, payload, len(payload), time.time()))
+
+    def flush(self) -> None:
+        """Write buffered entries, access times and stat records in one transaction."""
+        if not (self._pending_entries or self._pending_touches or self._pending_files):
+            return
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)', self._pending_entries
+            )
+            self.conn.executemany(
+                'UPDATE entries SET last_used = ? WHERE key = ?', self._pending_touches
+            )
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)', self._pending_files
+            )
+        self._pending_entries, self._pending_touches, self._pending_files = [], [], []
+
+    def total_size(self) -> int:
+        """Total size of cached values in bytes."""
+        return self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def evict(self, max_bytes: int) -> int:
+        """
+        Evict least recently used entries until the cache fits in max_bytes.
+
+        Returns:
+            Number of evicted entries
+        """
+        excess = self.total_size() - max_bytes
+        if excess <= 0:
+            return 0
+
+        evicted = []
+        for key, size in self.conn.execute('SELECT key, size FROM entries ORDER BY last_used'):
+            evicted.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+
+        with self.conn:
+            self.conn.executemany('DELETE FROM entries WHERE key = ?', evicted)
+            self.conn.execute(
+                'DELETE FROM files WHERE digest NOT IN (SELECT digest FROM entries)'
+            )
+        return len(evicted)
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+
+print("✓ Preprocessing cache defined")
+
+
+# ### 2.4 Project Analysis Functions
 
-        return count
-    except:
-        return 0
+# In[ ]:
 
 
-def count_express_routes(file_path: str) -> int:
+class PathRules:
     """
-    Count Express routes in a JS file.
-    Looks for: app.get, app.post, router.get, router.post, etc.
+    Gitignore-style include/exclude rules for the files and folders of a project.
 
-    Args:
-        file_path: Path to JS file
-
-    Returns:
-        Number of Express routes found
+    Rules are checked in order and the last matching one wins; a leading '!'
+    re-includes. A trailing '/' restricts a rule to directories. Rules
+    without an inner '/' match the name at any depth, all others are
+    anchored at the project root. '*' and '?' stay within one path segment,
+    '**' spans any number of them.
     """
-    try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
 
-        # Match app.METHOD or router.METHOD
-        pattern = r'(app|router)\.(get|post|put|delete|patch)\s*\('
-        return len(re.findall(pattern, content))
-    except:
-        return 0
+    def __init__(self, rules: List[str], max_file_bytes: Optional[int] = None):
+        """
+        Args:
+            rules: Gitignore-style patterns (blank lines and '#' comments are ignored)
+            max_file_bytes: Files larger than this are excluded (None = no cap)
+        """
+        self.max_file_bytes = max_file_bytes
+        compiled = [self._compile(rule) for rule in rules
+                    if rule.strip() and not rule.startswith('#')]
+        # Reversed so the first hit is the last matching rule
+        self.rules = compiled[::-1]
+
+    @staticmethod
+    def _compile(rule: str) -> Tuple[re.Pattern, bool, bool]:
+        """Translate one rule into (regex over relative paths, negated, directories only)."""
+        negated = rule.startswith('!')
+        rule = rule[1:] if negated else rule
+        dir_only = rule.endswith('/')
+        rule = rule.rstrip('/')
+        anchored = '/' in rule
+        rule = rule.lstrip('/')
+
+        parts = []
+        i = 0
+        while i < len(rule):
+            if rule.startswith('**/', i):
+                parts.append('(?:.*/)?')
+                i += 3
+            elif rule.startswith('**', i):
+                parts.append('.*')
+                i += 2
+            elif rule[i] == '*':
+                parts.append('[^/]*')
+                i += 1
+            elif rule[i] == '?':
+                parts.append('[^/]')
+                i += 1
+            elif rule[i] == '[' and ']' in rule[i + 1:]:
+                end = rule.index(']', i + 1)
+                parts.append('[' + rule[i + 1:end].replace('!', '^', 1) + ']')
+                i = end + 1
+            else:
+                parts.append(re.escape(rule[i]))
+                i += 1
+
+        prefix = '' if anchored else '(?:.*/)?'
+        return re.compile(prefix + ''.join(parts) + r'\Z'), negated, dir_only
+
+    def excluded(self, rel_path: str, is_dir: bool) -> bool:
+        """
+        Check a path against the rules.
+
+        Args:
+            rel_path: Path relative to the project root, '/'-separated
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if the path should be skipped
+        """
+        for pattern, negated, dir_only in self.rules:
+            if (is_dir or not dir_only) and pattern.match(rel_path):
+                return not negated
+        return False
 
 
-def count_mongoose_models(file_path: str) -> int:
+def project_path_rules(project_name: str) -> PathRules:
     """
-    Count Mongoose model definitions in a JS file.
-    Looks for: mongoose.Schema, mongoose.model patterns.
+    Build the path rules for one project, applying its PROJECT_PATH_RULES override.
 
     Args:
-        file_path: Path to JS file
+        project_name: Project directory name
 
     Returns:
-        Number of Mongoose models found
+        PathRules with the global rules followed by the project's own rules
     """
-    try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-
-        count = 0
-        # mongoose.Schema
-        count += len(re.findall(r'new\s+mongoose\.Schema\s*\(', content))
-        # mongoose.model
-        count += len(re.findall(r'mongoose\.model\s*\(', content))
-
-        return count
-    except:
-        return 0
+    override = PROJECT_PATH_RULES.get(project_name, {})
+    return PathRules(PATH_EXCLUDE_RULES + list(override.get('rules', [])),
+                     override.get('max_file_bytes', MAX_FILE_BYTES))
 
 
-def analyze_project(project_path: str) -> Dict:
+def _entry_size(entry: os.DirEntry) -> Optional[int]:
     """
-    Analyze a project directory and extract metrics.
-
-    Args:
-        project_path: Path to project directory
+    Size of a directory entry's file, following file symlinks like open() does.
 
     Returns:
-        Dictionary containing project metrics
+        Size in bytes, or None for broken links and files that vanished
+        (they are kept and fail when read, as with os.walk)
     """
-    metrics = {
-        'name': os.path.basename(project_path),
-        'total_files': 0,
-        'total_folders': 0,
-        'loc': 0,
-        'react_components': 0,
-        'express_routes': 0,
-        'mongoose_models': 0,
-        'files_by_type': {ext: 0 for ext in VALID_EXTENSIONS},
-        'all_code': []  # Store all preprocessed code for similarity analysis
-    }
-
-    for root, dirs, files in os.walk(project_path):
-        # Skip node_modules and hidden directories
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d != 'node_modules']
+    try:
+        return entry.stat().st_size
+    except OSError:
+        return None
 
-        metrics['total_folders'] += len(dirs)
 
-        for file in files:
-            file_path = os.path.join(root, file)
-            file_ext = os.path.splitext(file)[1]
+def walk_project(project_path: str, rules: PathRules, extensions: Optional[Tuple[str, ...]] = None,
+                 skipped: Optional[Dict[str, int]] = None):
+    """
+    Walk a project top-down with os.scandir, in os.walk order.
 
-            if file_ext in VALID_EXTENSIONS:
-                metrics['total_files'] += 1
-                metrics['files_by_type'][file_ext] += 1
+    Excluded directories are pruned before they are opened, so build and
+    vendor trees are never listed. Like os.walk, symbolic links to
+    directories are counted but not followed, so link cycles cannot recurse.
+    Only files with the given extensions are checked against the rules and
+    the size cap.
 
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
+    Args:
+        project_path: Path to project directory
+        rules: Include/exclude rules for this project
+        extensions: File extensions to report (default: VALID_EXTENSIONS)
+        skipped: Optional dict whose 'dirs', 'files' and 'bytes' counters are
+            increased for every excluded directory and matching file
 
-                    # Count LOC
-                    lines = content.split('\n')
-                    metrics['loc'] += len([l for l in lines if l.strip()])
+    Yields:
+        Tuples of (directory path, number of kept subdirectories, [(file path, extension), ...])
+    """
+    if extensions is None:
+        extensions = VALID_EXTENSIONS
+    if skipped is None:
+        skipped = {}
+    for key in ('dirs', 'files', 'bytes'):
+        skipped.setdefault(key, 0)
+    max_bytes = rules.max_file_bytes
+
+    stack = [(project_path, '')]
+    while stack:
+        dir_path, rel_dir = stack.pop()
+        subdir_count = 0
+        subdirs = []
+        files = []
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    rel_path = rel_dir + entry.name
+                    if entry.is_dir():
+                        if rules.excluded(rel_path, True):
+                            skipped['dirs'] += 1
+                            continue
+                        subdir_count += 1
+                        if not entry.is_symlink():
+                            subdirs.append((entry.path, rel_path + '/'))
+                        continue
+
+                    file_ext = os.path.splitext(entry.name)[1]
+                    if file_ext not in extensions:
+                        continue
+                    if rules.excluded(rel_path, False):
+                        skipped['files'] += 1
+                        skipped['bytes'] += _entry_size(entry) or 0
+                        continue
+                    if max_bytes is not None:
+                        size = _entry_size(entry)
+                        if size is not None and size > max_bytes:
+                            skipped['files'] += 1
+                            skipped['bytes'] += size
+                            continue
+                    files.append((entry.path, file_ext))
+        except OSError:
+            continue
+
+        yield dir_path, subdir_count, files
+        # Reversed so subdirectories are visited in listing order
+        stack.extend(reversed(subdirs))
+
+
+def decode_source(raw: bytes) -> str:
+    """
+    Decode raw file bytes the way text-mode open() would.
 
-                    # Preprocess and store code
-                    preprocessed = preprocess_code(content, file_ext)
-                    if preprocessed:
-                        metrics['all_code'].append(preprocessed)
+    Args:
+        raw: File contents
 
-                    # Count React components
-                    if file_ext in ('.js', '.jsx'):
-                        metrics['react_components'] += count_react_components(file_path)
-                        metrics['express_routes'] += count_express_routes(file_path)
-                        metrics['mongoose_models'] += count_mongoose_models(file_path)
+    Returns:
+        Decoded text with normalized newlines
+    """
+    content = raw.decode('utf-8', errors='ignore')
+    # Match text-mode universal newlines so downstream regexes behave as before
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
 
-                except Exception as e:
-                    continue
 
-    return metrics
+def read_source_file(file_path: str) -> Tuple[str, int]:
+    """
+    Read and decode a source file exactly once.
 
+    Args:
+        file_path: Path to source file
 
-print("✓ Project analysis functions defined")
+    Returns:
+        Tuple of (decoded text with normalized newlines, number of bytes read)
+    """
+    with open(file_path, 'rb') as f:
+        raw = f.read()
 
+    return decode_source(raw), len(raw)
 
-# ### 2.4 Analyze All Projects
 
-# In[ ]:
+def read_source_bytes(file_path: str, digest: bool = True) -> Tuple[Optional[bytes], Optional[Dict]]:
+    """
+    Read a source file unless the streaming check finds it minified.
 
+    Minified files are never held in memory: the rest of the file is streamed
+    in READ_CHUNK_BYTES blocks to count its non-empty lines and, if digest is
+    set, to hash it.
 
-# Analyze all projects
-project_metrics = []
+    Args:
+        file_path: Path to source file
+        digest: Hash minified files (only needed to key the preprocessing cache)
 
-if project_dirs:
-    print("Analyzing projects...\n")
-    for proj_name in project_dirs:
-        proj_path = os.path.join(PROJECTS_DIR, proj_name)
-        print(f"Analyzing: {proj_name}")
-        metrics = analyze_project(proj_path)
-        project_metrics.append(metrics)
-        print(f"  Files: {metrics['total_files']}, LOC: {metrics['loc']}, "
-              f"Components: {metrics['react_components']}, Routes: {metrics['express_routes']}")
+    Returns:
+        Tuple of (raw bytes, None) or, for minified files,
+        (None, dict with bytes_read, loc and the content digest or None)
+    """
+    with open(file_path, 'rb') as f:
+        minified, chunks = sniff_minified(f, os.fstat(f.fileno()).st_size)
+        if not minified:
+            return b''.join(chunks) + f.read(), None
+
+        hasher = hashlib.sha256() if digest else None
+        bytes_read = loc = 0
+        line_has_code = False
+        chunk = b''.join(chunks)
+        while chunk:
+            if hasher is not None:
+                hasher.update(chunk)
+            bytes_read += len(chunk)
+            lines = chunk.split(b'\n')
+            for line in lines[:-1]:
+                if line_has_code or line.strip():
+                    loc += 1
+                line_has_code = False
+            # The last piece continues on the next chunk
+            line_has_code = line_has_code or bool(lines[-1].strip())
+            chunk = f.read(READ_CHUNK_BYTES)
+
+    return None, {'bytes_read': bytes_read, 'loc': loc + line_has_code,
+                  'digest': hasher.hexdigest() if hasher is not None else None}
+
+
+def count_react_components(content: str) -> int:
+    """
+    Count React components in JS/JSX source.
+    Looks for: function components, class components, arrow functions returning JSX.
 
-    print(f"\n✓ Analyzed {len(project_metrics)} projects")
-else:
-    print("⚠ No projects to analyze. Please add projects to 'projects/' directory.")
+    Args:
+        content: Source code of a JS/JSX file
 
+    Returns:
+        Number of React components found
+    """
+    count = 0
+    # Class components: class X extends React.Component or Component
+    count += len(re.findall(r'class\s+\w+\s+extends\s+(React\.)?Component', content))
+    # Function components: function X() { return (...JSX...) }
+    count += len(re.findall(r'function\s+[A-Z]\w*\s*\([^)]*\)\s*{[^}]*return\s*\(', content))
+    # Arrow function components: const X = () => (...)
+    count += len(re.findall(r'const\s+[A-Z]\w*\s*=\s*\([^)]*\)\s*=>\s*[\({]', content))
 
-# ### 2.5 Generate Preprocessing Summary
+    return count
 
-# In[ ]:
 
+def count_express_routes(content: str) -> int:
+    """
+    Count Express routes in JS source.
+    Looks for: app.get, app.post, router.get, router.post, etc.
 
-if project_metrics:
-    # Create summary DataFrame
-    summary_data = []
-    for m in project_metrics:
-        summary_data.append({
-            'Project': m['name'],
-            'Total Files': m['total_files'],
-            'Total Folders': m['total_folders'],
-            'Lines of Code': m['loc'],
-            'React Components': m['react_components'],
-            'Express Routes': m['express_routes'],
-            'Mongoose Models': m['mongoose_models'],
-            'JS Files': m['files_by_type'].get('.js', 0),
-            'JSX Files': m['files_by_type'].get('.jsx', 0),
-            'JSON Files': m['files_by_type'].get('.json', 0),
-            'CSS Files': m['files_by_type'].get('.css', 0),
-        })
+    Args:
+        content: Source code of a JS file
 
-    summary_df = pd.DataFrame(summary_data)
+    Returns:
+        Number of Express routes found
+    """
+    # Match app.METHOD or router.METHOD
+    pattern = r'(app|router)\.(get|post|put|delete|patch)\s*\('
+    return len(re.findall(pattern, content))
 
-    # Save to CSV
-    summary_df.to_csv(os.path.join(RESULTS_DIR, 'preprocessing_summary.csv'), index=False)
 
-    # Display summary
-    print("\n=== PROJECT SUMMARY ===")
-    print(summary_df.to_string(index=False))
+def count_mongoose_models(content: str) -> int:
+    """
+    Count Mongoose model definitions in JS source.
+    Looks for: mongoose.Schema, mongoose.model patterns.
 
-    # Statistics
-    print("\n=== STATISTICS ===")
-    print(summary_df.describe())
+    Args:
+        content: Source code of a JS file
 
-    print(f"\n✓ Saved preprocessing summary to {RESULTS_DIR}/preprocessing_summary.csv")
+    Returns:
+        Number of Mongoose models found
+    """
+    count = 0
+    # mongoose.Schema
+    count += len(re.findall(r'new\s+mongoose\.Schema\s*\(', content))
+    # mongoose.model
+    count += len(re.findall(r'mongoose\.model\s*\(', content))
 
+    return count
 
-# ## 3. Part B: Similarity Computation <a name="part-b"></a>
-# 
-# ### 3.1 Textual Similarity
 
-# In[ ]:
+_ROUTE_OWNER = r'\b(?:app|\w*[Rr]outer|routes?)'
+_ROUTE_PATTERN = re.compile(_ROUTE_OWNER + r'\.(get|post|put|delete|patch)\s*\(\s*([\'"`])(/[^\'"`]*|\*)\2')
+_CHAINED_ROUTE_PATTERN = re.compile(_ROUTE_OWNER + r'\.route\s*\(\s*([\'"`])(/[^\'"`]*|\*)\1\s*\)')
+_CHAINED_METHOD_PATTERN = re.compile(r'\.\s*(get|post|put|delete|patch)\s*\(')
+_STATEMENT_END_PATTERN = re.compile(r';|' + _ROUTE_OWNER + r'\.')
+_SCHEMA_PATTERN = re.compile(r'new\s+(?:mongoose\.)?Schema\s*\(\s*\{')
+_SCHEMA_KEY_PATTERN = re.compile(r'\s*([\'"]?)([\w$]+)\1\s*:\s*')
+_SCHEMA_TYPE_PATTERN = re.compile(r'\btype\s*:\s*(\[?)\s*([\w$.]+)')
 
 
-def compute_textual_similarity(project_metrics: List[Dict]) -> np.ndarray:
+def normalize_route_path(path: str) -> str:
     """
-    Compute textual similarity using TF-IDF and cosine similarity.
+    Normalize an Express route path for matching across projects.
+
+    Route parameters (':id', ':id(\\d+)') and template expressions become ':',
+    the query string and trailing slash are dropped and the path is lowercased,
+    so '/api/Users/:userId/' and '/api/users/:id' match.
 
     Args:
-        project_metrics: List of project metric dictionaries
+        path: Route path as written in the source
 
     Returns:
-        NxN similarity matrix
+        Normalized path
     """
-    n = len(project_metrics)
+    path = path.split('?', 1)[0].strip().lower()
+    path = re.sub(r'\$\{[^}]*\}', ':', path)
+    path = re.sub(r':[\w$]+(?:\([^)]*\))?\??', ':', path)
+    path = re.sub(r'/{2,}', '/', path)
+    return path.rstrip('/') or '/'
 
-    # Combine all code from each project
-    project_texts = []
-    for metrics in project_metrics:
-        combined_text = ' '.join(metrics['all_code'])
-        project_texts.append(combined_text)
 
-    # Compute TF-IDF vectors
-    vectorizer = TfidfVectorizer(
-        max_features=5000,
-        ngram_range=(1, 2),  # Use unigrams and bigrams
-        min_df=1
-    )
+def extract_express_routes(content: str) -> List[Tuple[str, str]]:
+    """
+    Extract Express routes as (METHOD, normalized path) pairs.
 
-    tfidf_matrix = vectorizer.fit_transform(project_texts)
+    Covers app/router.METHOD('/path', ...) calls and chained
+    router.route('/path').get(...).post(...) declarations. Paths are kept
+    relative to the router; mount prefixes from app.use are not resolved.
 
-    # Compute cosine similarity
-    similarity_matrix = cosine_similarity(tfidf_matrix)
+    Args:
+        content: Source code of a JS file
 
-    return similarity_matrix
+    Returns:
+        Sorted distinct (method, path) pairs
+    """
+    routes = {(method.upper(), normalize_route_path(path))
+              for method, _, path in _ROUTE_PATTERN.findall(content)}
+    for match in _CHAINED_ROUTE_PATTERN.finditer(content):
+        end = _STATEMENT_END_PATTERN.search(content, match.end())
+        chain = content[match.end():end.start() if end else len(content)]
+        path = normalize_route_path(match.group(2))
+        routes.update((method.upper(), path) for method in _CHAINED_METHOD_PATTERN.findall(chain))
+    return sorted(routes)
 
 
-def compute_levenshtein_similarity(project_metrics: List[Dict]) -> np.ndarray:
+def _object_literal_entries(content: str, start: int) -> Tuple[List[Tuple[str, str]], int]:
     """
-    Compute token-level similarity using Levenshtein distance.
+    Split the object literal opening at content[start] into top-level (key, value) entries.
+
+    Strings, template literals and nested brackets are skipped over, so
+    commas inside them do not split entries. Keys that are not plain or
+    quoted identifiers (spreads, computed keys) are ignored.
 
     Args:
-        project_metrics: List of project metric dictionaries
+        content: Comment-free source code
+        start: Index of the opening '{'
 
     Returns:
-        NxN similarity matrix (normalized)
+        Tuple of ((key, value source) entries, index just past the closing '}')
     """
-    n = len(project_metrics)
-    similarity_matrix = np.zeros((n, n))
+    entries, depth, quote, entry_start = [], 0, None, start + 1
+    i = start
+    while i < len(content):
+        char = content[i]
+        if quote:
+            if char == '\\':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in '\'"`':
+            quote = char
+        elif char in '{[(':
+            depth += 1
+        elif char in '}])':
+            depth -= 1
+        if (depth == 1 and char == ',' and not quote) or depth == 0:
+            key = _SCHEMA_KEY_PATTERN.match(content, entry_start, i)
+            if key:
+                entries.append((key.group(2), content[key.end():i].strip()))
+            entry_start = i + 1
+            if depth == 0:
+                return entries, i + 1
+        i += 1
+    return entries, len(content)
+
+
+def _schema_field_type(value: str) -> str:
+    """Normalized Mongoose type of a schema field definition ('string', '[objectid]', 'object', ...)."""
+    if value.startswith('{'):
+        declared = _SCHEMA_TYPE_PATTERN.search(value)
+        if not declared:
+            return 'object'
+        array, name = declared.groups()
+        type_name = name.rsplit('.', 1)[-1].lower()
+        return f'[{type_name}]' if array else type_name
+    if value.startswith('['):
+        inner = value[1:-1].strip()
+        return f'[{_schema_field_type(inner)}]' if inner else '[mixed]'
+    if value.startswith('new '):
+        return 'subdocument'
+    name = re.match(r'[\w$.]*', value).group(0)
+    return name.rsplit('.', 1)[-1].lower() or 'mixed'
+
+
+def extract_mongoose_schemas(content: str, comments_removed: bool = False) -> List[List[str]]:
+    """
+    Extract every Mongoose schema as its set of 'field:type' entries.
 
-    # Sample a subset of code for performance (first 10000 chars)
-    project_samples = []
-    for metrics in project_metrics:
-        combined = ''.join(metrics['all_code'][:100])  # First 100 files
-        sample = combined[:10000]  # First 10k characters
-        project_samples.append(sample)
+    Only the top-level fields of the definition object are recorded; the
+    type is the declared 'type' of an options object, the element type of
+    an array ('[string]'), or 'object' for nested plain objects.
 
-    # Compute pairwise Levenshtein similarity
-    for i in range(n):
-        for j in range(n):
-            if i == j:
-                similarity_matrix[i][j] = 1.0
-            else:
-                # Levenshtein ratio (0 to 1, where 1 is identical)
-                ratio = Levenshtein.ratio(project_samples[i], project_samples[j])
-                similarity_matrix[i][j] = ratio
+    Args:
+        content: Source code of a JS file
+        comments_removed: content already went through remove_js_comments
 
-    return similarity_matrix
+    Returns:
+        One sorted list of 'field:type' strings per schema, in source order
+    """
+    if 'Schema' not in content:
+        return []
+    code = content if comments_removed else remove_js_comments(content, strip_console=False)
+    schemas = []
+    for match in _SCHEMA_PATTERN.finditer(code):
+        entries, _ = _object_literal_entries(code, match.end() - 1)
+        schemas.append(sorted({f'{key.lower()}:{_schema_field_type(value)}' for key, value in entries}))
+    return schemas
 
 
-print("✓ Textual similarity functions defined")
+def minified_file_metrics(loc: int) -> Dict:
+    """
+    Per-file metrics for a minified file (rejected unread or after decoding).
 
+    Args:
+        loc: Non-empty lines counted while streaming the file
 
-# In[ ]:
+    Returns:
+        Dictionary shaped like compute_file_metrics, with nothing preprocessed
+    """
+    return {
+        'loc': loc,
+        'preprocessed': '',
+        'react_components': 0,
+        'express_routes': 0,
+        'mongoose_models': 0,
+        'routes': [],
+        'schemas': [],
+        'minified': True,
+    }
 
 
-# Compute textual similarity
-if project_metrics:
-    print("Computing textual similarity...")
+def compute_file_metrics(content: str, file_ext: str) -> Dict:
+    """
+    Run preprocessing and every per-file counter on an already decoded buffer.
 
-    # TF-IDF based similarity
-    textual_similarity = compute_textual_similarity(project_metrics)
-    print(f"  TF-IDF similarity matrix: {textual_similarity.shape}")
+    Files that passed the streaming check on their head but are minified
+    as a whole get the same metrics as files rejected while streaming.
 
-    # Save matrix
-    np.save(os.path.join(RESULTS_DIR, 'textual_similarity_matrix.npy'), textual_similarity)
+    Args:
+        content: Decoded source code
+        file_ext: File extension (.js, .jsx, etc.)
 
-    # Save as CSV for readability
-    project_names = [m['name'] for m in project_metrics]
-    textual_df = pd.DataFrame(textual_similarity, index=project_names, columns=project_names)
-    textual_df.to_csv(os.path.join(RESULTS_DIR, 'textual_similarity_matrix.csv'))
+    Returns:
+        Dictionary of per-file metrics and the preprocessed code
+    """
+    loc = sum(1 for line in content.split('\n') if line.strip())
+    if is_minified(content):
+        return minified_file_metrics(loc)
+
+    # Same steps as preprocess_code; the comment-free text is reused for schemas
+    is_js = file_ext in ('.js', '.jsx')
+    stripped = remove_js_comments(content) if is_js else content
+    result = {
+        'loc': loc,
+        'preprocessed': normalize_formatting(stripped),
+        'react_components': 0,
+        'express_routes': 0,
+        'mongoose_models': 0,
+        'routes': [],  # (METHOD, normalized path) pairs
+        'schemas': [],  # One 'field:type' list per Mongoose schema
+        'minified': False,
+    }
 
-    print("✓ Textual similarity computed and saved")
+    if is_js:
+        result['react_components'] = count_react_components(content)
+        result['express_routes'] = count_express_routes(content)
+        result['mongoose_models'] = count_mongoose_models(content)
+        result['routes'] = extract_express_routes(content)
+        result['schemas'] = extract_mongoose_schemas(stripped, comments_removed=True)
 
-    # Show sample
-    print("\nSample (first 5x5):")
-    print(textual_df.iloc[:5, :5].to_string())
+    return result
 
 
-# ### 3.2 Structural Similarity
+def count_ast_nodes(ast, ngram_size: Optional[int] = None) -> Tuple[Counter, Counter]:
+    """
+    Count node types and node-type path n-grams with an explicit stack.
 
-# In[ ]:
+    Iterative, so deeply nested (e.g. bundled) files cannot hit the recursion
+    limit, and only counters are kept instead of a list of every node type.
+    The loop counts each node's full ancestor path (up to ngram_size types);
+    shorter n-grams are derived from the distinct paths afterwards.
 
+    Args:
+        ast: esprima AST (a Node or a list of Nodes)
+        ngram_size: Longest ancestor-to-node type path to count (default: AST_NGRAM_SIZE)
 
-def extract_ast_features(file_path: str) -> Dict:
+    Returns:
+        Tuple of (node type counts, n-gram counts keyed by type tuples)
     """
-    Extract AST features from a JavaScript file.
+    if ngram_size is None:
+        ngram_size = AST_NGRAM_SIZE
+    import esprima
+
+    Node = esprima.nodes.Node
+    path_counts = {}
+    get = path_counts.get
+    stack = [(ast, ())]
+    pop, push = stack.pop, stack.append
+
+    while stack:
+        node, ancestors = pop()
+        if node.__class__ is list:
+            for item in node:
+                push((item, ancestors))
+            continue
+        if not isinstance(node, Node):
+            continue
+
+        path = ancestors + (node.type or '',)
+        if len(path) > ngram_size:
+            path = path[1:]
+        path_counts[path] = get(path, 0) + 1
+
+        for value in node.__dict__.values():
+            if value.__class__ is list or isinstance(value, Node):
+                push((value, path))
+
+    type_counts = Counter()
+    ngram_counts = Counter()
+    for path, count in path_counts.items():
+        type_counts[path[-1]] += count
+        for n in range(1, len(path) + 1):
+            ngram_counts[path[-n:]] += count
+
+    return type_counts, ngram_counts
+
+
+def extract_ast_features(code: str) -> Dict:
+    """
+    Extract AST features from JavaScript source.
+
+    Besides the declaration counts, every node contributes its node-type path
+    n-grams: its own type and the types of up to AST_NGRAM_SIZE - 1 ancestors
+    (e.g. 'VariableDeclarator>ArrowFunctionExpression>JSXElement').
 
     Args:
-        file_path: Path to JS/JSX file
+        code: Source code of a JS/JSX file
 
     Returns:
         Dictionary of AST features
     """
+    import esprima
+
     features = {
         'function_count': 0,
         'class_count': 0,
         'import_count': 0,
         'export_count': 0,
         'variable_count': 0,
-        'node_types': []
+        'node_type_counts': {},
+        'node_ngrams': {},
+        'parse_error': False
     }
 
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            code = f.read()
-
         # Parse AST
         ast = esprima.parseModule(code, {'jsx': True, 'tolerant': True})
-
-        # Traverse AST and collect features
-        def traverse(node):
-            if isinstance(node, dict):
-                node_type = node.get('type', '')
-                features['node_types'].append(node_type)
-
-                if 'Function' in node_type:
-                    features['function_count'] += 1
-                elif 'Class' in node_type:
-                    features['class_count'] += 1
-                elif 'Import' in node_type:
-                    features['import_count'] += 1
-                elif 'Export' in node_type:
-                    features['export_count'] += 1
-                elif 'Variable' in node_type:
-                    features['variable_count'] += 1
-
-                for value in node.values():
-                    if isinstance(value, (dict, list)):
-                        traverse(value)
-            elif isinstance(node, list):
-                for item in node:
-                    traverse(item)
-
-        traverse(ast)
-    except:
-        pass
-
+    except Exception:
+        features['parse_error'] = True
+        return features
+
+    type_counts, ngram_counts = count_ast_nodes(ast)
+
+    # Classify each distinct node type once instead of once per node
+    for node_type, count in type_counts.items():
+        if 'Function' in node_type:
+            features['function_count'] += count
+        elif 'Class' in node_type:
+            features['class_count'] += count
+        elif 'Import' in node_type:
+            features['import_count'] += count
+        elif 'Export' in node_type:
+            features['export_count'] += count
+        elif 'Variable' in node_type:
+            features['variable_count'] += count
+
+    features['node_type_counts'] = dict(type_counts)
+    features['node_ngrams'] = {'>'.join(path): count for path, count in ngram_counts.items()}
     return features
 
 
-def compute_structural_similarity(project_metrics: List[Dict]) -> np.ndarray:
+def ast_file_features(content: str) -> Dict:
     """
-    Compute structural similarity based on AST features.
+    Cacheable AST features of one JS/JSX file (see extract_ast_features).
 
     Args:
-        project_metrics: List of project metric dictionaries
+        content: Decoded source code
 
     Returns:
-        NxN similarity matrix
+        Dictionary with node-type n-gram counts and a parse error flag
     """
-    n = len(project_metrics)
+    features = extract_ast_features(content)
+    return {'node_ngrams': features['node_ngrams'], 'parse_error': features['parse_error']}
 
-    # Extract structural features for each project
-    project_features = []
 
-    for metrics in project_metrics:
-        # Use metrics we already have
-        features = [
-            metrics['react_components'],
-            metrics['express_routes'],
-            metrics['mongoose_models'],
-            metrics['files_by_type'].get('.js', 0),
+def scan_file(file_path: str, file_ext: str, cache: Optional[PreprocessCache] = None) -> Dict:
+    """
+    Per-file scan stage: read the file once and run every counter on the buffer.
+
+    With a cache, unchanged files (same size and mtime) are served without
+    being read, and files with already seen content are not reprocessed.
+    When the AST structural backend is enabled, JS/JSX files are also parsed
+    here (once, inside the analysis worker) and their features cached.
+    Minified files are detected while streaming and never fully loaded.
+
+    Args:
+        file_path: Path to source file
+        file_ext: File extension (.js, .jsx, etc.)
+        cache: Optional persistent preprocessing cache
+
+    Returns:
+        Dictionary of per-file metrics and the preprocessed code
+    """
+    want_ast = STRUCTURAL_BACKEND == 'ast' and file_ext in ('.js', '.jsx')
+    empty_ast = {'node_ngrams': {}, 'parse_error': 0}
+
+    if cache is None:
+        raw, minified = read_source_bytes(file_path, digest=False)
+        if minified is not None:
+            result = minified_file_metrics(minified['loc'])
+            if want_ast:
+                result['ast'] = empty_ast
+            result['bytes_read'] = minified['bytes_read']
+            return result
+        content = decode_source(raw)
+        result = compute_file_metrics(content, file_ext)
+        if want_ast:
+            result['ast'] = empty_ast if result['minified'] else ast_file_features(content)
+        result['bytes_read'] = len(raw)
+        return result
+
+    raw = minified = None
+    stat = os.stat(file_path)
+    digest = cache.lookup_digest(file_path, stat)
+    if digest is None:
+        raw, minified = read_source_bytes(file_path)
+        digest = cache.content_digest(raw) if minified is None else minified['digest']
+        cache.record_digest(file_path, stat, digest)
+
+    # The minification thresholds decide which files are skipped, so both keys include them
+    minified_settings = f"{MINIFIED_AVG_LINE_LENGTH}:{MINIFIED_SNIFF_BYTES}"
+    key = f"pre:{PREPROCESS_VERSION}:{minified_settings}:{file_ext}:{digest}"
+    ast_key = f"ast:{AST_FEATURES_VERSION}:{AST_NGRAM_SIZE}:{minified_settings}:{digest}"
+    result = cache.get(key)
+    ast = cache.get(ast_key) if want_ast else None
+
+    if result is None or (want_ast and ast is None):
+        if raw is None and minified is None:
+            raw, minified = read_source_bytes(file_path)
+        if minified is not None:
+            if result is None:
+                result = minified_file_metrics(minified['loc'])
+                cache.put(key, digest, result)
+            if want_ast and ast is None:
+                ast = empty_ast
+                cache.put(ast_key, digest, ast)
+        else:
+            content = decode_source(raw)
+            if result is None:
+                result = compute_file_metrics(content, file_ext)
+                cache.put(key, digest, result)
+            if want_ast and ast is None:
+                ast = empty_ast if result['minified'] else ast_file_features(content)
+                cache.put(ast_key, digest, ast)
+
+    if want_ast:
+        result['ast'] = ast
+    if raw is not None:
+        result['bytes_read'] = len(raw)
+    else:
+        result['bytes_read'] = minified['bytes_read'] if minified is not None else 0
+    return result
+
+
+class SpilledCode:
+    """
+    Preprocessed files of one project, kept in a file on disk instead of a list.
+
+    Stands in for the all_code list: supports append, len, iteration and
+    indexing/slicing, and reads records back one at a time so only the file
+    being processed is in memory. Records are UTF-8 with an 8-byte length
+    prefix; the offset of every record is kept, so indexing seeks straight
+    to it. Pickling keeps the path and the offsets (8 bytes per file), so
+    results from worker processes stay small.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Spill file (truncated on the first append)
+        """
+        self.path = path
+        self.count = 0
+        self.offsets = array('Q')
+        self._file = None
+
+    def append(self, code: str) -> None:
+        """Write one preprocessed file to the end of the spill file."""
+        if self._file is None:
+            self._file = open(self.path, 'wb')
+        self.offsets.append(self._file.tell())
+        data = code.encode('utf-8')
+        self._file.write(len(data).to_bytes(8, 'little'))
+        self._file.write(data)
+        self.count += 1
+
+    def close(self) -> None:
+        """Flush and close the spill file after the last append."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[str]:
+        if not self.count:
+            return
+        with open(self.path, 'rb') as f:
+            for _ in range(self.count):
+                size = int.from_bytes(f.read(8), 'little')
+                yield f.read(size).decode('utf-8')
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.count)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            if start >= stop:
+                return []
+            with open(self.path, 'rb') as f:
+                f.seek(self.offsets[start])
+                return [f.read(int.from_bytes(f.read(8), 'little')).decode('utf-8')
+                        for _ in range(stop - start)]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('SpilledCode index out of range')
+        with open(self.path, 'rb') as f:
+            f.seek(self.offsets[index])
+            return f.read(int.from_bytes(f.read(8), 'little')).decode('utf-8')
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        state['_file'] = None
+        return state
+
+
+def analyze_project(project_path: str, cache_path: Optional[str] = None) -> Dict:
+    """
+    Analyze a project directory and extract metrics.
+
+    Args:
+        project_path: Path to project directory
+        cache_path: Optional path of the persistent preprocessing cache
+
+    Returns:
+        Dictionary containing project metrics
+    """
+    start_time = time.perf_counter()
+    metrics = {
+        'name': os.path.basename(project_path),
+        'total_files': 0,
+        'total_folders': 0,
+        'loc': 0,
+        'react_components': 0,
+        'express_routes': 0,
+        'mongoose_models': 0,
+        'api_routes': [],  # Distinct 'METHOD /path' strings of all Express routes
+        'schema_fields': [],  # Distinct 'field:type' strings of all Mongoose schemas
+        'bytes_read': 0,  # Each file is read from disk at most once
+        'cache_hits': 0,
+        'cache_misses': 0,
+        'ast_ngrams': {},  # Node-type n-gram histogram (AST structural backend only)
+        'ast_parse_errors': 0,
+        'minified_files': 0,  # Rejected by the minification check (streamed head or whole file)
+        'skipped_dirs': 0,  # Pruned by the path rules without being walked
+        'skipped_files': 0,  # Source files excluded by the path rules or size cap
+        'skipped_bytes': 0,
+        'files_by_type': {ext: 0 for ext in VALID_EXTENSIONS},
+        'all_code': [],  # Store all preprocessed code for similarity analysis
+        'code_files': []  # Project-relative path of each all_code entry
+    }
+
+    if SPILL_PREPROCESSED:
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        metrics['all_code'] = SpilledCode(os.path.join(SPILL_DIR, f"{metrics['name']}.bin"))
+
+    cache = PreprocessCache(cache_path) if cache_path else None
+    rules = project_path_rules(metrics['name'])
+    skipped = {}
+    api_routes, schema_fields = set(), set()
+
+    for root, dir_count, files in walk_project(project_path, rules, VALID_EXTENSIONS, skipped):
+        metrics['total_folders'] += dir_count
+
+        for file_path, file_ext in files:
+            metrics['total_files'] += 1
+            metrics['files_by_type'][file_ext] += 1
+
+            try:
+                scan = scan_file(file_path, file_ext, cache)
+            except Exception as e:
+                continue
+
+            metrics['bytes_read'] += scan['bytes_read']
+            metrics['loc'] += scan['loc']
+            metrics['minified_files'] += scan['minified']
+
+            # Store preprocessed code
+            if scan['preprocessed']:
+                metrics['all_code'].append(scan['preprocessed'])
+                metrics['code_files'].append(os.path.relpath(file_path, project_path).replace(os.sep, '/'))
+
+            metrics['react_components'] += scan['react_components']
+            metrics['express_routes'] += scan['express_routes']
+            metrics['mongoose_models'] += scan['mongoose_models']
+            api_routes.update(f'{method} {path}' for method, path in scan['routes'])
+            for schema in scan['schemas']:
+                schema_fields.update(schema)
+
+            if 'ast' in scan:
+                ast_ngrams = metrics['ast_ngrams']
+                for ngram, count in scan['ast']['node_ngrams'].items():
+                    ast_ngrams[ngram] = ast_ngrams.get(ngram, 0) + count
+                metrics['ast_parse_errors'] += scan['ast']['parse_error']
+
+    if SPILL_PREPROCESSED:
+        metrics['all_code'].close()
+
+    metrics['api_routes'] = sorted(api_routes)
+    metrics['schema_fields'] = sorted(schema_fields)
+    metrics['skipped_dirs'] = skipped['dirs']
+    metrics['skipped_files'] = skipped['files']
+    metrics['skipped_bytes'] = skipped['bytes']
+
+    if cache is not None:
+        metrics['cache_hits'] = cache.hits
+        metrics['cache_misses'] = cache.misses
+        cache.close()
+
+    metrics['analysis_time'] = time.perf_counter() - start_time
+    return metrics
+
+
+def create_process_pool(workers: int, initializer: Optional[Callable] = None,
+                        initargs: Tuple = ()) -> Optional[ProcessPoolExecutor]:
+    """
+    Create a process pool, or return None when work should run serially.
+
+    Args:
+        workers: Number of worker processes (1 = serial)
+        initializer: Optional callable run once in every worker
+        initargs: Arguments for the initializer
+
+    Returns:
+        ProcessPoolExecutor, or None if workers <= 1 or fork is unavailable
+    """
+    # Functions defined in a notebook (or a flattened notebook script) can only
+    # be shipped to workers by reference under the fork start method
+    if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+
+    context = multiprocessing.get_context('fork')
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=initializer, initargs=initargs)
+
+
+def analyze_projects(project_paths: List[str], workers: int = 1,
+                     cache_path: Optional[str] = None) -> List[Dict]:
+    """
+    Analyze several projects, optionally fanning them out over a process pool.
+
+    Args:
+        project_paths: Paths to project directories
+        workers: Number of worker processes (1 = serial)
+        cache_path: Optional path of the persistent preprocessing cache
+
+    Returns:
+        List of project metric dictionaries, in the same order as project_paths
+    """
+    analyze = partial(analyze_project, cache_path=cache_path)
+
+    executor = create_process_pool(min(workers, len(project_paths)))
+    if executor is None:
+        return [analyze(path) for path in project_paths]
+
+    with executor:
+        # map() yields results in submission order, keeping the output deterministic
+        return list(executor.map(analyze, project_paths))
+
+
+print("✓ Project analysis functions defined")
+
+
+# ### 2.5 Analyze All Projects
+
+# In[ ]:
+
+
+def analyze_all_projects(project_dirs: List[str]) -> Tuple[List[Dict], Optional[Dict]]:
+    """
+    Analyze every project folder and report per-project and total statistics.
+
+    Args:
+        project_dirs: Project folder names inside PROJECTS_DIR
+
+    Returns:
+        Tuple of (metrics per project, preprocessing cache statistics or None
+        when the cache is disabled)
+    """
+    if not project_dirs:
+        print("⚠ No projects to analyze. Please add projects to 'projects/' directory.")
+        return [], None
+
+    print(f"Analyzing projects ({ANALYSIS_WORKERS} worker(s))...\n")
+    analysis_start = time.perf_counter()
+    project_paths = [os.path.join(PROJECTS_DIR, proj_name) for proj_name in project_dirs]
+    with pipeline_profiler.stage('analyze_projects'):
+        project_metrics = analyze_projects(project_paths, workers=ANALYSIS_WORKERS,
+                                           cache_path=PREPROCESS_CACHE_PATH)
+    analysis_wall_time = time.perf_counter() - analysis_start
+    # analyze_project runs in the workers; record the per-project times they report
+    pipeline_profiler.record('analyze_project', sum(m['analysis_time'] for m in project_metrics),
+                             calls=len(project_metrics))
+
+    cache_stats = None
+    if PREPROCESS_CACHE_PATH:
+        cache = PreprocessCache(PREPROCESS_CACHE_PATH)
+        cache_stats = {'hits': sum(m['cache_hits'] for m in project_metrics),
+                       'misses': sum(m['cache_misses'] for m in project_metrics),
+                       'evicted': cache.evict(PREPROCESS_CACHE_MAX_BYTES)}
+        cache_stats['size'] = cache.total_size()
+        cache.close()
+
+    for metrics in project_metrics:
+        print(f"Analyzed: {metrics['name']} ({metrics['analysis_time']:.2f}s)")
+        print(f"  Files: {metrics['total_files']}, LOC: {metrics['loc']}, "
+              f"Components: {metrics['react_components']}, Routes: {metrics['express_routes']}, "
+              f"Read: {metrics['bytes_read'] / 1024:.1f} KB")
+        if metrics['skipped_files'] or metrics['skipped_dirs']:
+            print(f"  Skipped: {metrics['skipped_files']} files ({metrics['skipped_bytes'] / 1024:.1f} KB), "
+                  f"{metrics['skipped_dirs']} folders by path rules")
+
+    total_files = sum(m['total_files'] for m in project_metrics)
+    total_bytes = sum(m['bytes_read'] for m in project_metrics)
+    print(f"\n✓ Analyzed {len(project_metrics)} projects")
+    print(f"  Read {total_bytes / (1024 * 1024):.2f} MB from {total_files} files (at most one read per file)")
+    print(f"  Skipped {sum(m['skipped_files'] for m in project_metrics)} files "
+          f"({sum(m['skipped_bytes'] for m in project_metrics) / (1024 * 1024):.2f} MB) and "
+          f"{sum(m['skipped_dirs'] for m in project_metrics)} folders by path rules")
+    print(f"  Wall time: {analysis_wall_time:.2f}s "
+          f"(sum of per-project times: {sum(m['analysis_time'] for m in project_metrics):.2f}s)")
+    if cache_stats:
+        print(f"  Preprocessing cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    return project_metrics, cache_stats
+
+
+# ### 2.6 Generate Preprocessing Summary
+
+# In[ ]:
+
+
+def summarize_projects(project_metrics: List[Dict]) -> pd.DataFrame:
+    """
+    Save and display the per-project preprocessing summary.
+
+    Args:
+        project_metrics: Metrics of every analyzed project
+
+    Returns:
+        Summary table, one row per project
+    """
+    import pandas as pd
+
+    # Create summary DataFrame
+    summary_data = []
+    for m in project_metrics:
+        summary_data.append({
+            'Project': m['name'],
+            'Total Files': m['total_files'],
+            'Total Folders': m['total_folders'],
+            'Lines of Code': m['loc'],
+            'React Components': m['react_components'],
+            'Express Routes': m['express_routes'],
+            'Mongoose Models': m['mongoose_models'],
+            'JS Files': m['files_by_type'].get('.js', 0),
+            'JSX Files': m['files_by_type'].get('.jsx', 0),
+            'JSON Files': m['files_by_type'].get('.json', 0),
+            'CSS Files': m['files_by_type'].get('.css', 0),
+            'Minified Files': m['minified_files'],
+            'Skipped Files': m['skipped_files'],
+            'Skipped KB': round(m['skipped_bytes'] / 1024, 1),
+            'Skipped Folders': m['skipped_dirs'],
+            'Analysis Time (s)': round(m['analysis_time'], 3),
+        })
+
+    summary_df = pd.DataFrame(summary_data)
+
+    # Save to CSV
+    summary_df.to_csv(os.path.join(RESULTS_DIR, 'preprocessing_summary.csv'), index=False)
+
+    # Display summary
+    print("\n=== PROJECT SUMMARY ===")
+    print(summary_df.to_string(index=False))
+
+    # Statistics
+    print("\n=== STATISTICS ===")
+    print(summary_df.describe())
+
+    print(f"\n✓ Saved preprocessing summary to {RESULTS_DIR}/preprocessing_summary.csv")
+    return summary_df
+
+
+# In[ ]:
+
+
+def benchmark_comment_stripping(project_paths: List[str], repeat: int = 3) -> pd.DataFrame:
+    """
+    Measure comment stripping throughput (MB/s) over every JS/JSX file.
+
+    Args:
+        project_paths: Paths to project directories
+        repeat: Passes over the corpus per implementation (best pass is reported)
+
+    Returns:
+        DataFrame with time and throughput per implementation
+    """
+    import pandas as pd
+
+    sources = []
+    for project_path in project_paths:
+        rules = project_path_rules(os.path.basename(project_path))
+        for _, _, files in walk_project(project_path, rules, ('.js', '.jsx')):
+            for file_path, _ in files:
+                sources.append(read_source_file(file_path)[0])
+
+    megabytes = sum(len(code.encode('utf-8')) for code in sources) / (1024 * 1024)
+    rows = []
+    strategies = [
+        ('Two-pass regex', _remove_js_comments_regex),
+        ('Single-pass scanner (comments)', partial(remove_js_comments, strip_console=False)),
+        ('Single-pass scanner (comments + console)', remove_js_comments),
+    ]
+    for name, strip in strategies:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for code in sources:
+                strip(code)
+            best = min(best, time.perf_counter() - start)
+        rows.append({
+            'Implementation': name,
+            'Files': len(sources),
+            'MB': round(megabytes, 2),
+            'Time (s)': round(best, 3),
+            'MB/s': round(megabytes / best, 1) if best else float('inf'),
+        })
+
+    return pd.DataFrame(rows)
+
+
+def run_preprocess_stage(project_dirs: List[str]) -> Tuple[List[Dict], Optional[Dict]]:
+    """
+    Part A: analyze the projects, write the summary and run the optional benchmark.
+
+    Args:
+        project_dirs: Project folder names inside PROJECTS_DIR
+
+    Returns:
+        Tuple of (metrics per project, preprocessing cache statistics or None)
+    """
+    project_metrics, cache_stats = analyze_all_projects(project_dirs)
+    if project_metrics:
+        summarize_projects(project_metrics)
+
+    # Optional: comment stripping benchmark (enable RUN_BENCHMARKS in the configuration)
+    if project_dirs and RUN_BENCHMARKS:
+        print("Benchmarking comment stripping...")
+        comment_benchmark = benchmark_comment_stripping(
+            [os.path.join(PROJECTS_DIR, proj_name) for proj_name in project_dirs])
+        print(comment_benchmark.to_string(index=False))
+
+    return project_metrics, cache_stats
+
+
+# ## 3. Part B: Similarity Computation <a name="part-b"></a>
+# 
+# ### 3.1 Similarity Storage and Incremental Updates
+# 
+# Similarity matrices are symmetric, so only the upper triangle (without the diagonal)
+# is stored, row by row, as a flat `MATRIX_DTYPE` array in `<metric>_similarity_condensed.npy`.
+# A small JSON header next to it (`<metric>_similarity_condensed.json`) records the project
+# names, the diagonal and the dtype. The array is opened with `np.load(mmap_mode='r')`, so
+# matrices larger than RAM can be queried. Full `.npy` and CSV copies are only written when
+# listed in `MATRIX_FORMATS`.
+# 
+# Every similarity metric is "vectorize each project, then compare the vectors".
+# In incremental mode (`INCREMENTAL_SIMILARITY`, off by default), when a team submits
+# late, only the rows and columns of new or changed projects are recomputed: the fitted
+# model (TF-IDF vocabulary, feature scaler) and the per-project vectors of the previous
+# run are kept in `results/similarity_state/`.
+# 
+# Note: the fitted model is frozen during incremental updates, so new projects are
+# vectorized with the previous TF-IDF vocabulary/IDF weights and feature scaling.
+# A full refit happens when no state exists, the settings that shape the vectors
+# changed, or too many projects changed.
+
+# In[ ]:
+
+
+class CondensedSimilarity:
+    """
+    Symmetric similarity matrix stored as its flattened upper triangle.
+
+    Entry (i, j) with i < j lives at position i*n - i*(i+1)/2 + (j - i - 1),
+    the same row-major order as scipy's squareform. The values may be a
+    read-only memory map.
+    """
+
+    def __init__(self, values: np.ndarray, names: List[str], diagonal: np.ndarray):
+        """
+        Args:
+            values: Upper-triangle values, n*(n-1)/2 entries
+            names: Project name of each row/column
+            diagonal: Self-similarity of each project
+        """
+        self.values = values
+        self.names = list(names)
+        self.diagonal = np.asarray(diagonal, dtype=np.float64)
+        n = len(self.names)
+        self.shape = (n, n)
+        # Position of entry (i, i + 1) for every row
+        rows = np.arange(n, dtype=np.int64)
+        self.row_starts = rows * n - rows * (rows + 1) // 2
+
+    def pairs(self, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Map condensed positions back to (i, j) index arrays."""
+        rows = np.searchsorted(self.row_starts, positions, side='right') - 1
+        return rows, positions - self.row_starts[rows] + rows + 1
+
+    def __getitem__(self, index: Tuple[int, int]) -> float:
+        i, j = index
+        if i == j:
+            return float(self.diagonal[i])
+        i, j = min(i, j), max(i, j)
+        return float(self.values[self.row_starts[i] + j - i - 1])
+
+    def row(self, i: int) -> np.ndarray:
+        """Similarities of project i to every project."""
+        n = self.shape[0]
+        others = np.arange(n)
+        lower, upper = others[:i], others[i + 1:]
+        result = np.empty(n)
+        result[:i] = self.values[self.row_starts[lower] + i - lower - 1]
+        result[i] = self.diagonal[i]
+        result[i + 1:] = self.values[self.row_starts[i]:self.row_starts[i] + len(upper)]
+        return result
+
+    def to_dense(self) -> np.ndarray:
+        """Expand into a full NxN float64 matrix."""
+        n = self.shape[0]
+        dense = np.diag(self.diagonal)
+        dense[np.triu_indices(n, 1)] = self.values
+        return dense + np.triu(dense, 1).T
+
+
+def save_similarity_matrix(similarity_matrix: np.ndarray, project_names: List[str], metric_name: str,
+                           formats: Optional[Tuple[str, ...]] = None, dtype: Optional[str] = None) -> None:
+    """
+    Save a similarity matrix in the configured formats.
+
+    The condensed array is written row by row into a memory-mapped .npy file,
+    so no second copy of the matrix is built.
+
+    Args:
+        similarity_matrix: NxN similarity matrix
+        project_names: Name of each row/column
+        metric_name: Matrix name, e.g. 'textual'
+        formats: Any of 'condensed', 'npy', 'csv' (default: MATRIX_FORMATS)
+        dtype: Storage dtype of the condensed values (default: MATRIX_DTYPE)
+    """
+    formats = MATRIX_FORMATS if formats is None else formats
+    dtype = MATRIX_DTYPE if dtype is None else dtype
+    import pandas as pd
+
+    n = similarity_matrix.shape[0]
+    if 'condensed' in formats:
+        base = os.path.join(RESULTS_DIR, f'{metric_name}_similarity_condensed')
+        values = np.lib.format.open_memmap(f'{base}.npy', mode='w+', dtype=dtype,
+                                           shape=(n * (n - 1) // 2,))
+        position = 0
+        for i in range(n - 1):
+            values[position:position + n - i - 1] = similarity_matrix[i, i + 1:]
+            position += n - i - 1
+        values.flush()
+        del values
+        with open(f'{base}.json', 'w') as f:
+            json.dump({'format': 'condensed-upper-triangle', 'n': n, 'dtype': dtype,
+                       'names': list(project_names),
+                       'diagonal': [float(v) for v in np.diagonal(similarity_matrix)]}, f)
+    if 'npy' in formats:
+        np.save(os.path.join(RESULTS_DIR, f'{metric_name}_similarity_matrix.npy'), similarity_matrix)
+    if 'csv' in formats:
+        pd.DataFrame(similarity_matrix, index=project_names, columns=project_names).to_csv(
+            os.path.join(RESULTS_DIR, f'{metric_name}_similarity_matrix.csv'))
+
+
+def load_similarity_matrix(metric_name: str, mmap: bool = True) -> CondensedSimilarity:
+    """
+    Open a condensed similarity matrix written by save_similarity_matrix.
+
+    Args:
+        metric_name: Matrix name, e.g. 'textual'
+        mmap: Memory-map the values instead of reading them into RAM
+
+    Returns:
+        CondensedSimilarity over the stored values
+    """
+    base = os.path.join(RESULTS_DIR, f'{metric_name}_similarity_condensed')
+    with open(f'{base}.json') as f:
+        header = json.load(f)
+    values = np.load(f'{base}.npy', mmap_mode='r' if mmap else None)
+    return CondensedSimilarity(values, header['names'], header['diagonal'])
+
+
+def project_fingerprint(metrics: Dict) -> str:
+    """
+    Hash everything a similarity metric may read from a project.
+
+    Args:
+        metrics: Project metric dictionary
+
+    Returns:
+        Hex digest that changes whenever the project's code or counts change
+    """
+    digest = hashlib.sha256()
+    counts = {k: v for k, v in metrics.items()
+              if k not in ('all_code', 'analysis_time', 'bytes_read', 'cache_hits', 'cache_misses')}
+    digest.update(json.dumps(counts, sort_keys=True).encode('utf-8'))
+    for code in metrics['all_code']:
+        digest.update(code.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def stack_vectors(blocks: List[Any]):
+    """Stack dense or sparse row blocks into one matrix."""
+    from scipy import sparse
+    if any(sparse.issparse(block) for block in blocks):
+        return sparse.vstack(blocks, format='csr')
+    return np.vstack(blocks)
+
+
+def update_similarity_incrementally(metric_name: str, project_metrics: List[Dict],
+                                    transform: Callable[[Any, List[Dict]], Any],
+                                    fit_model: Optional[Callable[[List[Dict]], Any]] = None,
+                                    pairwise: Optional[Callable] = None,
+                                    state_name: Optional[str] = None,
+                                    settings: Optional[Dict] = None) -> np.ndarray:
+    """
+    Update a saved similarity matrix, recomputing only new or changed projects.
+
+    The previous matrix is kept in full precision in the saved state, so
+    updates do not depend on the (possibly float16) result files. The state
+    also records the settings that produced its vectors; a state saved with
+    other settings is refit from scratch.
+
+    Args:
+        metric_name: Matrix name, e.g. 'textual'
+        project_metrics: List of project metric dictionaries
+        transform: Maps (fitted model, project metrics) to one vector row per project
+        fit_model: Fits the model on all projects (None for metrics without a model)
+        pairwise: Similarity between two row sets (None = cosine similarity)
+        state_name: Name of the saved state (defaults to metric_name)
+        settings: JSON-serializable configuration the vectors depend on
+
+    Returns:
+        NxN similarity matrix in project_metrics order
+    """
+    if pairwise is None:
+        from sklearn.metrics.pairwise import cosine_similarity as pairwise
+
+    names = [m['name'] for m in project_metrics]
+    fingerprints = [project_fingerprint(m) for m in project_metrics]
+    state_path = os.path.join(SIMILARITY_STATE_DIR, f'{state_name or metric_name}_state.pkl')
+    signature = json.dumps({'version': SIMILARITY_STATE_VERSION, **(settings or {})}, sort_keys=True)
+
+    state = None
+    if os.path.exists(state_path):
+        with open(state_path, 'rb') as f:
+            state = pickle.load(f)
+        # States written with other settings (or before settings were recorded)
+        if state.get('settings') != signature:
+            print(f"  Saved {metric_name} state was built with other settings; refitting")
+            state = None
+        else:
+            old_matrix = state['matrix']
+
+    if state is not None:
+        old_index = {name: i for i, name in enumerate(state['names'])}
+        stale = [i for i, (name, fp) in enumerate(zip(names, fingerprints))
+                 if name not in old_index or state['fingerprints'][old_index[name]] != fp]
+        if len(stale) > INCREMENTAL_MAX_STALE_FRACTION * len(names):
+            state = None
+
+    if state is None:
+        print(f"  Full {metric_name} similarity computation ({len(names)} projects)")
+        model = fit_model(project_metrics) if fit_model else None
+        vectors = transform(model, project_metrics)
+        similarity_matrix = pairwise(vectors, vectors)
+    else:
+        print(f"  Incremental {metric_name} similarity update: "
+              f"{len(stale)} of {len(names)} projects recomputed")
+        model = state['model']
+        stale_set = set(stale)
+        fresh = iter(transform(model, [project_metrics[i] for i in stale])) if stale else iter([])
+
+        # Reuse stored vectors and pairwise scores for unchanged projects
+        fresh_rows = {i: next(fresh) for i in stale}
+        rows = [fresh_rows[i] if i in stale_set else state['vectors'][old_index[name]]
+                for i, name in enumerate(names)]
+        vectors = stack_vectors(rows)
+
+        kept = [i for i in range(len(names)) if i not in stale_set]
+        kept_old = [old_index[names[i]] for i in kept]
+        similarity_matrix = np.zeros((len(names), len(names)))
+        similarity_matrix[np.ix_(kept, kept)] = old_matrix[np.ix_(kept_old, kept_old)]
+        if stale:
+            stale_rows = pairwise(vectors[stale], vectors)
+            similarity_matrix[stale, :] = stale_rows
+            similarity_matrix[:, stale] = stale_rows.T
+
+    os.makedirs(SIMILARITY_STATE_DIR, exist_ok=True)
+    with open(state_path, 'wb') as f:
+        pickle.dump({'names': names, 'fingerprints': fingerprints, 'settings': signature,
+                     'model': model, 'vectors': vectors, 'matrix': similarity_matrix}, f)
+
+    return similarity_matrix
+
+
+print("✓ Incremental similarity functions defined")
+
+
+# ### 3.2 Textual Similarity
+
+# In[ ]:
+
+
+def get_project_texts(project_metrics: List[Dict]) -> Iterator[str]:
+    """
+    Combine all preprocessed code of each project into one document.
+
+    A generator, so vectorizers build one project document at a time instead
+    of holding the documents of the whole corpus.
+    """
+    for metrics in project_metrics:
+        yield ' '.join(metrics['all_code'])
+
+
+def fit_textual_model(project_metrics: List[Dict]) -> TfidfVectorizer:
+    """
+    Fit the TF-IDF vectorizer used for textual similarity.
+
+    Args:
+        project_metrics: List of project metric dictionaries
+
+    Returns:
+        Fitted TfidfVectorizer
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer(
+        max_features=5000,
+        ngram_range=(1, 2),  # Use unigrams and bigrams
+        min_df=1
+    )
+    return vectorizer.fit(get_project_texts(project_metrics))
+
+
+def fit_hashing_textual_model(project_metrics: List[Dict], batch_size: Optional[int] = None):
+    """
+    Fit the hashing TF-IDF model (HashingVectorizer -> TfidfTransformer).
+
+    The hasher needs no vocabulary, so memory does not grow with the corpus.
+    Document frequencies are accumulated over batches of projects and turned
+    into the same smoothed IDF weights TfidfVectorizer uses. New projects are
+    transformed with the stored weights; their unseen n-grams still get
+    features.
+
+    Args:
+        project_metrics: List of project metric dictionaries
+        batch_size: Projects hashed at a time (default: HASHING_BATCH_SIZE)
+
+    Returns:
+        Fitted scikit-learn Pipeline
+    """
+    if batch_size is None:
+        batch_size = HASHING_BATCH_SIZE
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+    from sklearn.pipeline import make_pipeline
+
+    hasher = HashingVectorizer(
+        n_features=HASHING_FEATURES,
+        ngram_range=(1, 2),  # Same unigrams and bigrams as the TF-IDF backend
+        alternate_sign=False,
+        norm=None
+    )
+    document_frequency = np.zeros(HASHING_FEATURES, dtype=np.int32)
+    n_documents = 0
+    for start in range(0, len(project_metrics), batch_size):
+        counts = hasher.transform(get_project_texts(project_metrics[start:start + batch_size]))
+        document_frequency += np.bincount(counts.indices, minlength=HASHING_FEATURES)
+        n_documents += counts.shape[0]
+
+    transformer = TfidfTransformer()
+    transformer.idf_ = np.log((1 + n_documents) / (1 + document_frequency)) + 1
+    return make_pipeline(hasher, transformer)
+
+
+def textual_vectors(vectorizer, project_metrics: List[Dict]):
+    """TF-IDF vector of each project (sparse, one row per project)."""
+    return vectorizer.transform(get_project_texts(project_metrics))
+
+
+def textual_backend_model() -> Callable[[List[Dict]], Any]:
+    """Model fitting function of the configured textual backend."""
+    return {'tfidf': fit_textual_model, 'hashing': fit_hashing_textual_model}[TEXTUAL_BACKEND]
+
+
+def textual_backend_label() -> str:
+    """Display name of the configured textual backend."""
+    return {'tfidf': 'TF-IDF', 'hashing': 'Hashed TF-IDF'}[TEXTUAL_BACKEND]
+
+
+def compute_textual_similarity(project_metrics: List[Dict]) -> np.ndarray:
+    """
+    Compute textual similarity using TF-IDF and cosine similarity.
+
+    Args:
+        project_metrics: List of project metric dictionaries
+
+    Returns:
+        NxN similarity matrix
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    # Compute TF-IDF vectors
+    vectorizer = textual_backend_model()(project_metrics)
+    tfidf_matrix = textual_vectors(vectorizer, project_metrics)
+
+    # Compute cosine similarity
+    similarity_matrix = cosine_similarity(tfidf_matrix)
+
+    return similarity_matrix
+
+
+def levenshtein_samples(project_metrics: List[Dict]) -> List[str]:
+    """
+    Sample a subset of each project's code for Levenshtein comparison.
+
+    Args:
+        project_metrics: List of project metric dictionaries
+
+    Returns:
+        One code sample per project
+    """
+    # Sample a subset of code for performance (first 10000 chars)
+    project_samples = []
+    for metrics in project_metrics:
+        combined = ''.join(metrics['all_code'][:100])  # First 100 files
+        sample = combined[:10000]  # First 10k characters
+        project_samples.append(sample)
+    return project_samples
+
+
+_levenshtein_worker_samples: List[str] = []
+
+
+def _init_levenshtein_worker(samples: List[str]) -> None:
+    """Give each worker process its own reference to the project samples."""
+    global _levenshtein_worker_samples
+    _levenshtein_worker_samples = samples
+
+
+def _levenshtein_ratio_chunk(pairs: List[Tuple[int, int]]) -> List[float]:
+    """Levenshtein ratios for a chunk of (i, j) sample index pairs."""
+    import Levenshtein
+
+    samples = _levenshtein_worker_samples
+    return [Levenshtein.ratio(samples[i], samples[j]) for i, j in pairs]
+
+
+def levenshtein_ratio_matrix(samples: List[str], workers: int = 1,
+                             chunk_size: Optional[int] = None) -> np.ndarray:
+    """
+    Pairwise Levenshtein ratio matrix computed on the upper triangle only.
+
+    Uses rapidfuzz's multithreaded cdist when available; otherwise the i < j
+    pairs are split into chunks and dispatched over a process pool.
+
+    Args:
+        samples: Strings to compare
+        workers: Number of worker threads/processes (1 = serial)
+        chunk_size: Pairs per process pool task (default: LEVENSHTEIN_CHUNK_SIZE)
+
+    Returns:
+        Symmetric NxN matrix with ones on the diagonal
+    """
+    if chunk_size is None:
+        chunk_size = LEVENSHTEIN_CHUNK_SIZE
+    n = len(samples)
+
+    try:
+        from rapidfuzz.distance import Indel
+        from rapidfuzz.process import cdist
+    except ImportError:
+        cdist = None
+
+    if cdist is not None:
+        # Levenshtein.ratio is the normalized Indel similarity
+        similarity_matrix = cdist(samples, samples, scorer=Indel.normalized_similarity,
+                                  dtype=np.float64, workers=workers)
+        np.fill_diagonal(similarity_matrix, 1.0)
+        return similarity_matrix
+
+    similarity_matrix = np.eye(n)
+    rows, cols = np.triu_indices(n, k=1)
+    pairs = list(zip(rows.tolist(), cols.tolist()))
+    chunks = [pairs[k:k + chunk_size] for k in range(0, len(pairs), chunk_size)]
+
+    executor = create_process_pool(min(workers, len(chunks)), _init_levenshtein_worker, (samples,))
+    if executor is None:
+        _init_levenshtein_worker(samples)
+        ratios = [_levenshtein_ratio_chunk(chunk) for chunk in chunks]
+    else:
+        with executor:
+            ratios = list(executor.map(_levenshtein_ratio_chunk, chunks))
+
+    values = np.fromiter((r for chunk in ratios for r in chunk), dtype=np.float64, count=len(pairs))
+    similarity_matrix[rows, cols] = values
+    similarity_matrix[cols, rows] = values  # Mirror into the lower triangle
+    return similarity_matrix
+
+
+def compute_levenshtein_similarity(project_metrics: List[Dict],
+                                   workers: Optional[int] = None) -> np.ndarray:
+    """
+    Compute token-level similarity using Levenshtein distance.
+
+    Args:
+        project_metrics: List of project metric dictionaries
+        workers: Number of worker threads/processes (default: ANALYSIS_WORKERS)
+
+    Returns:
+        NxN similarity matrix (normalized)
+    """
+    return levenshtein_ratio_matrix(levenshtein_samples(project_metrics),
+                                    workers=ANALYSIS_WORKERS if workers is None else workers)
+
+
+_JS_TOKEN_PATTERN = re.compile(
+    r"""(?P<str>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*'|`(?:[^`\\]|\\.)*`)"""
+    r"""|(?P<num>\b\d[\d_]*(?:\.\d+)?(?:[eE][+-]?\d+)?\b)"""
+    r"""|(?P<word>[A-Za-z_$][\w$]*)"""
+    r"""|(?P<op>[^\s\w])"""
+)
+
+# 2**32 + 15 is prime, so (a * x + b) mod p is a universal hash of 32-bit shingles
+_MINHASH_PRIME = np.uint64(4294967311)
+
+
+def tokenize_code(code: str) -> List[str]:
+    """
+    Split preprocessed code into normalized tokens.
+
+    String and numeric literals are replaced by placeholders so that shingles
+    capture code shape and identifiers rather than data.
+
+    Args:
+        code: Preprocessed source code
+
+    Returns:
+        List of tokens
+    """
+    tokens = []
+    for match in _JS_TOKEN_PATTERN.finditer(code):
+        kind = match.lastgroup
+        if kind == 'str':
+            tokens.append('<STR>')
+        elif kind == 'num':
+            tokens.append('<NUM>')
+        else:
+            tokens.append(match.group())
+    return tokens
+
+
+def rolling_hashes(token_hashes: np.ndarray, k: int) -> np.ndarray:
+    """
+    Polynomial hash of every run of k consecutive token hashes.
+
+    Args:
+        token_hashes: Hash of each token (uint64)
+        k: Tokens per run
+
+    Returns:
+        uint64 array of len(token_hashes) - k + 1 hashes (arithmetic wraps modulo 2**64)
+    """
+    hashes = np.zeros(len(token_hashes) - k + 1, dtype=np.uint64)
+    for offset in range(k):
+        hashes = hashes * np.uint64(1000003) + token_hashes[offset:offset + len(hashes)]
+    return hashes
+
+
+def _minhash_coefficients(num_perm: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Fixed random hash coefficients, identical across runs and processes."""
+    rng = np.random.RandomState(42)
+    a = rng.randint(1, 2 ** 32 - 1, size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, 2 ** 32 - 1, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_signature(code_files: List[str], shingle_size: Optional[int] = None,
+                      num_perm: Optional[int] = None, chunk_size: int = 8192) -> np.ndarray:
+    """
+    MinHash signature of all token shingles in a project.
+
+    Files are processed one at a time and shingles in bounded chunks, so time is
+    linear in project size and memory does not grow with it.
+
+    Args:
+        code_files: Preprocessed code of each file
+        shingle_size: Tokens per shingle (default: SHINGLE_SIZE)
+        num_perm: Number of hash permutations (default: MINHASH_PERMUTATIONS)
+        chunk_size: Shingles hashed per vectorized step
+
+    Returns:
+        Signature of shape (num_perm,); all max values if the project has no shingles
+    """
+    shingle_size = SHINGLE_SIZE if shingle_size is None else shingle_size
+    num_perm = MINHASH_PERMUTATIONS if num_perm is None else num_perm
+    a, b = _minhash_coefficients(num_perm)
+    signature = np.full(num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+    token_hashes: Dict[str, int] = {}
+
+    for code in code_files:
+        tokens = tokenize_code(code)
+        if len(tokens) < shingle_size:
+            continue
+
+        hashes = np.fromiter(
+            (token_hashes.setdefault(t, zlib.crc32(t.encode('utf-8'))) for t in tokens),
+            dtype=np.uint64, count=len(tokens)
+        )
+
+        # Polynomial rolling combination of k consecutive token hashes, kept to 32 bits
+        shingles = rolling_hashes(hashes, shingle_size)
+        # Duplicate shingles cannot change the minimum
+        shingles = np.unique(shingles & np.uint64(0xFFFFFFFF))
+
+        for start in range(0, len(shingles), chunk_size):
+            block = shingles[start:start + chunk_size]
+            permuted = (np.outer(a, block) + b[:, None]) % _MINHASH_PRIME
+            np.minimum(signature, permuted.min(axis=1), out=signature)
+
+    return signature
+
+
+def minhash_vectors(_, project_metrics: List[Dict]) -> np.ndarray:
+    """MinHash signature of each project (one row per project)."""
+    return np.array([minhash_signature(m['all_code']) for m in project_metrics])
+
+
+def minhash_similarity(signatures_a: np.ndarray, signatures_b: np.ndarray) -> np.ndarray:
+    """
+    Estimated Jaccard similarity between two sets of MinHash signatures.
+
+    Args:
+        signatures_a: Signatures of shape (M, num_perm)
+        signatures_b: Signatures of shape (N, num_perm)
+
+    Returns:
+        MxN matrix of the fraction of matching signature positions
+    """
+    empty = np.iinfo(np.uint64).max
+    similarity_matrix = np.array([(signatures_b == row).mean(axis=1) for row in signatures_a])
+    # Projects without any shingles share nothing with anyone
+    similarity_matrix[(signatures_a == empty).all(axis=1), :] = 0.0
+    similarity_matrix[:, (signatures_b == empty).all(axis=1)] = 0.0
+    return similarity_matrix.reshape(len(signatures_a), len(signatures_b))
+
+
+def compute_token_similarity(project_metrics: List[Dict]) -> np.ndarray:
+    """
+    Compute whole-project token similarity with MinHash over token shingles.
+
+    Unlike the Levenshtein sample, every file of every project is covered.
+
+    Args:
+        project_metrics: List of project metric dictionaries
+
+    Returns:
+        NxN matrix of estimated Jaccard similarities between shingle sets
+    """
+    signatures = minhash_vectors(None, project_metrics)
+    return minhash_similarity(signatures, signatures)
+
+
+def _levenshtein_similarity_full_loop(project_samples: List[str]) -> np.ndarray:
+    """Original full NxN Levenshtein loop, kept as the benchmark baseline."""
+    import Levenshtein
+
+    n = len(project_samples)
+    similarity_matrix = np.zeros((n, n))
+
+    # Compute pairwise Levenshtein similarity
+    for i in range(n):
+        for j in range(n):
+            if i == j:
+                similarity_matrix[i][j] = 1.0
+            else:
+                # Levenshtein ratio (0 to 1, where 1 is identical)
+                ratio = Levenshtein.ratio(project_samples[i], project_samples[j])
+                similarity_matrix[i][j] = ratio
+
+    return similarity_matrix
+
+
+def benchmark_levenshtein(project_metrics: List[Dict], sizes: Tuple[int, ...] = (18, 27, 100),
+                          workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Compare the original Levenshtein loop with the upper-triangle engine.
+
+    Corpora larger than the available projects are synthesized by rotating
+    real project samples, so every string stays distinct.
+
+    Args:
+        project_metrics: List of project metric dictionaries
+        sizes: Numbers of projects to benchmark
+        workers: Worker count for the batched engine (default: ANALYSIS_WORKERS)
+
+    Returns:
+        DataFrame with timings and speedup per corpus size
+    """
+    import pandas as pd
+
+    if workers is None:
+        workers = ANALYSIS_WORKERS
+
+    base = [sample for sample in levenshtein_samples(project_metrics) if sample]
+    rows = []
+
+    for n in sizes:
+        samples = []
+        for k in range(n):
+            sample = base[k % len(base)]
+            shift = (k // len(base)) * 997 % max(len(sample), 1)
+            samples.append(sample[shift:] + sample[:shift])
+
+        start = time.perf_counter()
+        reference = _levenshtein_similarity_full_loop(samples)
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = levenshtein_ratio_matrix(samples, workers=workers)
+        batched_time = time.perf_counter() - start
+
+        rows.append({
+            'N': n,
+            'Full loop (s)': round(loop_time, 3),
+            'Upper triangle (s)': round(batched_time, 3),
+            'Speedup': round(loop_time / batched_time, 1) if batched_time else float('inf'),
+            'Max abs diff': float(np.abs(reference - batched).max()),
+        })
+
+    return pd.DataFrame(rows)
+
+
+print("✓ Textual similarity functions defined")
+
+
+# In[ ]:
+
+
+def run_textual_stage(project_metrics: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Compute, save and preview the textual and token similarity matrices.
+
+    Args:
+        project_metrics: Metrics of every analyzed project
+
+    Returns:
+        {'textual': matrix, 'token': matrix}
+    """
+    import pandas as pd
+
+    print("Computing textual similarity...")
+
+    # TF-IDF based similarity
+    with pipeline_profiler.stage('compute_textual_similarity'):
+        if INCREMENTAL_SIMILARITY:
+            textual_similarity = update_similarity_incrementally(
+                'textual', project_metrics, textual_vectors, textual_backend_model(),
+                state_name=f'textual_{TEXTUAL_BACKEND}',
+                settings={'backend': TEXTUAL_BACKEND,
+                          'hashing_features': HASHING_FEATURES if TEXTUAL_BACKEND == 'hashing' else None})
+        else:
+            textual_similarity = compute_textual_similarity(project_metrics)
+    print(f"  {textual_backend_label()} similarity matrix: {textual_similarity.shape}")
+
+    # Save matrix
+    project_names = [m['name'] for m in project_metrics]
+    save_similarity_matrix(textual_similarity, project_names, 'textual')
+
+    print("✓ Textual similarity computed and saved")
+
+    # Show sample
+    print("\nSample (first 5x5):")
+    print(pd.DataFrame(textual_similarity[:5, :5], index=project_names[:5],
+                       columns=project_names[:5]).to_string())
+
+    # Whole-project token shingle similarity (MinHash)
+    with pipeline_profiler.stage('compute_token_similarity'):
+        if INCREMENTAL_SIMILARITY:
+            token_similarity = update_similarity_incrementally(
+                'token', project_metrics, minhash_vectors, pairwise=minhash_similarity,
+                settings={'shingle_size': SHINGLE_SIZE, 'permutations': MINHASH_PERMUTATIONS})
+        else:
+            token_similarity = compute_token_similarity(project_metrics)
+    print(f"  Token (MinHash) similarity matrix: {token_similarity.shape}")
+
+    save_similarity_matrix(token_similarity, project_names, 'token')
+
+    print("✓ Token similarity computed and saved")
+
+    # Optional: benchmark the Levenshtein engines (enable RUN_BENCHMARKS in the configuration)
+    if RUN_BENCHMARKS:
+        print("Benchmarking Levenshtein similarity...")
+        levenshtein_benchmark = benchmark_levenshtein(project_metrics)
+        print(levenshtein_benchmark.to_string(index=False))
+
+    return {'textual': textual_similarity, 'token': token_similarity}
+
+
+# ### 3.3 Structural Similarity
+
+# In[ ]:
+
+
+def fit_ast_structural_model(project_metrics: List[Dict]):
+    """
+    Fit the sparse AST n-gram vectorizer (DictVectorizer -> sublinear TF-IDF).
+
+    Args:
+        project_metrics: List of project metric dictionaries
+
+    Returns:
+        Fitted scikit-learn Pipeline
+    """
+    from sklearn.feature_extraction import DictVectorizer
+    from sklearn.feature_extraction.text import TfidfTransformer
+    from sklearn.pipeline import make_pipeline
+
+    model = make_pipeline(DictVectorizer(), TfidfTransformer(sublinear_tf=True))
+    return model.fit([m['ast_ngrams'] for m in project_metrics])
+
+
+def ast_structural_vectors(model, project_metrics: List[Dict]):
+    """Sparse AST n-gram vector of each project (one row per project)."""
+    return model.transform([m['ast_ngrams'] for m in project_metrics])
+
+
+def compute_ast_structural_similarity(project_metrics: List[Dict]) -> np.ndarray:
+    """
+    Compute structural similarity from AST node-type n-gram histograms.
+
+    Args:
+        project_metrics: List of project metric dictionaries (analyzed with
+            STRUCTURAL_BACKEND = 'ast')
+
+    Returns:
+        NxN similarity matrix
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    model = fit_ast_structural_model(project_metrics)
+    return cosine_similarity(ast_structural_vectors(model, project_metrics))
+
+
+def _traverse_ast_recursive(ast) -> List[str]:
+    """Previous recursive traversal collecting every node type, kept as benchmark baseline."""
+    import esprima
+
+    node_types = []
+
+    def traverse(node):
+        if isinstance(node, esprima.nodes.Node):
+            node_types.append(node.type or '')
+            for value in vars(node).values():
+                if isinstance(value, (esprima.nodes.Node, list)):
+                    traverse(value)
+        elif isinstance(node, list):
+            for item in node:
+                traverse(item)
+
+    traverse(ast)
+    return node_types
+
+
+def benchmark_ast_traversal(project_paths: List[str]) -> pd.DataFrame:
+    """
+    Measure AST traversal throughput (nodes/second) over the corpus.
+
+    Every JS/JSX file is parsed once up front; only the traversals are timed.
+
+    Args:
+        project_paths: Paths to project directories
+
+    Returns:
+        DataFrame with time and throughput per traversal strategy
+    """
+    import esprima
+    import pandas as pd
+
+    asts = []
+    for project_path in project_paths:
+        rules = project_path_rules(os.path.basename(project_path))
+        for _, _, files in walk_project(project_path, rules, ('.js', '.jsx')):
+            for file_path, _ in files:
+                content, _ = read_source_file(file_path)
+                try:
+                    asts.append(esprima.parseModule(content, {'jsx': True, 'tolerant': True}))
+                except Exception:
+                    continue
+
+    rows = []
+    strategies = [
+        ('Recursive (node_types list)', lambda ast: len(_traverse_ast_recursive(ast))),
+        ('Iterative stack (Counter)', lambda ast: sum(count_ast_nodes(ast, ngram_size=1)[0].values())),
+        (f'Iterative stack + {AST_NGRAM_SIZE}-gram paths',
+         lambda ast: sum(count_ast_nodes(ast)[0].values())),
+    ]
+    for name, traverse in strategies:
+        start = time.perf_counter()
+        nodes = 0
+        for ast in asts:
+            try:
+                nodes += traverse(ast)
+            except RecursionError:
+                continue
+        elapsed = time.perf_counter() - start
+        rows.append({
+            'Traversal': name,
+            'Files': len(asts),
+            'Nodes': nodes,
+            'Time (s)': round(elapsed, 3),
+            'Nodes/s': int(nodes / elapsed) if elapsed else 0,
+        })
+
+    return pd.DataFrame(rows)
+
+
+def structural_backend_label() -> str:
+    """Display name of the configured structural backend."""
+    return {'metrics': 'Project Metrics', 'ast': 'AST n-grams'}[STRUCTURAL_BACKEND]
+
+
+def structural_features(project_metrics: List[Dict]) -> np.ndarray:
+    """
+    Build the raw structural feature matrix (one row per project).
+
+    Args:
+        project_metrics: List of project metric dictionaries
+
+    Returns:
+        Feature matrix of shape (N, 7)
+    """
+    project_features = []
+
+    for metrics in project_metrics:
+        # Use metrics we already have
+        features = [
+            metrics['react_components'],
+            metrics['express_routes'],
+            metrics['mongoose_models'],
+            metrics['files_by_type'].get('.js', 0),
             metrics['files_by_type'].get('.jsx', 0),
             metrics['total_folders'],
             metrics['loc'] / 1000  # Normalize LOC
         ]
         project_features.append(features)
 
-    # Convert to numpy array
-    features_matrix = np.array(project_features)
+    # Convert to numpy array
+    return np.array(project_features)
+
+
+def fit_structural_model(project_metrics: List[Dict]):
+    """Fit the StandardScaler that normalizes structural features."""
+    from sklearn.preprocessing import StandardScaler
+    return StandardScaler().fit(structural_features(project_metrics))
+
+
+def structural_vectors(scaler, project_metrics: List[Dict]) -> np.ndarray:
+    """Normalized structural feature vector of each project."""
+    return scaler.transform(structural_features(project_metrics))
+
+
+def compute_structural_similarity(project_metrics: List[Dict]) -> np.ndarray:
+    """
+    Compute structural similarity based on AST features.
+
+    Args:
+        project_metrics: List of project metric dictionaries
+
+    Returns:
+        NxN similarity matrix
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    # Normalize features
+    scaler = fit_structural_model(project_metrics)
+    features_normalized = structural_vectors(scaler, project_metrics)
+
+    # Compute cosine similarity
+    similarity_matrix = cosine_similarity(features_normalized)
+
+    return similarity_matrix
+
+
+def hashed_item_vectors(item_lists: List[List[str]]):
+    """
+    Encode item sets as binary sparse rows over 20-bit hashes of the items.
+
+    The hash is stable across runs (blake2b, unlike the salted built-in
+    hash), so rows stay comparable with vectors saved by earlier runs. With
+    2**20 columns, collisions are negligible for a few thousand items per
+    project, and the column index stays small enough for sparse transposes.
+
+    Args:
+        item_lists: Distinct items of each set
+
+    Returns:
+        CSR matrix with one row per set and a 1 in the column of each item's hash
+    """
+    from scipy import sparse
+
+    columns = [np.array(sorted({int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=4).digest(),
+                                               'little') & 0xFFFFF for item in items}), dtype=np.int64)
+               for items in item_lists]
+    indptr = np.concatenate([[0], np.cumsum([len(c) for c in columns])])
+    indices = np.concatenate(columns) if columns else np.empty(0, dtype=np.int64)
+    return sparse.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(len(item_lists), 2 ** 20))
+
+
+def jaccard_similarity(vectors_a, vectors_b) -> np.ndarray:
+    """
+    Jaccard similarity between two sets of binary item rows.
+
+    Intersections come from one sparse product, so no Python-level set
+    operations are done per pair.
+
+    Args:
+        vectors_a: Binary rows of shape (M, D)
+        vectors_b: Binary rows of shape (N, D)
+
+    Returns:
+        MxN matrix of |A & B| / |A | B| (0 when both sets are empty)
+    """
+    intersection = (vectors_a @ vectors_b.T).toarray()
+    sizes_a = np.asarray(vectors_a.sum(axis=1)).reshape(-1, 1)
+    sizes_b = np.asarray(vectors_b.sum(axis=1)).reshape(1, -1)
+    union = sizes_a + sizes_b - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def route_vectors(_, project_metrics: List[Dict]):
+    """Hashed 'METHOD /path' route set of each project (one row per project)."""
+    return hashed_item_vectors([m['api_routes'] for m in project_metrics])
+
+
+def schema_vectors(_, project_metrics: List[Dict]):
+    """Hashed 'field:type' schema field set of each project (one row per project)."""
+    return hashed_item_vectors([m['schema_fields'] for m in project_metrics])
+
+
+def compute_route_similarity(project_metrics: List[Dict]) -> np.ndarray:
+    """
+    Compute Jaccard similarity between the projects' Express route sets.
+
+    Args:
+        project_metrics: List of project metric dictionaries
+
+    Returns:
+        NxN matrix; two projects exposing the same (method, path) routes score 1
+    """
+    vectors = route_vectors(None, project_metrics)
+    return jaccard_similarity(vectors, vectors)
+
+
+def compute_schema_similarity(project_metrics: List[Dict]) -> np.ndarray:
+    """
+    Compute Jaccard similarity between the projects' Mongoose schema field sets.
+
+    Args:
+        project_metrics: List of project metric dictionaries
+
+    Returns:
+        NxN matrix; two projects declaring the same field names and types score 1
+    """
+    vectors = schema_vectors(None, project_metrics)
+    return jaccard_similarity(vectors, vectors)
+
+
+print("✓ Structural similarity functions defined")
+
+
+# In[ ]:
+
+
+def run_structural_stage(project_metrics: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Compute, save and preview the structural, route and schema similarity matrices.
+
+    Args:
+        project_metrics: Metrics of every analyzed project
+
+    Returns:
+        {'structural': matrix, 'route': matrix, 'schema': matrix}
+    """
+    import pandas as pd
+
+    print("Computing structural similarity...")
+    project_names = [m['name'] for m in project_metrics]
+
+    if STRUCTURAL_BACKEND == 'ast':
+        parse_errors = sum(m['ast_parse_errors'] for m in project_metrics)
+        print(f"  AST n-gram backend ({parse_errors} JS/JSX files could not be parsed)")
+
+    with pipeline_profiler.stage('compute_structural_similarity'):
+        if INCREMENTAL_SIMILARITY and STRUCTURAL_BACKEND == 'ast':
+            structural_similarity = update_similarity_incrementally(
+                'structural', project_metrics, ast_structural_vectors, fit_ast_structural_model,
+                state_name='structural_ast',
+                settings={'ngram_size': AST_NGRAM_SIZE, 'features_version': AST_FEATURES_VERSION})
+        elif INCREMENTAL_SIMILARITY:
+            structural_similarity = update_similarity_incrementally(
+                'structural', project_metrics, structural_vectors, fit_structural_model,
+                settings={'backend': 'metrics'})
+        elif STRUCTURAL_BACKEND == 'ast':
+            structural_similarity = compute_ast_structural_similarity(project_metrics)
+        else:
+            structural_similarity = compute_structural_similarity(project_metrics)
+    print(f"  Structural similarity matrix: {structural_similarity.shape}")
+
+    # Save matrix
+    save_similarity_matrix(structural_similarity, project_names, 'structural')
+
+    print("✓ Structural similarity computed and saved")
+
+    # Show sample
+    print("\nSample (first 5x5):")
+    print(pd.DataFrame(structural_similarity[:5, :5], index=project_names[:5],
+                       columns=project_names[:5]).to_string())
+
+    # API surface: Jaccard similarity of Express routes and Mongoose schema fields
+    with pipeline_profiler.stage('compute_route_schema_similarity'):
+        if INCREMENTAL_SIMILARITY:
+            route_similarity = update_similarity_incrementally(
+                'route', project_metrics, route_vectors, pairwise=jaccard_similarity)
+            schema_similarity = update_similarity_incrementally(
+                'schema', project_metrics, schema_vectors, pairwise=jaccard_similarity)
+        else:
+            route_similarity = compute_route_similarity(project_metrics)
+            schema_similarity = compute_schema_similarity(project_metrics)
+    print(f"  Route similarity matrix: {route_similarity.shape} "
+          f"({sum(len(m['api_routes']) for m in project_metrics)} routes)")
+    print(f"  Schema similarity matrix: {schema_similarity.shape} "
+          f"({sum(len(m['schema_fields']) for m in project_metrics)} schema fields)")
+
+    save_similarity_matrix(route_similarity, project_names, 'route')
+    save_similarity_matrix(schema_similarity, project_names, 'schema')
+
+    print("✓ Route and schema similarity computed and saved")
+
+    # Optional: AST traversal micro-benchmark (enable RUN_BENCHMARKS in the configuration)
+    if RUN_BENCHMARKS:
+        print("Benchmarking AST traversal...")
+        ast_benchmark = benchmark_ast_traversal(
+            [os.path.join(PROJECTS_DIR, proj_name) for proj_name in project_names])
+        print(ast_benchmark.to_string(index=False))
+
+    return {'structural': structural_similarity, 'route': route_similarity, 'schema': schema_similarity}
+
+
+# ### 3.4 Semantic Similarity (CodeBERT or LSA)
+# 
+# Two interchangeable backends produce the same NxN matrix format, selected with
+# `SEMANTIC_BACKEND` in the configuration cell:
+# - `codebert`: CodeBERT embeddings (needs torch + transformers, slow on CPU)
+# - `lsa`: identifier and API-call bag-of-words reduced with truncated SVD
+#   (latent semantic analysis); scikit-learn only, runs in seconds
+
+# In[ ]:
+
+
+class CodeBertEmbedder:
+    """
+    CodeBERT embedding engine.
+
+    The model is loaded once and reused. Every file is split into chunks of up
+    to 512 tokens, chunks are embedded in padded batches under
+    torch.inference_mode, and the [CLS] embeddings are pooled (weighted by
+    token count) into file and project embeddings. File embeddings are cached
+    in the preprocessing cache keyed by content hash, so unchanged files are
+    never re-embedded.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, batch_size: Optional[int] = None,
+                 max_length: int = 512, max_chunks_per_file: Optional[int] = None,
+                 cache_path: Optional[str] = None):
+        # None: CODEBERT_MODEL, EMBEDDING_BATCH_SIZE, EMBEDDING_MAX_CHUNKS_PER_FILE when created
+        self.model_name = CODEBERT_MODEL if model_name is None else model_name
+        self.batch_size = EMBEDDING_BATCH_SIZE if batch_size is None else batch_size
+        self.max_length = max_length
+        self.max_chunks_per_file = (EMBEDDING_MAX_CHUNKS_PER_FILE if max_chunks_per_file is None
+                                    else max_chunks_per_file)
+        self.cache_path = cache_path  # None: PREPROCESS_CACHE_PATH at embedding time (follows --results-dir)
+        self.tokenizer = None
+        self.model = None
+        self.embedded_files = 0
+        self.cached_files = 0
+
+    def _load(self) -> None:
+        """Load tokenizer and model on first use."""
+        if self.model is not None:
+            return
+        from transformers import AutoTokenizer, AutoModel
+
+        print(f"  Loading {self.model_name}...")
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.model = AutoModel.from_pretrained(self.model_name)
+        self.model.eval()
+
+    def _chunk(self, code: str) -> List[List[int]]:
+        """Split a file into model-sized token id chunks (with special tokens)."""
+        ids = self.tokenizer(code, add_special_tokens=False, truncation=False,
+                             verbose=False)['input_ids']
+        window = self.max_length - 2
+        chunks = [ids[k:k + window] for k in range(0, len(ids), window)]
+        chunks = chunks[:self.max_chunks_per_file] or [[]]
+        cls_id, sep_id = self.tokenizer.cls_token_id, self.tokenizer.sep_token_id
+        return [[cls_id] + chunk + [sep_id] for chunk in chunks]
+
+    def _embed_chunks(self, chunks: List[List[int]]) -> np.ndarray:
+        """Embed token id chunks in padded batches, returning [CLS] vectors."""
+        import torch
+
+        # Sort by length so each batch pads to a similar size
+        order = sorted(range(len(chunks)), key=lambda k: len(chunks[k]))
+        embeddings = np.zeros((len(chunks), self.model.config.hidden_size), dtype=np.float32)
+
+        with torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                batch_idx = order[start:start + self.batch_size]
+                batch = self.tokenizer.pad({'input_ids': [chunks[k] for k in batch_idx]},
+                                           return_tensors='pt')
+                outputs = self.model(**batch)
+                # Use [CLS] token embedding
+                embeddings[batch_idx] = outputs.last_hidden_state[:, 0, :].float().numpy()
+
+        return embeddings
+
+    def embed_files(self, code_files: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Embed files, reusing cached embeddings for already seen content.
+
+        Args:
+            code_files: Preprocessed code of each file
+
+        Returns:
+            Tuple of (file embeddings of shape (F, hidden), token count per file)
+        """
+        cache_path = PREPROCESS_CACHE_PATH if self.cache_path is None else self.cache_path
+        cache = PreprocessCache(cache_path) if cache_path else None
+        results: List[Optional[Tuple[np.ndarray, int]]] = [None] * len(code_files)
+        pending = []
+
+        for i, code in enumerate(code_files):
+            digest = hashlib.sha256(code.encode('utf-8')).hexdigest()
+            key = f"emb:{self.model_name}:{self.max_length}:{self.max_chunks_per_file}:{digest}"
+            cached = cache.get(key) if cache else None
+            if cached is not None:
+                vector = np.frombuffer(base64.b64decode(cached['vector']), dtype=np.float32)
+                results[i] = (vector, cached['tokens'])
+                self.cached_files += 1
+            else:
+                pending.append((i, key, digest))
+
+        if pending:
+            self._load()
+            chunks, owners = [], []
+            for i, _, _ in pending:
+                file_chunks = self._chunk(code_files[i])
+                chunks.extend(file_chunks)
+                owners.extend([i] * len(file_chunks))
+
+            chunk_embeddings = self._embed_chunks(chunks)
+            weights = np.array([len(chunk) for chunk in chunks], dtype=np.float32)
+            owners = np.array(owners)
+
+            for i, key, digest in pending:
+                mask = owners == i
+                vector = np.average(chunk_embeddings[mask], axis=0, weights=weights[mask])
+                vector = vector.astype(np.float32)
+                tokens = int(weights[mask].sum())
+                results[i] = (vector, tokens)
+                if cache:
+                    cache.put(key, digest, {'vector': base64.b64encode(vector.tobytes()).decode('ascii'),
+                                            'tokens': tokens})
+            self.embedded_files += len(pending)
+
+        if cache:
+            cache.close()
+
+        vectors = np.array([vector for vector, _ in results])
+        tokens = np.array([count for _, count in results], dtype=np.float32)
+        return vectors, tokens
+
+    def embed_project(self, code_files: List[str]) -> np.ndarray:
+        """
+        Pool file embeddings into one project embedding (weighted by token count).
+
+        Args:
+            code_files: Preprocessed code of each file
+
+        Returns:
+            Project embedding vector
+        """
+        if not code_files:
+            self._load()
+            return np.zeros(self.model.config.hidden_size, dtype=np.float32)
+        vectors, tokens = self.embed_files(code_files)
+        return np.average(vectors, axis=0, weights=tokens)
+
+
+_code_embedder: Optional[CodeBertEmbedder] = None
+
+
+def get_code_embedder() -> CodeBertEmbedder:
+    """Shared embedder, so the model is loaded at most once per run."""
+    global _code_embedder
+    if _code_embedder is None:
+        _code_embedder = CodeBertEmbedder()
+    return _code_embedder
+
+
+def embed_projects(project_metrics: List[Dict]) -> np.ndarray:
+    """
+    Generate one CodeBERT embedding per project.
+
+    Args:
+        project_metrics: List of project metric dictionaries
+
+    Returns:
+        Embedding matrix of shape (N, 768)
+    """
+    embedder = get_code_embedder()
+    print("  Generating embeddings...")
+
+    # Generate embeddings for each project
+    embeddings = []
+
+    for i, metrics in enumerate(project_metrics):
+        embeddings.append(embedder.embed_project(metrics['all_code']))
+        print(f"    Project {i+1}/{len(project_metrics)} processed")
+
+    print(f"  Embedded {embedder.embedded_files} files, "
+          f"{embedder.cached_files} served from cache")
+
+    # Convert to numpy array
+    return np.array(embeddings)
+
+
+_JS_KEYWORDS = frozenset("""
+    async await break case catch class const continue debugger default delete do else
+    export extends false finally for from function if import in instanceof let new null
+    of return static super switch this throw true try typeof undefined var void while
+    with yield
+""".split())
+
+_IDENTIFIER_PATTERN = re.compile(r'[A-Za-z_$][\w$]*')
+_API_CALL_PATTERN = re.compile(r'([A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*)\s*\(')
+_SUBWORD_PATTERN = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+')
+
+
+def extract_semantic_terms(code: str) -> List[str]:
+    """
+    Extract identifier subwords and API calls from code.
+
+    camelCase / snake_case identifiers are split into lowercase subwords
+    (useState -> use, state) and every call site contributes its full dotted
+    name (call:axios.get), so terms carry meaning rather than syntax.
+
+    Args:
+        code: Preprocessed source code
+
+    Returns:
+        List of terms
+    """
+    terms = []
+    for identifier in _IDENTIFIER_PATTERN.findall(code):
+        if identifier in _JS_KEYWORDS:
+            continue
+        terms.extend(word.lower() for word in _SUBWORD_PATTERN.findall(identifier))
+    for call in _API_CALL_PATTERN.findall(code):
+        if call not in _JS_KEYWORDS:
+            terms.append(f"call:{call}")
+    return terms
+
+
+def fit_lsa_model(project_metrics: List[Dict]):
+    """
+    Fit the LSA pipeline (term TF-IDF -> truncated SVD -> L2 normalization).
+
+    Args:
+        project_metrics: List of project metric dictionaries
+
+    Returns:
+        Fitted scikit-learn Pipeline
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import Normalizer
+
+    vectorizer = TfidfVectorizer(analyzer=extract_semantic_terms, sublinear_tf=True, min_df=1)
+    term_matrix = vectorizer.fit_transform(get_project_texts(project_metrics))
+
+    # SVD needs fewer components than both projects and terms
+    n_components = max(1, min(LSA_COMPONENTS, term_matrix.shape[0] - 1, term_matrix.shape[1] - 1))
+    svd = TruncatedSVD(n_components=n_components, random_state=42)
+    svd.fit(term_matrix)
+
+    return make_pipeline(vectorizer, svd, Normalizer(copy=False))
+
+
+def lsa_vectors(model, project_metrics: List[Dict]) -> np.ndarray:
+    """LSA vector of each project (one row per project)."""
+    return model.transform(get_project_texts(project_metrics))
+
+
+def semantic_backend_label() -> str:
+    """Display name of the configured semantic backend."""
+    return {'codebert': 'CodeBERT', 'lsa': 'LSA'}[SEMANTIC_BACKEND]
+
+
+def compute_semantic_similarity(project_metrics: List[Dict]) -> np.ndarray:
+    """
+    Compute semantic similarity with the configured backend.
+
+    Args:
+        project_metrics: List of project metric dictionaries
+
+    Returns:
+        NxN similarity matrix
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    if SEMANTIC_BACKEND == 'lsa':
+        embeddings_matrix = lsa_vectors(fit_lsa_model(project_metrics), project_metrics)
+    else:
+        embeddings_matrix = embed_projects(project_metrics)
+
+    # Compute cosine similarity
+    similarity_matrix = cosine_similarity(embeddings_matrix)
+
+    return similarity_matrix
+
+
+print("✓ Semantic similarity function defined")
+
+
+# In[ ]:
+
+
+def run_semantic_stage(project_metrics: List[Dict]) -> Optional[np.ndarray]:
+    """
+    Compute, save and preview the semantic similarity matrix.
+
+    Args:
+        project_metrics: Metrics of every analyzed project
+
+    Returns:
+        NxN semantic similarity matrix, or None if the backend failed
+    """
+    import pandas as pd
+
+    print(f"Computing semantic similarity with {semantic_backend_label()} "
+          f"(this may take a while)...")
+    project_names = [m['name'] for m in project_metrics]
+
+    try:
+        with pipeline_profiler.stage('compute_semantic_similarity'):
+            if INCREMENTAL_SIMILARITY and SEMANTIC_BACKEND == 'lsa':
+                semantic_similarity = update_similarity_incrementally(
+                    'semantic', project_metrics, lsa_vectors, fit_lsa_model, state_name='semantic_lsa',
+                    settings={'components': LSA_COMPONENTS})
+            elif INCREMENTAL_SIMILARITY:
+                # Embeddings do not depend on other projects, so updates are exact
+                embedder = get_code_embedder()
+                semantic_similarity = update_similarity_incrementally(
+                    'semantic', project_metrics, lambda _, metrics: embed_projects(metrics),
+                    state_name='semantic_codebert',
+                    settings={'model': embedder.model_name, 'max_length': embedder.max_length,
+                              'max_chunks_per_file': embedder.max_chunks_per_file})
+            else:
+                semantic_similarity = compute_semantic_similarity(project_metrics)
+        print(f"  Semantic similarity matrix: {semantic_similarity.shape}")
+
+        # Save matrix
+        save_similarity_matrix(semantic_similarity, project_names, 'semantic')
+
+        print("✓ Semantic similarity computed and saved")
+
+        # Show sample
+        print("\nSample (first 5x5):")
+        print(pd.DataFrame(semantic_similarity[:5, :5], index=project_names[:5],
+                           columns=project_names[:5]).to_string())
+    except Exception as e:
+        print(f"⚠ Error computing semantic similarity: {e}")
+        if SEMANTIC_BACKEND == 'codebert':
+            print("  You may need to install: pip install torch transformers")
+            print("  or set SEMANTIC_BACKEND = 'lsa' for the lightweight backend")
+        semantic_similarity = None
+    return semantic_similarity
+
+
+# ### 3.5 Identify Most and Least Similar Projects
+
+# In[ ]:
+
+
+def _select_pairs(values: np.ndarray, keys: np.ndarray, k: int,
+                  largest: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the k largest (or smallest) values and their keys with argpartition, unordered."""
+    if len(values) > k:
+        keep = np.argpartition(values, -k)[-k:] if largest else np.argpartition(values, k - 1)[:k]
+        return values[keep], keys[keep]
+    return values, keys
+
+
+def extreme_pairs(similarity_matrix, k: int = 5,
+                  block_cells: Optional[int] = None) -> Tuple[List[Tuple], List[Tuple]]:
+    """
+    Find the k most and k least similar pairs in the upper triangle.
+
+    The matrix is scanned in blocks: each block's upper-triangle values
+    (rows of a dense matrix via triu_indices, or a slice of a condensed
+    matrix) are reduced with argpartition, and only 2k candidates are
+    carried between blocks. Dense matrices may be read-only memory maps
+    (np.load(path, mmap_mode='r')) and condensed ones are usually mapped;
+    only one block is read into memory at a time.
+
+    Args:
+        similarity_matrix: NxN similarity matrix (ndarray, memmap or CondensedSimilarity)
+        k: Number of pairs to return at each end
+        block_cells: Matrix cells read per block (at least one row; default: PAIR_SCAN_BLOCK_CELLS)
+
+    Returns:
+        Tuple of (top pairs by descending similarity, bottom pairs by
+        ascending similarity), each a list of (i, j, similarity)
+    """
+    if block_cells is None:
+        block_cells = PAIR_SCAN_BLOCK_CELLS
+    n = similarity_matrix.shape[0]
+    condensed = isinstance(similarity_matrix, CondensedSimilarity)
+    empty = (np.empty(0), np.empty(0, dtype=np.int64))
+    top, bottom = empty, empty
+
+    def blocks():
+        """Yield (values, flat keys) per block; keys are condensed positions or i*n + j."""
+        if condensed:
+            stored = similarity_matrix.values
+            for start in range(0, len(stored), block_cells):
+                values = np.asarray(stored[start:start + block_cells], dtype=np.float64)
+                yield values, np.arange(start, start + len(values), dtype=np.int64)
+            return
+        block_rows = max(1, block_cells // max(n, 1))
+        for start in range(0, max(n - 1, 0), block_rows):
+            stop = min(start + block_rows, n - 1)
+            block = np.asarray(similarity_matrix[start:stop, start:])
+            block_i, block_j = np.triu_indices(stop - start, 1, n - start)
+            keys = (block_i + start).astype(np.int64) * n + block_j + start
+            yield block[block_i, block_j], keys
+
+    for values, keys in blocks():
+        candidates = _select_pairs(values, keys, k, largest=True)
+        top = _select_pairs(*(np.concatenate(pair) for pair in zip(top, candidates)), k, largest=True)
+        candidates = _select_pairs(values, keys, k, largest=False)
+        bottom = _select_pairs(*(np.concatenate(pair) for pair in zip(bottom, candidates)), k, largest=False)
+
+    def as_pairs(selected: Tuple[np.ndarray, np.ndarray], order: np.ndarray) -> List[Tuple]:
+        values, keys = selected[0][order], selected[1][order]
+        rows, cols = similarity_matrix.pairs(keys) if condensed else np.divmod(keys, n)
+        return [(int(i), int(j), float(value)) for i, j, value in zip(rows, cols, values)]
+
+    return (as_pairs(top, np.argsort(-top[0], kind='stable')),
+            as_pairs(bottom, np.argsort(bottom[0], kind='stable')))
+
+
+def _extreme_pairs_dataframe(similarity_matrix: np.ndarray, top_n: int = 5) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Previous all-pairs DataFrame + full sort approach, kept as benchmark baseline."""
+    import pandas as pd
+
+    n = similarity_matrix.shape[0]
+    pairs = []
+    for i in range(n):
+        for j in range(i + 1, n):
+            pairs.append({'Project 1': i, 'Project 2': j, 'Similarity': similarity_matrix[i][j]})
+    pairs_sorted = pd.DataFrame(pairs).sort_values('Similarity', ascending=False)
+    return pairs_sorted.head(top_n), pairs_sorted.tail(top_n)
+
+
+def find_extreme_pairs(similarity_matrix: np.ndarray, project_names: List[str], 
+                       metric_name: str, top_n: int = 5) -> None:
+    """
+    Find and display most and least similar project pairs.
+
+    Args:
+        similarity_matrix: NxN similarity matrix (ndarray or memmap)
+        project_names: List of project names
+        metric_name: Name of the similarity metric
+        top_n: Number of pairs to show
+    """
+    import pandas as pd
+
+    top, bottom = extreme_pairs(similarity_matrix, top_n)
+
+    def pairs_frame(pairs: List[Tuple]) -> pd.DataFrame:
+        return pd.DataFrame([{'Project 1': project_names[i], 'Project 2': project_names[j],
+                              'Similarity': value} for i, j, value in pairs],
+                            columns=['Project 1', 'Project 2', 'Similarity'])
+
+    print(f"\n=== {metric_name.upper()} SIMILARITY ===")
+    print(f"\nMost Similar Pairs (Top {top_n}):")
+    print(pairs_frame(top).to_string(index=False))
+
+    # Listed from most to least similar, like the top pairs
+    print(f"\nLeast Similar Pairs (Bottom {top_n}):")
+    print(pairs_frame(bottom[::-1]).to_string(index=False))
 
-    # Normalize features
-    from sklearn.preprocessing import StandardScaler
-    scaler = StandardScaler()
-    features_normalized = scaler.fit_transform(features_matrix)
 
-    # Compute cosine similarity
-    similarity_matrix = cosine_similarity(features_normalized)
+def benchmark_extreme_pairs(sizes: Tuple[int, ...] = (27, 500, 2000), top_n: int = 5) -> pd.DataFrame:
+    """
+    Compare the all-pairs DataFrame sort with the blocked argpartition extractor.
 
-    return similarity_matrix
+    Random symmetric matrices are used; each is also saved to disk, as a
+    full .npy and in condensed form, and scanned through a memory map.
 
+    Args:
+        sizes: Matrix sizes (N) to benchmark
+        top_n: Pairs extracted at each end
 
-print("✓ Structural similarity functions defined")
+    Returns:
+        DataFrame with timings per matrix size
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(42)
+    rows = []
+    for n in sizes:
+        matrix = rng.random((n, n))
+        matrix = (matrix + matrix.T) / 2
+
+        start = time.perf_counter()
+        reference_top, _ = _extreme_pairs_dataframe(matrix, top_n)
+        dataframe_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        top, _ = extreme_pairs(matrix, top_n)
+        argpartition_time = time.perf_counter() - start
+
+        mmap_path = os.path.join(RESULTS_DIR, f'_benchmark_pairs_{n}.npy')
+        np.save(mmap_path, matrix)
+        start = time.perf_counter()
+        mmap_top, _ = extreme_pairs(np.load(mmap_path, mmap_mode='r'), top_n)
+        mmap_time = time.perf_counter() - start
+        os.remove(mmap_path)
+
+        # float64 so the condensed copy selects exactly the same pairs
+        save_similarity_matrix(matrix, [str(i) for i in range(n)], f'_benchmark_pairs_{n}',
+                               formats=('condensed',), dtype='float64')
+        start = time.perf_counter()
+        condensed_top, _ = extreme_pairs(load_similarity_matrix(f'_benchmark_pairs_{n}'), top_n)
+        condensed_time = time.perf_counter() - start
+        for extension in ('npy', 'json'):
+            os.remove(os.path.join(RESULTS_DIR, f'_benchmark_pairs_{n}_similarity_condensed.{extension}'))
+
+        rows.append({
+            'N': n,
+            'Pairs': n * (n - 1) // 2,
+            'DataFrame sort (s)': round(dataframe_time, 4),
+            'argpartition (s)': round(argpartition_time, 4),
+            'argpartition, mmap (s)': round(mmap_time, 4),
+            'Condensed, mmap (s)': round(condensed_time, 4),
+            'Speedup': round(dataframe_time / argpartition_time, 1) if argpartition_time else float('inf'),
+            'Same top pairs': (np.allclose(sorted(reference_top['Similarity']), sorted(v for _, _, v in top))
+                               and top == mmap_top == condensed_top),
+        })
 
+    return pd.DataFrame(rows)
 
-# In[ ]:
 
+def report_extreme_pairs(similarities: Dict[str, Optional[np.ndarray]], project_names: List[str]) -> None:
+    """
+    Show the most and least similar pairs of every computed matrix.
 
-# Compute structural similarity
-if project_metrics:
-    print("Computing structural similarity...")
+    Args:
+        similarities: Similarity matrices by metric ('textual', 'token', 'structural',
+            'route', 'schema', 'semantic'); missing or None entries are skipped
+        project_names: Name of each row/column
+    """
+    with pipeline_profiler.stage('find_extreme_pairs'):
+        for metric in ('textual', 'token', 'structural', 'route', 'schema', 'semantic'):
+            if similarities.get(metric) is not None:
+                find_extreme_pairs(similarities[metric], project_names, metric.capitalize())
 
-    structural_similarity = compute_structural_similarity(project_metrics)
-    print(f"  Structural similarity matrix: {structural_similarity.shape}")
+    # Optional: extreme pair extraction benchmark (enable RUN_BENCHMARKS in the configuration)
+    if RUN_BENCHMARKS:
+        print("Benchmarking extreme pair extraction...")
+        pairs_benchmark = benchmark_extreme_pairs()
+        print(pairs_benchmark.to_string(index=False))
 
-    # Save matrix
-    np.save(os.path.join(RESULTS_DIR, 'structural_similarity_matrix.npy'), structural_similarity)
 
-    # Save as CSV
-    structural_df = pd.DataFrame(structural_similarity, index=project_names, columns=project_names)
-    structural_df.to_csv(os.path.join(RESULTS_DIR, 'structural_similarity_matrix.csv'))
+# ### 3.6 File-Level Nearest Neighbors
 
-    print("✓ Structural similarity computed and saved")
+# In[ ]:
 
-    # Show sample
-    print("\nSample (first 5x5):")
-    print(structural_df.iloc[:5, :5].to_string())
 
+def build_file_index(project_metrics: List[Dict]) -> Tuple[Any, np.ndarray, List[str]]:
+    """
+    Vectorize every preprocessed file once (TF-IDF over unigrams and bigrams).
 
-# ### 3.3 Semantic Similarity (Using CodeBERT)
+    Args:
+        project_metrics: List of project metric dictionaries
 
-# In[ ]:
+    Returns:
+        Tuple of (sparse L2-normalized file matrix, owning project index of
+        each file, project-relative path of each file)
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
 
+    owners = []
+    paths = []
+    for project_index, metrics in enumerate(project_metrics):
+        owners.extend([project_index] * len(metrics['code_files']))
+        paths.extend(metrics['code_files'])
 
-from transformers import AutoTokenizer, AutoModel
-import torch
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), min_df=1, dtype=np.float32)
+    file_matrix = vectorizer.fit_transform(
+        code for metrics in project_metrics for code in metrics['all_code'])
+    return file_matrix, np.array(owners), paths
 
-def compute_semantic_similarity(project_metrics: List[Dict]) -> np.ndarray:
+
+def find_file_neighbors(project_metrics: List[Dict], k: Optional[int] = None) -> pd.DataFrame:
     """
-    Compute semantic similarity using CodeBERT embeddings.
+    List the k most similar files from other projects for every file.
+
+    Uses a brute-force cosine NearestNeighbors index over the sparse file
+    matrix. Queries run one project at a time and scikit-learn computes
+    their distances in bounded chunks, so the files x files matrix is
+    never materialized.
 
     Args:
         project_metrics: List of project metric dictionaries
+        k: Neighbors to keep per file (default: FILE_NEIGHBORS_K)
 
     Returns:
-        NxN similarity matrix
+        DataFrame with one row per (file, neighbor) pair
     """
-    print("  Loading CodeBERT model...")
+    if k is None:
+        k = FILE_NEIGHBORS_K
+    import pandas as pd
+    from sklearn.neighbors import NearestNeighbors
+
+    columns = ['Project', 'File', 'Rank', 'Neighbor Project', 'Neighbor File', 'Similarity']
+    file_matrix, owners, paths = build_file_index(project_metrics)
+    if file_matrix.shape[0] < 2:
+        return pd.DataFrame(columns=columns)
+
+    index = NearestNeighbors(metric='cosine', algorithm='brute').fit(file_matrix)
+    rows = []
+    for project_index, metrics in enumerate(project_metrics):
+        own_files = np.flatnonzero(owners == project_index)
+        if not len(own_files):
+            continue
+        # Files of the same project can take at most len(own_files) of the nearest slots
+        n_neighbors = min(len(owners), k + len(own_files))
+        distances, neighbors = index.kneighbors(file_matrix[own_files], n_neighbors=n_neighbors)
+
+        for file_index, file_distances, file_neighbors in zip(own_files, distances, neighbors):
+            rank = 0
+            for distance, neighbor in zip(file_distances, file_neighbors):
+                if owners[neighbor] == project_index:
+                    continue
+                rank += 1
+                rows.append({
+                    'Project': metrics['name'],
+                    'File': paths[file_index],
+                    'Rank': rank,
+                    'Neighbor Project': project_metrics[owners[neighbor]]['name'],
+                    'Neighbor File': paths[neighbor],
+                    'Similarity': round(1.0 - float(distance), 4),
+                })
+                if rank == k:
+                    break
+
+    return pd.DataFrame(rows, columns=columns)
+
+
+def report_file_neighbors(project_metrics: List[Dict]) -> pd.DataFrame:
+    """
+    Save the cross-project file neighbors and show the most similar file pairs.
 
-    # Load CodeBERT model and tokenizer
-    model_name = "microsoft/codebert-base"
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModel.from_pretrained(model_name)
-    model.eval()
+    Args:
+        project_metrics: Metrics of every analyzed project
 
-    print("  Generating embeddings...")
+    Returns:
+        Neighbor table as written to file_neighbors.csv
+    """
+    print("Building file-level nearest neighbor index...")
+    with pipeline_profiler.stage('find_file_neighbors'):
+        file_neighbors = find_file_neighbors(project_metrics)
+    file_neighbors.to_csv(os.path.join(RESULTS_DIR, 'file_neighbors.csv'), index=False)
+    print(f"✓ Saved top-{FILE_NEIGHBORS_K} cross-project neighbors of "
+          f"{file_neighbors[['Project', 'File']].drop_duplicates().shape[0]} files "
+          f"to {RESULTS_DIR}/file_neighbors.csv")
+
+    # Each pair appears once per direction; keep the first. '\0' sorts before any
+    # character, so comparing 'project\0file' strings orders sides like (project, file) tuples
+    side = (file_neighbors['Project'] + '\0' + file_neighbors['File']).to_numpy()
+    neighbor_side = (file_neighbors['Neighbor Project'] + '\0' + file_neighbors['Neighbor File']).to_numpy()
+    top_file_pairs = (file_neighbors.assign(pair_first=np.minimum(side, neighbor_side),
+                                            pair_second=np.maximum(side, neighbor_side))
+                      .sort_values('Similarity', ascending=False)
+                      .drop_duplicates(['pair_first', 'pair_second'])
+                      .drop(columns=['pair_first', 'pair_second', 'Rank']))
+    print("\nMost similar files across projects (Top 10):")
+    print(top_file_pairs.head(10).to_string(index=False))
+    return file_neighbors
+
+
+# ### 3.7 Clone Fragment Detection
 
-    # Generate embeddings for each project
-    embeddings = []
+# In[ ]:
 
-    for i, metrics in enumerate(project_metrics):
-        # Sample code from project (max 512 tokens)
-        code_sample = ' '.join(metrics['all_code'][:10])  # First 10 files
-        code_sample = code_sample[:2000]  # Limit length
 
-        # Tokenize
-        inputs = tokenizer(code_sample, return_tensors="pt", 
-                          truncation=True, max_length=512, padding=True)
+def clone_token_streams(project_metrics: List[Dict]) -> Tuple[List[np.ndarray], np.ndarray, List[Tuple[int, str]]]:
+    """
+    Tokenize every preprocessed file into an array of token ids.
 
-        # Get embeddings
-        with torch.no_grad():
-            outputs = model(**inputs)
-            # Use [CLS] token embedding
-            embedding = outputs.last_hidden_state[:, 0, :].numpy().flatten()
+    Args:
+        project_metrics: List of project metric dictionaries
 
-        embeddings.append(embedding)
-        print(f"    Project {i+1}/{len(project_metrics)} processed")
+    Returns:
+        Tuple of (token ids of each file, owning project index of each file,
+        (project index, project-relative path) of each file)
+    """
+    vocabulary: Dict[str, int] = {}
+    streams, owners, files = [], [], []
+    for project_index, metrics in enumerate(project_metrics):
+        for path, code in zip(metrics['code_files'], metrics['all_code']):
+            tokens = tokenize_code(code)
+            streams.append(np.fromiter((vocabulary.setdefault(t, len(vocabulary)) for t in tokens),
+                                       dtype=np.int64, count=len(tokens)))
+            owners.append(project_index)
+            files.append((project_index, path))
+    return streams, np.array(owners, dtype=np.int64), files
 
-    # Convert to numpy array
-    embeddings_matrix = np.array(embeddings)
 
-    # Compute cosine similarity
-    similarity_matrix = cosine_similarity(embeddings_matrix)
+def _mix_token_ids(token_ids: np.ndarray) -> np.ndarray:
+    """Spread token ids over 64 bits (splitmix64 finalizer) before rolling hashing."""
+    x = token_ids.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
 
-    return similarity_matrix
 
+_MASKED_KGRAM = np.uint64(np.iinfo(np.uint64).max)  # Hash given to boilerplate k-grams before winnowing
 
-print("✓ Semantic similarity function defined")
 
+def winnow(kgram_hashes: np.ndarray, window: int) -> np.ndarray:
+    """
+    Select winnowing fingerprints: the rightmost minimum hash of every window.
 
-# In[ ]:
+    Any run of window + k - 1 tokens shared by two files contains a k-gram
+    selected in both, so no clone of that length can be missed.
 
+    Args:
+        kgram_hashes: Hash of every k-gram of a file
+        window: Consecutive k-grams per window
 
-# Compute semantic similarity
-if project_metrics:
-    print("Computing semantic similarity (this may take a while)...")
+    Returns:
+        Sorted distinct k-gram positions
+    """
+    if len(kgram_hashes) <= window:
+        return np.array([len(kgram_hashes) - 1 - kgram_hashes[::-1].argmin()], dtype=np.int64)
+    windows = np.lib.stride_tricks.sliding_window_view(kgram_hashes, window)
+    picks = window - 1 - windows[:, ::-1].argmin(axis=1) + np.arange(len(windows))
+    return np.unique(picks)
+
+
+def _match_length(tokens_a: np.ndarray, tokens_b: np.ndarray) -> int:
+    """Length of the common prefix of two token id arrays, compared in doubling chunks."""
+    n = min(len(tokens_a), len(tokens_b))
+    matched, chunk = 0, 64
+    while matched < n:
+        end = min(n, matched + chunk)
+        mismatch = np.flatnonzero(tokens_a[matched:end] != tokens_b[matched:end])
+        if len(mismatch):
+            return matched + int(mismatch[0])
+        matched, chunk = end, chunk * 2
+    return n
+
+
+def _gap_extension(tokens_a: np.ndarray, tokens_b: np.ndarray, kgram: int, max_gap: int) -> int:
+    """
+    Length of the near-exact continuation of a match that ends right before position 0.
 
-    try:
-        semantic_similarity = compute_semantic_similarity(project_metrics)
-        print(f"  Semantic similarity matrix: {semantic_similarity.shape}")
+    The continuation takes every further run of at least kgram identical
+    tokens that starts at most max_gap tokens after the previous run ended.
+    It depends only on the tokens, not on where the match was seeded.
 
-        # Save matrix
-        np.save(os.path.join(RESULTS_DIR, 'semantic_similarity_matrix.npy'), semantic_similarity)
+    Args:
+        tokens_a: Token ids of the first file after the match
+        tokens_b: Token ids of the second file after the match
+        kgram: Shortest run that continues the match across a gap
+        max_gap: Differing tokens allowed between two runs
 
-        # Save as CSV
-        semantic_df = pd.DataFrame(semantic_similarity, index=project_names, columns=project_names)
-        semantic_df.to_csv(os.path.join(RESULTS_DIR, 'semantic_similarity_matrix.csv'))
+    Returns:
+        Number of tokens added to the match (0 if no run follows within max_gap)
+    """
+    n = min(len(tokens_a), len(tokens_b))
+    end = 0
+    position = 1
+    while position <= min(end + max_gap, n - 1):
+        if tokens_a[position] != tokens_b[position]:
+            position += 1
+            continue
+        run = _match_length(tokens_a[position:], tokens_b[position:])
+        if run >= kgram:
+            end = position + run
+            position = end + 1
+        else:
+            position += run
+    return end
+
+
+def find_clone_matches(streams: List[np.ndarray], owners: np.ndarray, min_tokens: Optional[int] = None,
+                       kgram: Optional[int] = None, max_occurrences: Optional[int] = None,
+                       max_gap: Optional[int] = None) -> List[Tuple[int, int, int, int, int, int]]:
+    """
+    Find code shared by files of different projects (winnowing index).
+
+    K-grams found in more than max_occurrences files are masked as
+    boilerplate, then every file is reduced to its winnowing fingerprints.
+    Masking before winnowing lets every window fall back to a usable k-gram,
+    so any shared run of min_tokens tokens with at least one k-gram outside
+    the boilerplate is found. All fingerprints are sorted by hash once, and
+    fingerprints found in files of two or more projects seed a match.
+
+    Seeds are verified and extended token by token in both directions. Only
+    exact runs of min_tokens tokens or more start a fragment; they are
+    extended across gaps of up to max_gap differing tokens followed by a run
+    of at least kgram identical tokens. Since those runs are always seeded
+    and the extension depends only on the tokens, the result does not depend
+    on which fingerprints winnowing picked (and so not on token ids or file
+    order). Hashing, sorting and extension are linear or n log n in the
+    corpus size.
 
-        print("✓ Semantic similarity computed and saved")
+    Args:
+        streams: Token ids of each file
+        owners: Owning project index of each file
+        min_tokens: Shortest exact run that makes a fragment (default: CLONE_MIN_TOKENS)
+        kgram: Tokens per hashed k-gram (at most min_tokens; default: CLONE_KGRAM)
+        max_occurrences: K-grams found in more files are ignored as boilerplate
+            (default: CLONE_MAX_OCCURRENCES)
+        max_gap: Differing tokens tolerated between merged runs (default: CLONE_MAX_GAP)
 
-        # Show sample
-        print("\nSample (first 5x5):")
-        print(semantic_df.iloc[:5, :5].to_string())
-    except Exception as e:
-        print(f"⚠ Error computing semantic similarity: {e}")
-        print("  You may need to install: pip install torch transformers")
-        semantic_similarity = None
+    Returns:
+        List of (file_a, start_a, file_b, start_b, length, identical tokens);
+        file_a < file_b, token positions are half-open [start, start + length)
+    """
+    min_tokens = CLONE_MIN_TOKENS if min_tokens is None else min_tokens
+    kgram = CLONE_KGRAM if kgram is None else kgram
+    max_occurrences = CLONE_MAX_OCCURRENCES if max_occurrences is None else max_occurrences
+    max_gap = CLONE_MAX_GAP if max_gap is None else max_gap
+    window = min_tokens - kgram + 1
+    indexed = [file_index for file_index, tokens in enumerate(streams) if len(tokens) >= min_tokens]
+    if not indexed:
+        return []
+    all_kgrams = np.concatenate([rolling_hashes(_mix_token_ids(streams[f]), kgram) for f in indexed])
+    kgram_files = np.repeat(np.arange(len(indexed)), [len(streams[f]) - kgram + 1 for f in indexed])
+
+    # Number of files containing each k-gram; the most common ones are masked
+    order = np.lexsort((kgram_files, all_kgrams))
+    sorted_kgrams, sorted_files = all_kgrams[order], kgram_files[order]
+    first_in_file = np.r_[True, (sorted_kgrams[1:] != sorted_kgrams[:-1]) | (sorted_files[1:] != sorted_files[:-1])]
+    values, file_counts = np.unique(sorted_kgrams[first_in_file], return_counts=True)
+    boilerplate = values[file_counts > max_occurrences]
+    if len(boilerplate):
+        all_kgrams = np.where(np.isin(all_kgrams, boilerplate), _MASKED_KGRAM, all_kgrams)
+    offsets = np.r_[0, np.cumsum([len(streams[f]) - kgram + 1 for f in indexed])]
+
+    fingerprint_hashes, fingerprint_files, fingerprint_positions = [], [], []
+    for position, file_index in enumerate(indexed):
+        hashes = all_kgrams[offsets[position]:offsets[position + 1]]
+        positions = winnow(hashes, window)
+        # Windows made only of boilerplate select nothing usable
+        positions = positions[hashes[positions] != _MASKED_KGRAM]
+        fingerprint_hashes.append(hashes[positions])
+        fingerprint_files.append(np.full(len(positions), file_index, dtype=np.int64))
+        fingerprint_positions.append(positions)
+
+    hashes = np.concatenate(fingerprint_hashes)
+    if not len(hashes):
+        return []
+    order = np.argsort(hashes, kind='stable')
+    hashes = hashes[order]
+    files = np.concatenate(fingerprint_files)[order]
+    positions = np.concatenate(fingerprint_positions)[order]
+    projects = owners[files]
+
+    # Groups of equal fingerprints that occur in at least two projects
+    starts = np.flatnonzero(np.r_[True, hashes[1:] != hashes[:-1]])
+    sizes = np.diff(np.r_[starts, len(hashes)])
+    shared = (sizes >= 2) & (np.minimum.reduceat(projects, starts) != np.maximum.reduceat(projects, starts))
+
+    # Seeds: every cross-project pair of occurrences within a group, paired by offset in the group
+    group_ids = np.repeat(np.arange(len(starts)), sizes)
+    members = np.flatnonzero(shared[group_ids])
+    seed_parts = []
+    for offset in range(1, int(sizes[shared].max()) if shared.any() else 1):
+        i, j = members[:-offset], members[offset:]
+        same_group = group_ids[i] == group_ids[j]
+        i, j = i[same_group], j[same_group]
+        i, j = i[projects[i] != projects[j]], j[projects[i] != projects[j]]
+        swap = files[i] > files[j]
+        seed_parts.append(np.stack([np.where(swap, files[j], files[i]), np.where(swap, positions[j], positions[i]),
+                                    np.where(swap, files[i], files[j]), np.where(swap, positions[i], positions[j])]))
+    if not seed_parts:
+        return []
+    seeds = np.unique(np.concatenate(seed_parts, axis=1), axis=1)
+    # Visit seeds by file pair, then diagonal, then position
+    file_as, pos_as, file_bs, pos_bs = seeds[:, np.lexsort((seeds[1], seeds[1] - seeds[3], seeds[2], seeds[0]))]
+
+    fragments = []
+    covered = None
+    for file_a, pos_a, file_b, pos_b in zip(file_as.tolist(), pos_as.tolist(), file_bs.tolist(), pos_bs.tolist()):
+        diagonal = pos_a - pos_b
+        if covered is not None and covered[:3] == (file_a, file_b, diagonal) and pos_a < covered[3]:
+            continue  # Inside a fragment already extended
+        tokens_a, tokens_b = streams[file_a], streams[file_b]
+        forward = _match_length(tokens_a[pos_a:], tokens_b[pos_b:])
+        if forward < kgram:
+            continue  # Hash collision
+        back = _match_length(tokens_a[:pos_a][::-1], tokens_b[:pos_b][::-1])
+        start_a, end_a = pos_a - back, pos_a + forward
+        if end_a - start_a >= min_tokens:
+            start_a -= _gap_extension(tokens_a[:start_a][::-1], tokens_b[:start_a - diagonal][::-1], kgram, max_gap)
+            end_a += _gap_extension(tokens_a[end_a:], tokens_b[end_a - diagonal:], kgram, max_gap)
+            start_b = start_a - diagonal
+            identical = int(np.count_nonzero(tokens_a[start_a:end_a] == tokens_b[start_b:start_b + end_a - start_a]))
+            fragments.append((file_a, start_a, file_b, start_b, end_a - start_a, identical))
+        # Shorter runs cannot start a fragment; the longer runs of a fragment carry their own seeds
+        covered = (file_a, file_b, diagonal, end_a)
+
+    return fragments
+
+
+def token_line_numbers(code: str) -> np.ndarray:
+    """1-based line number of every tokenize_code token in code."""
+    lines, line, last = [], 1, 0
+    for match in _JS_TOKEN_PATTERN.finditer(code):
+        line += code.count('\n', last, match.start())
+        last = match.start()
+        lines.append(line)
+    return np.array(lines, dtype=np.int64)
+
+
+def source_token_lines(file_path: str, code: str) -> Optional[np.ndarray]:
+    """
+    Line of every token of a preprocessed file in the original source file.
 
+    Preprocessing drops blank lines, so token positions cannot be mapped to
+    lines of the preprocessed text. Instead, comments and console calls are
+    stripped again with their newlines kept, which yields the same tokens at
+    their original lines.
 
-# ### 3.4 Identify Most and Least Similar Projects
+    Args:
+        file_path: Original source file
+        code: Preprocessed code of the file (as in all_code)
 
-# In[ ]:
+    Returns:
+        Line number of each token, or None if the file is unreadable or no
+        longer matches the preprocessed code
+    """
+    try:
+        content, _ = read_source_file(file_path)
+    except OSError:
+        return None
+    if os.path.splitext(file_path)[1] in ('.js', '.jsx'):
+        content = _JS_STRIP_PATTERNS[True].sub(
+            lambda m: m.group(1) + '\n' * (m.group(0).count('\n') - m.group(1).count('\n')), content)
+    if tokenize_code(content) != tokenize_code(code):
+        return None
+    return token_line_numbers(content)
+
+
+def find_clone_fragments(project_metrics: List[Dict], min_tokens: Optional[int] = None) -> pd.DataFrame:
+    """
+    List code fragments shared between files of different projects.
 
+    Token positions are mapped back to line spans of the original files;
+    only files that take part in a fragment are read again. Each fragment is
+    listed once, with the (project, file) that sorts first on the left, so
+    the table does not depend on the order of the projects.
 
-def find_extreme_pairs(similarity_matrix: np.ndarray, project_names: List[str], 
-                       metric_name: str, top_n: int = 5) -> None:
+    Args:
+        project_metrics: List of project metric dictionaries
+        min_tokens: Shortest exact run that makes a fragment (default: CLONE_MIN_TOKENS)
+
+    Returns:
+        DataFrame with one row per fragment, longest first
     """
-    Find and display most and least similar project pairs.
+    if min_tokens is None:
+        min_tokens = CLONE_MIN_TOKENS
+    import pandas as pd
+
+    columns = ['Project', 'File', 'Start Line', 'End Line', 'Neighbor Project', 'Neighbor File',
+               'Neighbor Start Line', 'Neighbor End Line', 'Tokens', 'Identical Tokens']
+    streams, owners, files = clone_token_streams(project_metrics)
+    fragments = find_clone_matches(streams, owners, min_tokens=min_tokens)
+
+    file_lines: Dict[int, Optional[np.ndarray]] = {}
+    # Files are listed project by project, in code_files order
+    first_file: Dict[int, int] = {}
+    for file_index, (project_index, _) in enumerate(files):
+        first_file.setdefault(project_index, file_index)
+
+    def line_span(file_index: int, start: int, length: int) -> Tuple[Optional[int], Optional[int]]:
+        if file_index not in file_lines:
+            project_index, path = files[file_index]
+            metrics = project_metrics[project_index]
+            file_lines[file_index] = source_token_lines(
+                os.path.join(PROJECTS_DIR, metrics['name'], path),
+                metrics['all_code'][file_index - first_file[project_index]])
+        lines = file_lines[file_index]
+        if lines is None:
+            return None, None
+        return int(lines[start]), int(lines[start + length - 1])
+
+    def file_key(file_index: int) -> Tuple[str, str]:
+        return project_metrics[files[file_index][0]]['name'], files[file_index][1]
+
+    rows = []
+    for file_a, start_a, file_b, start_b, length, identical in fragments:
+        if file_key(file_b) < file_key(file_a):
+            file_a, start_a, file_b, start_b = file_b, start_b, file_a, start_a
+        first_a, last_a = line_span(file_a, start_a, length)
+        first_b, last_b = line_span(file_b, start_b, length)
+        rows.append({
+            'Project': project_metrics[files[file_a][0]]['name'],
+            'File': files[file_a][1],
+            'Start Line': first_a,
+            'End Line': last_a,
+            'Neighbor Project': project_metrics[files[file_b][0]]['name'],
+            'Neighbor File': files[file_b][1],
+            'Neighbor Start Line': first_b,
+            'Neighbor End Line': last_b,
+            'Tokens': length,
+            'Identical Tokens': identical,
+        })
+
+    return (pd.DataFrame(rows, columns=columns)
+            .astype({'Start Line': 'Int64', 'End Line': 'Int64', 'Neighbor Start Line': 'Int64',
+                     'Neighbor End Line': 'Int64', 'Tokens': 'int64', 'Identical Tokens': 'int64'})
+            .sort_values(['Identical Tokens', 'Project', 'File', 'Start Line', 'Neighbor Project',
+                          'Neighbor File', 'Neighbor Start Line', 'Tokens'],
+                         ascending=[False] + [True] * 7)
+            .reset_index(drop=True))
+
+
+def benchmark_clone_detection(project_metrics: List[Dict], scales: Tuple[int, ...] = (1, 2, 4, 8)) -> pd.DataFrame:
+    """
+    Measure clone detection throughput as the corpus grows.
+
+    Larger corpora are synthesized from copies of the real projects with a
+    disjoint token vocabulary per copy, so copies do not clone each other and
+    only indexing cost grows with the corpus. Every copy must yield the same
+    fragments as the first one, since only its token ids differ.
 
     Args:
-        similarity_matrix: NxN similarity matrix
-        project_names: List of project names
-        metric_name: Name of the similarity metric
-        top_n: Number of pairs to show
+        project_metrics: List of project metric dictionaries
+        scales: Corpus sizes as multiples of the real corpus
+
+    Returns:
+        DataFrame with tokens, time, throughput and copy agreement per corpus size
     """
-    n = len(project_names)
-    pairs = []
+    import pandas as pd
+
+    start = time.perf_counter()
+    streams, owners, _ = clone_token_streams(project_metrics)
+    tokenize_time = time.perf_counter() - start
+    vocabulary_size = max((int(tokens.max()) + 1 for tokens in streams if len(tokens)), default=1)
+    n_tokens = sum(len(tokens) for tokens in streams)
+    rows = []
+
+    for scale in scales:
+        scaled_streams = [tokens + copy * vocabulary_size for copy in range(scale) for tokens in streams]
+        scaled_owners = np.concatenate([owners + copy * len(project_metrics) for copy in range(scale)])
+
+        start = time.perf_counter()
+        fragments = find_clone_matches(scaled_streams, scaled_owners)
+        elapsed = time.perf_counter() - start
+
+        # Fragments of each copy, with file indices shifted back to the first copy
+        per_copy = [set() for _ in range(scale)]
+        for file_a, start_a, file_b, start_b, length, identical in fragments:
+            copy = file_a // len(streams)
+            per_copy[copy].add((file_a - copy * len(streams), start_a, file_b - copy * len(streams),
+                                start_b, length, identical))
+
+        rows.append({
+            'Projects': scale * len(project_metrics),
+            'Files': len(scaled_streams),
+            'Tokens': scale * n_tokens,
+            'Index + match (s)': round(elapsed, 3),
+            'Tokens/s': round(scale * n_tokens / elapsed) if elapsed else float('inf'),
+            'Fragments': len(fragments),
+            'Copies agree': all(copy_fragments == per_copy[0] for copy_fragments in per_copy),
+        })
 
-    # Get all pairs (excluding diagonal)
-    for i in range(n):
-        for j in range(i + 1, n):
-            pairs.append({
-                'Project 1': project_names[i],
-                'Project 2': project_names[j],
-                'Similarity': similarity_matrix[i][j]
-            })
+    print(f"  Tokenizing the real corpus ({n_tokens} tokens) took {tokenize_time:.3f}s")
+    return pd.DataFrame(rows)
 
-    # Sort by similarity
-    pairs_df = pd.DataFrame(pairs)
-    pairs_sorted = pairs_df.sort_values('Similarity', ascending=False)
 
-    print(f"\n=== {metric_name.upper()} SIMILARITY ===")
-    print(f"\nMost Similar Pairs (Top {top_n}):")
-    print(pairs_sorted.head(top_n).to_string(index=False))
+def check_planted_clones(project_metrics: List[Dict], trials: int = 50, seed: int = 0,
+                         min_tokens: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Plant shared runs of min_tokens or more tokens in the corpus and count how many are reported.
 
-    print(f"\nLeast Similar Pairs (Bottom {top_n}):")
-    print(pairs_sorted.tail(top_n).to_string(index=False))
+    Each trial inserts the same run of new random tokens into two files of
+    different projects, at random positions among the real code. Every such
+    run must be reported.
 
+    Args:
+        project_metrics: List of project metric dictionaries
+        trials: Number of planted runs (each in its own pair of files)
+        seed: Random seed
+        min_tokens: Shortest planted run (default: CLONE_MIN_TOKENS)
 
-if project_metrics:
-    # Textual similarity pairs
-    find_extreme_pairs(textual_similarity, project_names, "Textual")
+    Returns:
+        Tuple of (planted runs reported, trials)
+    """
+    if min_tokens is None:
+        min_tokens = CLONE_MIN_TOKENS
+    rng = np.random.RandomState(seed)
+    streams, owners, _ = clone_token_streams(project_metrics)
+    vocabulary_size = max((int(tokens.max()) + 1 for tokens in streams if len(tokens)), default=1)
+    candidates = list(rng.permutation(len(streams)))
+    planted = []
+
+    for _ in range(trials):
+        file_a = candidates.pop()
+        file_b = next(f for f in candidates if owners[f] != owners[file_a])
+        candidates.remove(file_b)
+        run = vocabulary_size + rng.randint(0, 10 * vocabulary_size, rng.randint(min_tokens, 2 * min_tokens + 1))
+        starts = {}
+        for file_index in (file_a, file_b):
+            tokens = streams[file_index]
+            starts[file_index] = rng.randint(0, len(tokens) + 1)
+            streams[file_index] = np.concatenate(
+                [tokens[:starts[file_index]], run, tokens[starts[file_index]:]])
+        file_a, file_b = sorted((file_a, file_b))
+        planted.append((file_a, starts[file_a], file_b, starts[file_b], len(run)))
+
+    fragments = find_clone_matches(streams, owners, min_tokens=min_tokens)
+    found = sum(
+        any(fragment[0] == file_a and fragment[2] == file_b and fragment[1] - fragment[3] == start_a - start_b
+            and fragment[1] <= start_a and start_a + length <= fragment[1] + fragment[4]
+            for fragment in fragments)
+        for file_a, start_a, file_b, start_b, length in planted)
+    return found, trials
+
+
+def report_clone_fragments(project_metrics: List[Dict]) -> pd.DataFrame:
+    """
+    Save the cross-project clone fragments and show the largest ones.
 
-    # Structural similarity pairs
-    find_extreme_pairs(structural_similarity, project_names, "Structural")
+    Args:
+        project_metrics: Metrics of every analyzed project
 
-    # Semantic similarity pairs (if available)
-    if semantic_similarity is not None:
-        find_extreme_pairs(semantic_similarity, project_names, "Semantic")
+    Returns:
+        Fragment table as written to clone_fragments.csv
+    """
+    print(f"Detecting clone fragments (>= {CLONE_MIN_TOKENS} tokens)...")
+    with pipeline_profiler.stage('find_clone_fragments'):
+        clone_fragments = find_clone_fragments(project_metrics)
+    clone_fragments.to_csv(os.path.join(RESULTS_DIR, 'clone_fragments.csv'), index=False)
+    print(f"✓ Saved {len(clone_fragments)} clone fragments to {RESULTS_DIR}/clone_fragments.csv")
+
+    if len(clone_fragments):
+        project_pairs = (clone_fragments.groupby(['Project', 'Neighbor Project'])
+                         .agg(Fragments=('Tokens', 'size'), **{'Identical Tokens': ('Identical Tokens', 'sum')})
+                         .sort_values('Identical Tokens', ascending=False)
+                         .reset_index())
+        print("\nProject pairs sharing the most cloned code (Top 10):")
+        print(project_pairs.head(10).to_string(index=False))
+        print("\nLargest clone fragments (Top 10):")
+        print(clone_fragments.head(10).to_string(index=False))
+
+    # Optional: clone detection throughput vs corpus size (enable RUN_BENCHMARKS in the configuration)
+    if RUN_BENCHMARKS:
+        print("Benchmarking clone detection...")
+        print(benchmark_clone_detection(project_metrics).to_string(index=False))
+        found, trials = check_planted_clones(project_metrics)
+        if found == trials:
+            print(f"✓ All {trials} planted clones of >= {CLONE_MIN_TOKENS} tokens were reported")
+        else:
+            print(f"⚠ Only {found} of {trials} planted clones of >= {CLONE_MIN_TOKENS} tokens were reported")
+
+    return clone_fragments
 
 
 # ## 4. Part C: Visualization & Analysis <a name="part-c"></a>
@@ -762,8 +4106,148 @@ if project_metrics:
 # In[ ]:
 
 
+def save_figure(filepath: str, dpi: Optional[int] = None, preview_dpi: Optional[int] = None,
+                show: bool = False) -> None:
+    """
+    Save the current figure, plus an optional low-DPI preview, then show or close it.
+
+    Args:
+        filepath: Output path
+        dpi: Resolution of the saved figure (default: PLOT_DPI)
+        preview_dpi: Resolution of '<name>_preview.png' (None = no preview)
+        show: Display the figure (interactive mode) instead of closing it
+    """
+    import matplotlib.pyplot as plt
+
+    plt.savefig(filepath, dpi=PLOT_DPI if dpi is None else dpi, bbox_inches='tight')
+    if preview_dpi:
+        stem, ext = os.path.splitext(filepath)
+        plt.savefig(f'{stem}_preview{ext}', dpi=preview_dpi, bbox_inches='tight')
+    if show:
+        plt.show()
+    else:
+        plt.close()
+
+
+class FigureRenderer:
+    """
+    Render figures interactively, or as a headless batch.
+
+    Interactive mode draws and shows each figure as soon as it is submitted.
+    Headless mode (HEADLESS_PLOTS) switches to the Agg backend, never calls
+    plt.show(), skips figures whose inputs (data, options, DPI) hash to the
+    digest recorded for the existing file in results/plot_manifest.json, and
+    renders the rest in worker processes once wait() is called. The pool is
+    forked there, so plot functions defined after the renderer was created
+    exist in the workers.
+    """
+
+    def __init__(self, headless: Optional[bool] = None, workers: Optional[int] = None,
+                 dpi: Optional[int] = None, preview_dpi: Optional[int] = None):
+        """
+        Args:
+            headless: Batch mode (Agg backend, worker processes, skip unchanged
+                figures; default: HEADLESS_PLOTS)
+            workers: Worker processes in headless mode (1 = serial; default: PLOT_WORKERS)
+            dpi: Resolution of saved figures (default: PLOT_DPI)
+            preview_dpi: Resolution of additional previews (default: PLOT_PREVIEW_DPI;
+                0 = no previews)
+        """
+        headless = HEADLESS_PLOTS if headless is None else headless
+        dpi = PLOT_DPI if dpi is None else dpi
+        preview_dpi = PLOT_PREVIEW_DPI if preview_dpi is None else preview_dpi
+        import matplotlib
+        if headless:
+            matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        plt.style.use('seaborn-v0_8-darkgrid')
+        self.headless = headless
+        self.dpi = dpi
+        self.preview_dpi = preview_dpi
+        self.manifest_path = os.path.join(RESULTS_DIR, 'plot_manifest.json')
+        self.manifest = {}
+        if headless and os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        self.workers = PLOT_WORKERS if workers is None else workers
+        self.results = {}
+        self.pending = {}
+
+    def _digest(self, render: Callable, options: Dict) -> str:
+        """Hash the render function, its options (arrays by content) and the DPI settings."""
+        digest = hashlib.sha256(render.__name__.encode('utf-8'))
+        digest.update(repr((self.dpi, self.preview_dpi)).encode('utf-8'))
+        for key in sorted(options):
+            value = options[key]
+            digest.update(key.encode('utf-8'))
+            if isinstance(value, np.ndarray):
+                digest.update(f'{value.shape}{value.dtype.str}'.encode('utf-8'))
+                digest.update(np.ascontiguousarray(value).tobytes())
+            else:
+                digest.update(repr(value).encode('utf-8'))
+        return digest.hexdigest()
+
+    def submit(self, render: Callable, filename: str, **options) -> None:
+        """
+        Render a figure (or schedule it in headless mode).
+
+        Args:
+            render: Plot function taking filename, dpi, preview_dpi, show and options;
+                its return value must be JSON serializable
+            filename: Output filename inside RESULTS_DIR
+            **options: Data and settings passed to the plot function
+        """
+        filepath = os.path.join(RESULTS_DIR, filename)
+        if not self.headless:
+            self.results[filename] = render(filename=filename, dpi=self.dpi,
+                                            preview_dpi=self.preview_dpi, show=True, **options)
+            print(f"  Saved: {filepath}")
+            return
+
+        digest = self._digest(render, options)
+        entry = self.manifest.get(filename)
+        if entry and entry['digest'] == digest and os.path.exists(filepath):
+            self.results[filename] = entry['result']
+            print(f"  Unchanged, not re-rendered: {filepath}")
+            return
+
+        self.pending[filename] = (digest, render, dict(
+            filename=filename, dpi=self.dpi, preview_dpi=self.preview_dpi, show=False, **options))
+
+    def wait(self) -> Dict[str, Any]:
+        """
+        Render the scheduled figures (in parallel when possible) and record them in the manifest.
+
+        Returns:
+            Return value of each plot function, keyed by filename
+        """
+        if self.pending:
+            executor = create_process_pool(min(self.workers, len(self.pending)))
+            if executor is None:
+                outcomes = {filename: render(**kwargs)
+                            for filename, (_, render, kwargs) in self.pending.items()}
+            else:
+                with executor:
+                    futures = {filename: executor.submit(render, **kwargs)
+                               for filename, (_, render, kwargs) in self.pending.items()}
+                    outcomes = {filename: future.result() for filename, future in futures.items()}
+
+            for filename, (digest, _, _) in self.pending.items():
+                self.results[filename] = outcomes[filename]
+                self.manifest[filename] = {'digest': digest, 'result': outcomes[filename]}
+                print(f"  Saved: {os.path.join(RESULTS_DIR, filename)}")
+            self.pending.clear()
+
+        if self.headless:
+            with open(self.manifest_path, 'w') as f:
+                json.dump(self.manifest, f, indent=2)
+        return self.results
+
+
 def plot_similarity_heatmap(similarity_matrix: np.ndarray, project_names: List[str],
-                           title: str, filename: str) -> None:
+                           title: str, filename: str, dpi: Optional[int] = None,
+                           preview_dpi: Optional[int] = None, show: bool = False) -> None:
     """
     Create and save a heatmap visualization.
 
@@ -772,7 +4256,13 @@ def plot_similarity_heatmap(similarity_matrix: np.ndarray, project_names: List[s
         project_names: List of project names
         title: Plot title
         filename: Output filename
+        dpi: Resolution of the saved figure (default: PLOT_DPI)
+        preview_dpi: Resolution of an additional preview (None = no preview)
+        show: Display the figure instead of closing it
     """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     plt.figure(figsize=(12, 10))
 
     sns.heatmap(similarity_matrix, 
@@ -792,32 +4282,35 @@ def plot_similarity_heatmap(similarity_matrix: np.ndarray, project_names: List[s
     plt.yticks(rotation=0)
     plt.tight_layout()
 
-    filepath = os.path.join(RESULTS_DIR, filename)
-    plt.savefig(filepath, dpi=300, bbox_inches='tight')
-    print(f"  Saved: {filepath}")
-    plt.show()
+    save_figure(os.path.join(RESULTS_DIR, filename), dpi, preview_dpi, show)
 
 
-if project_metrics:
-    print("Creating heatmap visualizations...\n")
-
-    # Textual similarity heatmap
-    plot_similarity_heatmap(textual_similarity, project_names,
-                           'Textual Similarity Matrix (TF-IDF + Cosine)',
-                           'textual_similarity_heatmap.png')
+def plot_heatmaps(figure_renderer: FigureRenderer, similarities: Dict[str, Optional[np.ndarray]],
+                  project_names: List[str]) -> None:
+    """
+    Submit a heatmap for each available textual, structural and semantic matrix.
 
-    # Structural similarity heatmap
-    plot_similarity_heatmap(structural_similarity, project_names,
-                           'Structural Similarity Matrix (AST Features)',
-                           'structural_similarity_heatmap.png')
+    Args:
+        figure_renderer: Renderer the figures are submitted to
+        similarities: Similarity matrices by metric (missing or None entries are skipped)
+        project_names: Name of each row/column
+    """
+    print("Creating heatmap visualizations...\n")
+    titles = {
+        'textual': f'Textual Similarity Matrix ({textual_backend_label()} + Cosine)',
+        'structural': f'Structural Similarity Matrix ({structural_backend_label()})',
+        'semantic': f'Semantic Similarity Matrix ({semantic_backend_label()})',
+    }
 
-    # Semantic similarity heatmap (if available)
-    if semantic_similarity is not None:
-        plot_similarity_heatmap(semantic_similarity, project_names,
-                               'Semantic Similarity Matrix (CodeBERT)',
-                               'semantic_similarity_heatmap.png')
+    with pipeline_profiler.stage('plots'):
+        for metric, title in titles.items():
+            if similarities.get(metric) is not None:
+                figure_renderer.submit(plot_similarity_heatmap, f'{metric}_similarity_heatmap.png',
+                                       similarity_matrix=similarities[metric],
+                                       project_names=project_names, title=title)
 
-    print("\n✓ All heatmaps created")
+    if not figure_renderer.headless:
+        print("\n✓ All heatmaps created")
 
 
 # ### 4.2 Comparison Bar Chart
@@ -825,31 +4318,25 @@ if project_metrics:
 # In[ ]:
 
 
-if project_metrics:
-    # Calculate average similarities (excluding diagonal)
-    def avg_similarity(matrix):
-        n = matrix.shape[0]
-        mask = ~np.eye(n, dtype=bool)
-        return matrix[mask].mean()
-
-    avg_textual = avg_similarity(textual_similarity)
-    avg_structural = avg_similarity(structural_similarity)
-
-    metrics_data = {
-        'Metric': ['Textual\n(TF-IDF)', 'Structural\n(AST Features)'],
-        'Average Similarity': [avg_textual, avg_structural]
-    }
+def plot_average_similarity(labels: List[str], values: List[float], filename: str,
+                            dpi: Optional[int] = None, preview_dpi: Optional[int] = None,
+                            show: bool = False) -> None:
+    """
+    Create and save the bar chart of average similarity per metric.
 
-    if semantic_similarity is not None:
-        avg_semantic = avg_similarity(semantic_similarity)
-        metrics_data['Metric'].append('Semantic\n(CodeBERT)')
-        metrics_data['Average Similarity'].append(avg_semantic)
+    Args:
+        labels: Metric names
+        values: Average similarity of each metric
+        filename: Output filename
+        dpi: Resolution of the saved figure (default: PLOT_DPI)
+        preview_dpi: Resolution of an additional preview (None = no preview)
+        show: Display the figure instead of closing it
+    """
+    import matplotlib.pyplot as plt
 
-    # Create bar chart
     plt.figure(figsize=(10, 6))
     colors = ['#FF6B6B', '#4ECDC4', '#45B7D1']
-    bars = plt.bar(metrics_data['Metric'], metrics_data['Average Similarity'], 
-                   color=colors[:len(metrics_data['Metric'])], edgecolor='black', linewidth=1.5)
+    bars = plt.bar(labels, values, color=colors[:len(labels)], edgecolor='black', linewidth=1.5)
 
     plt.ylabel('Average Similarity Score', fontsize=12)
     plt.xlabel('Similarity Metric', fontsize=12)
@@ -865,10 +4352,38 @@ if project_metrics:
                 ha='center', va='bottom', fontsize=12, fontweight='bold')
 
     plt.tight_layout()
-    filepath = os.path.join(RESULTS_DIR, 'average_similarity_comparison.png')
-    plt.savefig(filepath, dpi=300, bbox_inches='tight')
-    print(f"Saved: {filepath}")
-    plt.show()
+    save_figure(os.path.join(RESULTS_DIR, filename), dpi, preview_dpi, show)
+
+
+def average_similarity(matrix: np.ndarray) -> float:
+    """Mean similarity over all pairs of different projects (diagonal excluded)."""
+    n = matrix.shape[0]
+    mask = ~np.eye(n, dtype=bool)
+    return matrix[mask].mean()
+
+
+def plot_comparison_chart(figure_renderer: FigureRenderer, similarities: Dict[str, Optional[np.ndarray]]) -> None:
+    """
+    Submit the bar chart of average textual, structural and semantic similarity.
+
+    Args:
+        figure_renderer: Renderer the figure is submitted to
+        similarities: Similarity matrices by metric (missing or None entries are skipped)
+    """
+    labels = {
+        'textual': f'Textual\n({textual_backend_label()})',
+        'structural': f'Structural\n({structural_backend_label()})',
+        'semantic': f'Semantic\n({semantic_backend_label()})',
+    }
+    metrics_data = {'Metric': [], 'Average Similarity': []}
+    for metric, label in labels.items():
+        if similarities.get(metric) is not None:
+            metrics_data['Metric'].append(label)
+            metrics_data['Average Similarity'].append(average_similarity(similarities[metric]))
+
+    with pipeline_profiler.stage('plots'):
+        figure_renderer.submit(plot_average_similarity, 'average_similarity_comparison.png',
+                               labels=metrics_data['Metric'], values=metrics_data['Average Similarity'])
 
 
 # ### 4.3 Network Graph Visualization
@@ -876,60 +4391,204 @@ if project_metrics:
 # In[ ]:
 
 
-import networkx as nx
+def similarity_edges(similarity_matrix, threshold: float, knn: Optional[int] = None,
+                     block_cells: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Extract the sparse edge list of a similarity matrix.
 
-if project_metrics:
-    # Create network graph based on textual similarity
-    # Only show edges with similarity > threshold
-    threshold = 0.3
+    Rows are read in blocks of about block_cells cells, so memory-mapped
+    matrices are never loaded whole. Without knn every upper-triangle pair
+    above the threshold is an edge; with knn a pair is kept only if one
+    endpoint is among the other's knn most similar projects, which bounds
+    the edge count at N * knn.
 
-    G = nx.Graph()
+    Args:
+        similarity_matrix: NxN similarity matrix (ndarray or memmap)
+        threshold: Only pairs with a higher similarity become edges
+        knn: Neighbors kept per node (None = all pairs above the threshold)
+        block_cells: Matrix cells read per block (at least one row; default: PAIR_SCAN_BLOCK_CELLS)
 
-    # Add nodes
-    for name in project_names:
-        G.add_node(name)
+    Returns:
+        Tuple of (rows, cols, weights) with rows < cols
+    """
+    if block_cells is None:
+        block_cells = PAIR_SCAN_BLOCK_CELLS
+    n = similarity_matrix.shape[0]
+    block_rows = max(1, block_cells // max(n, 1))
+    rows, cols, weights = [], [], []
+
+    for start in range(0, n, block_rows):
+        block = np.array(similarity_matrix[start:start + block_rows], dtype=np.float64)
+        block_index = np.arange(len(block))
+        if knn is None:
+            mask = block > threshold
+            mask &= np.arange(n) > (block_index + start)[:, None]
+            block_i, block_j = np.nonzero(mask)
+        else:
+            block[block_index, block_index + start] = -np.inf
+            k = min(knn, n - 1)
+            block_j = np.argpartition(-block, k - 1, axis=1)[:, :k].ravel() if k > 0 else np.empty(0, dtype=np.int64)
+            block_i = np.repeat(block_index, k)
+            keep = block[block_i, block_j] > threshold
+            block_i, block_j = block_i[keep], block_j[keep]
+        rows.append(block_i + start)
+        cols.append(block_j)
+        weights.append(block[block_i, block_j])
+
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.int64)
+    weights = np.concatenate(weights) if weights else np.empty(0)
+    if knn is not None:
+        # A pair chosen from both ends appears twice; keep it once as (min, max)
+        rows, cols = np.minimum(rows, cols), np.maximum(rows, cols)
+        _, unique = np.unique(rows.astype(np.int64) * n + cols, return_index=True)
+        rows, cols, weights = rows[unique], cols[unique], weights[unique]
+    return rows, cols, weights
+
+
+def network_layout(G, layout: Optional[str] = None,
+                   fast_nodes: Optional[int] = None) -> Tuple[Dict, str]:
+    """
+    Position the nodes of a similarity network.
 
-    # Add edges for similar projects
-    n = len(project_names)
-    for i in range(n):
-        for j in range(i + 1, n):
-            sim = textual_similarity[i][j]
-            if sim > threshold:
-                G.add_edge(project_names[i], project_names[j], weight=sim)
+    The spring layout (Fruchterman-Reingold) is O(N^2) per iteration and
+    takes seconds from about a thousand nodes on; the spectral layout
+    solves one sparse eigenproblem instead and stays well under a second
+    for thousands of nodes.
+
+    Args:
+        G: Graph to lay out
+        layout: 'spring', 'spectral', or 'auto' (spectral above fast_nodes nodes;
+            default: NETWORK_LAYOUT)
+        fast_nodes: Node count from which 'auto' uses the spectral layout
+            (default: NETWORK_FAST_LAYOUT_NODES)
+
+    Returns:
+        Tuple of (positions by node, layout used)
+    """
+    import networkx as nx
+
+    layout = NETWORK_LAYOUT if layout is None else layout
+    fast_nodes = NETWORK_FAST_LAYOUT_NODES if fast_nodes is None else fast_nodes
+
+    if layout == 'auto':
+        layout = 'spectral' if G.number_of_nodes() > fast_nodes else 'spring'
+    if layout == 'spectral':
+        return nx.spectral_layout(G), layout
+    if layout == 'spring':
+        return nx.spring_layout(G, k=2, iterations=50, seed=42), layout
+    raise ValueError(f"Unknown NETWORK_LAYOUT: {layout!r} (expected 'spring', 'spectral' or 'auto')")
+
+
+def plot_similarity_network(similarity_matrix: np.ndarray, project_names: List[str], threshold: float,
+                            filename: str, knn: Optional[int] = None, layout: Optional[str] = None,
+                            dpi: Optional[int] = None, preview_dpi: Optional[int] = None,
+                            show: bool = False) -> Dict[str, Any]:
+    """
+    Create and save the project similarity network.
+
+    Args:
+        similarity_matrix: NxN similarity matrix
+        project_names: List of project names
+        threshold: Only pairs with a higher similarity become edges
+        filename: Output filename
+        knn: Neighbors kept per node (None = all pairs above the threshold)
+        layout: 'spring', 'spectral' or 'auto' (see network_layout; default: NETWORK_LAYOUT)
+        dpi: Resolution of the saved figure (default: PLOT_DPI)
+        preview_dpi: Resolution of an additional preview (None = no preview)
+        show: Display the figure instead of closing it
+
+    Returns:
+        Node count, edge count, density, layout used and seconds per step
+    """
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
+    timings = {}
+
+    start = time.perf_counter()
+    rows, cols, sims = similarity_edges(similarity_matrix, threshold, knn)
+    timings['edges'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    G = nx.Graph()
+    G.add_nodes_from(project_names)
+    names = np.asarray(project_names, dtype=object)
+    G.add_weighted_edges_from(zip(names[rows], names[cols], sims.tolist()))
+    timings['graph'] = time.perf_counter() - start
 
     # Plot network
-    plt.figure(figsize=(14, 10))
+    start = time.perf_counter()
+    pos, layout = network_layout(G, layout)
+    timings['layout'] = time.perf_counter() - start
 
-    # Layout
-    pos = nx.spring_layout(G, k=2, iterations=50, seed=42)
+    start = time.perf_counter()
+    plt.figure(figsize=(14, 10))
+    n = G.number_of_nodes()
+    small = n <= 100
 
     # Draw nodes
-    nx.draw_networkx_nodes(G, pos, node_color='lightblue', 
-                          node_size=1000, alpha=0.9, edgecolors='black', linewidths=2)
+    nx.draw_networkx_nodes(G, pos, node_color='lightblue', node_size=1000 if small else max(10, 100000 // n),
+                          alpha=0.9, edgecolors='black', linewidths=2 if small else 0.5)
 
     # Draw edges with varying thickness based on similarity
     edges = G.edges()
     weights = [G[u][v]['weight'] for u, v in edges]
-    nx.draw_networkx_edges(G, pos, width=[w * 5 for w in weights], 
+    nx.draw_networkx_edges(G, pos, width=[w * (5 if small else 1) for w in weights],
                           alpha=0.6, edge_color=weights, edge_cmap=plt.cm.YlOrRd)
 
-    # Draw labels
-    nx.draw_networkx_labels(G, pos, font_size=8, font_weight='bold')
+    # Draw labels (unreadable beyond a hundred nodes)
+    if small:
+        nx.draw_networkx_labels(G, pos, font_size=8, font_weight='bold')
 
-    plt.title(f'Project Similarity Network\n(Edges shown for similarity > {threshold})',
+    edge_rule = f'similarity > {threshold}' + (f', {knn} nearest neighbors' if knn else '')
+    plt.title(f'Project Similarity Network\n(Edges shown for {edge_rule})',
              fontsize=16, fontweight='bold', pad=20)
     plt.axis('off')
     plt.tight_layout()
+    timings['draw'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    save_figure(os.path.join(RESULTS_DIR, filename), dpi, preview_dpi, show)
+    timings['save'] = time.perf_counter() - start
+
+    return {'nodes': n, 'edges': G.number_of_edges(), 'density': nx.density(G),
+            'layout': layout, 'timings': timings}
+
+
+def plot_network(figure_renderer: FigureRenderer, textual_similarity: np.ndarray,
+                 project_names: List[str]) -> Dict[str, Any]:
+    """
+    Submit the textual similarity network, render all pending figures and print the graph statistics.
+
+    Args:
+        figure_renderer: Renderer holding the figures submitted so far
+        textual_similarity: NxN textual similarity matrix
+        project_names: Name of each row/column
+
+    Returns:
+        Network statistics returned by plot_similarity_network
+    """
+    # Create network graph based on textual similarity
+    with pipeline_profiler.stage('plots'):
+        figure_renderer.submit(plot_similarity_network, 'similarity_network.png',
+                               similarity_matrix=textual_similarity, project_names=project_names,
+                               threshold=NETWORK_THRESHOLD, knn=NETWORK_KNN)
 
-    filepath = os.path.join(RESULTS_DIR, 'similarity_network.png')
-    plt.savefig(filepath, dpi=300, bbox_inches='tight')
-    print(f"Saved: {filepath}")
-    plt.show()
+        # Headless mode renders everything submitted so far in parallel here
+        figure_results = figure_renderer.wait()
+    network_stats = figure_results['similarity_network.png']
+    if figure_renderer.headless:
+        print("\n✓ All figures rendered")
 
     print(f"\nNetwork statistics:")
-    print(f"  Nodes: {G.number_of_nodes()}")
-    print(f"  Edges: {G.number_of_edges()}")
-    print(f"  Density: {nx.density(G):.3f}")
+    print(f"  Nodes: {network_stats['nodes']}")
+    print(f"  Edges: {network_stats['edges']}")
+    print(f"  Density: {network_stats['density']:.3f}")
+    print(f"  Layout: {network_stats['layout']}")
+    print(f"  Step timings: " + ", ".join(
+        f"{step} {seconds:.3f}s" for step, seconds in network_stats['timings'].items()))
+    return network_stats
 
 
 # ## 5. Conclusions <a name="conclusions"></a>
@@ -937,23 +4596,45 @@ if project_metrics:
 # In[ ]:
 
 
-if project_metrics:
+def print_conclusions(project_names: List[str], similarities: Dict[str, Optional[np.ndarray]],
+                      cache_stats: Optional[Dict] = None) -> None:
+    """
+    Print the analysis summary and key insights for the metrics that were computed.
+
+    Args:
+        project_names: Name of each row/column
+        similarities: Similarity matrices by metric (missing or None entries are skipped)
+        cache_stats: Preprocessing cache statistics from analyze_all_projects (None = not run)
+    """
+    labels = {
+        'textual': f'Textual ({textual_backend_label()} + Cosine Similarity)',
+        'structural': f'Structural ({structural_backend_label()})',
+        'semantic': f'Semantic ({semantic_backend_label()})',
+    }
+    averages = {metric: average_similarity(similarities[metric])
+                for metric in labels if similarities.get(metric) is not None}
+
     print("=" * 80)
     print("ANALYSIS SUMMARY")
     print("=" * 80)
 
-    print(f"\nTotal projects analyzed: {len(project_metrics)}")
+    print(f"\nTotal projects analyzed: {len(project_names)}")
     print(f"\nSimilarity metrics computed:")
-    print(f"  ✓ Textual (TF-IDF + Cosine Similarity)")
-    print(f"  ✓ Structural (AST Features)")
-    if semantic_similarity is not None:
-        print(f"  ✓ Semantic (CodeBERT Embeddings)")
+    for metric in averages:
+        print(f"  ✓ {labels[metric]}")
 
     print(f"\nAverage similarities:")
-    print(f"  Textual: {avg_textual:.3f}")
-    print(f"  Structural: {avg_structural:.3f}")
-    if semantic_similarity is not None:
-        print(f"  Semantic: {avg_semantic:.3f}")
+    for metric, average in averages.items():
+        print(f"  {metric.capitalize()}: {average:.3f}")
+
+    if cache_stats:
+        cache_lookups = cache_stats['hits'] + cache_stats['misses']
+        hit_rate = cache_stats['hits'] / cache_lookups if cache_lookups else 0.0
+        print(f"\nPreprocessing cache ({PREPROCESS_CACHE_PATH}):")
+        print(f"  Hits: {cache_stats['hits']}, Misses: {cache_stats['misses']}, Hit rate: {hit_rate:.1%}")
+        print(f"  Size: {cache_stats['size'] / (1024 * 1024):.2f} MB "
+              f"(limit {PREPROCESS_CACHE_MAX_BYTES / (1024 * 1024):.0f} MB), "
+              f"evicted {cache_stats['evicted']} entries")
 
     print(f"\nOutputs saved in '{RESULTS_DIR}/' directory:")
     for file in sorted(os.listdir(RESULTS_DIR)):
@@ -963,33 +4644,252 @@ if project_metrics:
     print("KEY INSIGHTS")
     print("=" * 80)
 
-    print("\n1. CODING DIVERSITY:")
-    if avg_textual < 0.3:
-        print("   → HIGH diversity: Projects show significant textual differences")
-    elif avg_textual < 0.6:
-        print("   → MODERATE diversity: Some common patterns but varied implementations")
-    else:
-        print("   → LOW diversity: Projects share substantial code similarities")
-
-    print("\n2. STRUCTURAL CONSISTENCY:")
-    if avg_structural > 0.7:
-        print("   → HIGH consistency: Teams followed similar architectural patterns")
-    elif avg_structural > 0.4:
-        print("   → MODERATE consistency: Mix of different approaches")
-    else:
-        print("   → LOW consistency: Diverse architectural choices")
-
-    print("\n3. PATTERNS OF REUSE:")
-    # Find projects with very high similarity
-    high_sim_count = np.sum(textual_similarity > 0.8) - len(project_names)  # Exclude diagonal
-    if high_sim_count > 0:
-        print(f"   → Found {high_sim_count} project pairs with >80% similarity")
-        print("   → Possible code sharing or template usage detected")
-    else:
-        print("   → No significant code reuse patterns detected")
-        print("   → Each team implemented independent solutions")
+    if 'textual' in averages:
+        print("\n1. CODING DIVERSITY:")
+        if averages['textual'] < 0.3:
+            print("   → HIGH diversity: Projects show significant textual differences")
+        elif averages['textual'] < 0.6:
+            print("   → MODERATE diversity: Some common patterns but varied implementations")
+        else:
+            print("   → LOW diversity: Projects share substantial code similarities")
+
+    if 'structural' in averages:
+        print("\n2. STRUCTURAL CONSISTENCY:")
+        if averages['structural'] > 0.7:
+            print("   → HIGH consistency: Teams followed similar architectural patterns")
+        elif averages['structural'] > 0.4:
+            print("   → MODERATE consistency: Mix of different approaches")
+        else:
+            print("   → LOW consistency: Diverse architectural choices")
+
+    if 'textual' in averages:
+        print("\n3. PATTERNS OF REUSE:")
+        # Find projects with very high similarity
+        high_sim_count = np.sum(similarities['textual'] > 0.8) - len(project_names)  # Exclude diagonal
+        if high_sim_count > 0:
+            print(f"   → Found {high_sim_count} project pairs with >80% similarity")
+            print("   → Possible code sharing or template usage detected")
+        else:
+            print("   → No significant code reuse patterns detected")
+            print("   → Each team implemented independent solutions")
 
     print("\n" + "=" * 80)
     print("✓ Analysis Complete!")
     print("=" * 80)
 
+
+# ## 6. Command-Line Driver <a name="cli"></a>
+#
+# `python analysis_script.py` runs every stage, as the notebook does. Nightly jobs
+# can select stages, e.g. `python analysis_script.py --stages preprocess,textual,structural`.
+# Importing the module only defines the functions; nothing runs until main().
+
+# In[ ]:
+
+
+STAGES = ('preprocess', 'textual', 'structural', 'semantic', 'plots')
+SIMILARITY_STAGES = ('textual', 'structural', 'semantic')
+
+
+def load_saved_similarities(metrics: Tuple[str, ...]) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """
+    Load matrices saved by an earlier run (condensed format) for stages that did not run now.
+
+    Args:
+        metrics: Metric names to load, e.g. ('textual', 'structural')
+
+    Returns:
+        Tuple of (project names, dense matrices by metric); matrices whose
+        projects differ from the first one loaded are skipped
+    """
+    project_names, similarities = None, {}
+    for metric in metrics:
+        try:
+            saved = load_similarity_matrix(metric, mmap=False)
+        except FileNotFoundError:
+            print(f"⚠ No saved {metric} similarity matrix in {RESULTS_DIR}/; run the '{metric}' stage first")
+            continue
+        if project_names is None:
+            project_names = saved.names
+        if saved.names != project_names:
+            print(f"⚠ Saved {metric} similarity matrix covers different projects; skipped")
+            continue
+        similarities[metric] = saved.to_dense()
+        print(f"Loaded saved {metric} similarity matrix: {saved.shape}")
+    return project_names or [], similarities
+
+
+def run_plots_stage(project_names: List[str], similarities: Dict[str, Optional[np.ndarray]]) -> None:
+    """
+    Part C: heatmaps, comparison bar chart and similarity network.
+
+    Args:
+        project_names: Name of each row/column
+        similarities: Similarity matrices by metric (missing or None entries are skipped)
+    """
+    figure_renderer = FigureRenderer(headless=HEADLESS_PLOTS, workers=PLOT_WORKERS)
+    plot_heatmaps(figure_renderer, similarities, project_names)
+    plot_comparison_chart(figure_renderer, similarities)
+    if similarities.get('textual') is not None:
+        plot_network(figure_renderer, similarities['textual'], project_names)
+    else:
+        with pipeline_profiler.stage('plots'):
+            figure_renderer.wait()
+
+
+def run_pipeline(stages: Tuple[str, ...] = STAGES) -> Dict[str, Optional[np.ndarray]]:
+    """
+    Run the selected stages in pipeline order.
+
+    The similarity stages need the preprocessed projects, so preprocessing
+    runs whenever one of them is selected (unchanged files come from the
+    preprocessing cache). Plots use the matrices computed in this run and
+    load the others from RESULTS_DIR.
+
+    Args:
+        stages: Any of STAGES
+
+    Returns:
+        Similarity matrices computed or loaded, by metric
+    """
+    project_metrics, cache_stats, project_names = [], None, []
+    similarities = {}
+
+    if 'preprocess' in stages or any(stage in stages for stage in SIMILARITY_STAGES):
+        project_metrics, cache_stats = run_preprocess_stage(list_projects(PROJECTS_DIR))
+        project_names = [m['name'] for m in project_metrics]
+
+    if project_metrics:
+        if 'textual' in stages:
+            similarities.update(run_textual_stage(project_metrics))
+        if 'structural' in stages:
+            similarities.update(run_structural_stage(project_metrics))
+        if 'semantic' in stages:
+            similarities['semantic'] = run_semantic_stage(project_metrics)
+        if similarities:
+            report_extreme_pairs(similarities, project_names)
+        if 'textual' in stages and FILE_NEIGHBORS_K > 0:
+            report_file_neighbors(project_metrics)
+        if 'textual' in stages and CLONE_MIN_TOKENS > 0:
+            report_clone_fragments(project_metrics)
+
+    if 'plots' in stages:
+        missing = tuple(metric for metric in SIMILARITY_STAGES if metric not in similarities)
+        if missing:
+            saved_names, saved = load_saved_similarities(missing)
+            if not similarities:
+                project_names = saved_names
+            if saved_names == project_names:
+                similarities.update(saved)
+            elif saved:
+                print(f"⚠ Saved {', '.join(saved)} matrices cover different projects than this run; not plotted")
+        if similarities:
+            run_plots_stage(project_names, similarities)
+
+    if project_names and any(similarities.get(metric) is not None for metric in SIMILARITY_STAGES):
+        print_conclusions(project_names, similarities, cache_stats)
+
+    # Stage timing and memory report (configure with PROFILE_* in section 2.1)
+    if pipeline_profiler.enabled and pipeline_profiler.stages:
+        pipeline_profiler.write(PROFILE_PATH)
+        print("\n=== PIPELINE PROFILE ===")
+        print(pipeline_profiler.report().to_string(index=False))
+        print(f"\n✓ Saved stage profile to {PROFILE_PATH}")
+
+    return similarities
+
+
+def _rebase_path(path: Optional[str], old_dir: str, new_dir: str) -> Optional[str]:
+    """Move a path that lives inside old_dir to the same place inside new_dir."""
+    if path is None:
+        return None
+    relative = os.path.relpath(path, old_dir)
+    return path if relative.startswith(os.pardir) else os.path.join(new_dir, relative)
+
+
+def configure(projects_dir: Optional[str] = None, results_dir: Optional[str] = None,
+              workers: Optional[int] = None, incremental: Optional[bool] = None,
+              headless: Optional[bool] = None) -> None:
+    """
+    Override the directory, worker, incremental and plotting settings of section 2.1.
+
+    Paths configured inside RESULTS_DIR (cache, spill files, similarity
+    state, profile) move with it.
+
+    Args:
+        projects_dir: Directory containing the project folders
+        results_dir: Directory for all outputs
+        workers: Processes used for project analysis, Levenshtein and plots
+        incremental: Reuse the saved similarity state (INCREMENTAL_SIMILARITY)
+        headless: Render figures in batch mode without plt.show() (HEADLESS_PLOTS)
+    """
+    global PROJECTS_DIR, RESULTS_DIR, PREPROCESS_CACHE_PATH, SPILL_DIR, SIMILARITY_STATE_DIR
+    global PROFILE_PATH, ANALYSIS_WORKERS, PLOT_WORKERS, INCREMENTAL_SIMILARITY, HEADLESS_PLOTS
+
+    if projects_dir is not None:
+        PROJECTS_DIR = projects_dir
+    if results_dir is not None:
+        PREPROCESS_CACHE_PATH = _rebase_path(PREPROCESS_CACHE_PATH, RESULTS_DIR, results_dir)
+        SPILL_DIR = _rebase_path(SPILL_DIR, RESULTS_DIR, results_dir)
+        SIMILARITY_STATE_DIR = _rebase_path(SIMILARITY_STATE_DIR, RESULTS_DIR, results_dir)
+        PROFILE_PATH = _rebase_path(PROFILE_PATH, RESULTS_DIR, results_dir)
+        RESULTS_DIR = results_dir
+    if workers is not None:
+        ANALYSIS_WORKERS = PLOT_WORKERS = workers
+    if incremental is not None:
+        INCREMENTAL_SIMILARITY = incremental
+    if headless is not None:
+        HEADLESS_PLOTS = headless
+
+
+def parse_stages(value: str) -> Tuple[str, ...]:
+    """Parse a comma-separated --stages value ('all' selects every stage)."""
+    if value.strip() == 'all':
+        return STAGES
+    stages = tuple(stage.strip() for stage in value.split(',') if stage.strip())
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown or not stages:
+        raise argparse.ArgumentTypeError(
+            f"unknown stage(s) {', '.join(unknown) or '(none)'}; choose from {', '.join(STAGES)} or 'all'")
+    return stages
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command-line entry point.
+
+    Args:
+        argv: Arguments without the program name (defaults to sys.argv[1:])
+
+    Returns:
+        Process exit code
+    """
+    parser = argparse.ArgumentParser(
+        description="Code similarity analysis of the VidyaVichar MERN projects.")
+    parser.add_argument('--stages', type=parse_stages, default=STAGES,
+                        help=f"comma-separated stages to run: {','.join(STAGES)} (default: all)")
+    parser.add_argument('--projects-dir', default=None,
+                        help=f"directory containing one folder per project (default: {PROJECTS_DIR})")
+    parser.add_argument('--results-dir', default=None,
+                        help=f"directory for all outputs (default: {RESULTS_DIR})")
+    parser.add_argument('--workers', type=int, default=None,
+                        help=f"worker processes for analysis and plots (default: {ANALYSIS_WORKERS})")
+    parser.add_argument('--incremental', action='store_true', default=None,
+                        help="only recompute similarity rows of new or changed projects, "
+                             "reusing results/similarity_state/")
+    parser.add_argument('--headless', action='store_true', default=None,
+                        help="render figures with the Agg backend in worker processes, "
+                             "never calling plt.show()")
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    configure(args.projects_dir, args.results_dir, args.workers, args.incremental, args.headless)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    print(f"Stages: {', '.join(stage for stage in STAGES if stage in args.stages)}")
+    run_pipeline(args.stages)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
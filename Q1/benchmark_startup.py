@@ -0,0 +1,149 @@
+"""
+Startup benchmark for analysis_script.py based on `python -X importtime`.
+
+Imports the analysis module in a fresh interpreter several times and reports
+the median import time, the slowest packages it pulls in, and which heavy
+libraries are loaded before any stage runs. With --baseline, the version of
+the script at a git revision is measured too, for a before/after comparison.
+
+Usage:
+    python benchmark_startup.py
+    python benchmark_startup.py --baseline HEAD~1 --repeat 7
+
+Results are written to results/startup_benchmark.json.
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+# Configuration
+SCRIPT = "analysis_script.py"
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = os.path.join("results", "startup_benchmark.json")
+HEAVY_MODULES = ['pandas', 'matplotlib', 'seaborn', 'sklearn', 'scipy', 'Levenshtein',
+                 'esprima', 'networkx', 'torch', 'transformers']
+TOP_MODULES = 10
+
+
+def parse_importtime(stderr):
+    """
+    Parse the `-X importtime` log.
+
+    Args:
+        stderr: Standard error of an interpreter started with -X importtime
+
+    Returns:
+        Dict mapping every imported module to its cumulative import time in microseconds
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        fields = line[len('import time:'):].split('|')
+        if not line.startswith('import time:') or len(fields) != 3 or 'cumulative' in line:
+            continue
+        _, cumulative, name = fields
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def measure(script_dir, repeat):
+    """
+    Import analysis_script from script_dir in fresh interpreters.
+
+    Args:
+        script_dir: Directory containing analysis_script.py
+        repeat: Number of interpreter runs
+
+    Returns:
+        Dict with the median import time, the slowest top-level packages and
+        the heavy libraries that were loaded
+    """
+    runs = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import analysis_script'],
+            cwd=script_dir, capture_output=True, text=True,
+            env=dict(os.environ, MPLBACKEND='Agg'))
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {script_dir}/{SCRIPT} failed:\n{completed.stderr[-2000:]}")
+        runs.append(parse_importtime(completed.stderr))
+
+    median_run = sorted(runs, key=lambda modules: modules['analysis_script'])[len(runs) // 2]
+    packages = {name: time_us for name, time_us in median_run.items() if '.' not in name
+                and name != 'analysis_script'}
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:TOP_MODULES]
+    return {
+        'import_ms': statistics.median(run['analysis_script'] for run in runs) / 1000,
+        'modules_loaded': len(median_run),
+        'heavy_modules_loaded': [name for name in HEAVY_MODULES if name in median_run],
+        'slowest_packages_ms': {name: time_us / 1000 for name, time_us in slowest},
+    }
+
+
+def checkout_script(revision, target_dir):
+    """
+    Write analysis_script.py as of a git revision into target_dir.
+
+    Args:
+        revision: Any git revision, e.g. HEAD~1
+        target_dir: Directory to write the script into
+    """
+    relative = os.path.relpath(os.path.join(SCRIPT_DIR, SCRIPT), _git_root())
+    source = subprocess.run(['git', 'show', f'{revision}:{relative}'], cwd=SCRIPT_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    with open(os.path.join(target_dir, SCRIPT), 'w') as f:
+        f.write(source)
+
+
+def _git_root():
+    """Top-level directory of the enclosing git repository."""
+    return subprocess.run(['git', 'rev-parse', '--show-toplevel'], cwd=SCRIPT_DIR,
+                          capture_output=True, text=True, check=True).stdout.strip()
+
+
+def print_result(label, result):
+    """Print one measurement."""
+    print(f"\n{label}")
+    print(f"  Import time: {result['import_ms']:.0f} ms ({result['modules_loaded']} modules)")
+    print(f"  Heavy libraries loaded: {', '.join(result['heavy_modules_loaded']) or 'none'}")
+    print("  Slowest packages:")
+    for name, time_ms in result['slowest_packages_ms'].items():
+        print(f"    {name:<20} {time_ms:8.1f} ms")
+
+
+def main():
+    """Measure the startup cost of analysis_script.py."""
+    parser = argparse.ArgumentParser(description="Measure the import time of analysis_script.py.")
+    parser.add_argument('--baseline', help="git revision to compare against, e.g. HEAD~1")
+    parser.add_argument('--repeat', type=int, default=5, help="interpreter runs per version (default: 5)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("analysis_script.py Startup Benchmark (-X importtime)")
+    print("=" * 70)
+
+    report = {'python': sys.version.split()[0], 'repeat': args.repeat}
+    report['current'] = measure(SCRIPT_DIR, args.repeat)
+    print_result("Current working tree:", report['current'])
+
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as baseline_dir:
+            checkout_script(args.baseline, baseline_dir)
+            report['baseline'] = measure(baseline_dir, args.repeat)
+        report['baseline_revision'] = args.baseline
+        print_result(f"Baseline ({args.baseline}):", report['baseline'])
+        speedup = report['baseline']['import_ms'] / report['current']['import_ms']
+        print(f"\n✓ Import is {speedup:.1f}x faster than {args.baseline}")
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Saved: {RESULTS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
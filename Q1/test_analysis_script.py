@@ -0,0 +1,329 @@
+"""
+Regression tests for the similarity analysis pipeline.
+
+Run from the Q1 directory with: python -m pytest -q
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add this directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import analysis_script as a
+
+
+# ---------------------------------------------------------------------------
+# Comment stripping
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize('source, expected', [
+    ('const u = "http://x"; // c', 'const u = "http://x"; '),
+    ("const q = 'a // b'; /* c */", "const q = 'a // b'; "),
+    ('a /* b */ c', 'a  c'),
+    ('const r = /\\/\\/x/g; // c', 'const r = /\\/\\/x/g; '),
+    ('const t = `a ${ `inner // not` } b`; // c', 'const t = `a ${ `inner // not` } b`; '),
+    ('const s = `${ {a: "//"}.a } /* k */`; /* x */', 'const s = `${ {a: "//"}.a } /* k */`; '),
+    ('const h = `<p>${xs.map(x => { return `<b>${x}</b>`; })}</p>`; // c',
+     'const h = `<p>${xs.map(x => { return `<b>${x}</b>`; })}</p>`; '),
+    ('const c = `$5 and $ {x} // kept`; // gone', 'const c = `$5 and $ {x} // kept`; '),
+])
+def test_comments_removed_literals_kept(source, expected):
+    """Comments are dropped; strings, regex and template literals survive whole."""
+    assert a.remove_js_comments(source) == expected
+
+
+def test_console_calls_removed():
+    """Console calls go, including template arguments with nested templates."""
+    source = 'console.log(`${ `x // y` }`); f();'
+    assert a.remove_js_comments(source) == ' f();'
+    assert a.remove_js_comments(source, strip_console=False) == source
+
+
+def test_unterminated_template_does_not_hang():
+    """An unterminated template literal falls back to plain code."""
+    assert a.remove_js_comments('let x = `open // c\nnext') == 'let x = `open \nnext'
+
+
+# ---------------------------------------------------------------------------
+# Sample projects
+# ---------------------------------------------------------------------------
+
+SERVER_JS = """const express = require('express');
+const mongoose = require('mongoose');
+const router = express.Router();
+
+// Question schema
+const QuestionSchema = new mongoose.Schema({
+  text: { type: String, required: true },
+  votes: Number,
+  tags: [String],
+});
+module.exports = mongoose.model('Question', QuestionSchema);
+
+router.get('/api/questions', async (req, res) => {
+  console.log('listing'); /* debug */
+  res.json(await Question.find());
+});
+router.post('/api/questions/:id/vote', (req, res) => res.sendStatus(204));
+"""
+
+APP_JSX = """import React from 'react';
+
+function QuestionList({ questions }) {
+  return <ul>{questions.map(q => <li key={q._id}>{q.text}</li>)}</ul>;
+}
+
+export default QuestionList;
+"""
+
+
+def write_project(root, name: str, files: dict) -> str:
+    """Create a project folder with the given {relative path: content} files."""
+    project = root / name
+    for rel_path, content in files.items():
+        path = project / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return str(project)
+
+
+@pytest.fixture
+def projects(tmp_path):
+    """Four small MERN-like projects, with excluded and minified files mixed in."""
+    root = tmp_path / 'projects'
+    minified = 'var a=' + ','.join(str(i) for i in range(400)) + ';'
+    return [
+        write_project(root, 'Team_A', {
+            'backend/server.js': SERVER_JS,
+            'frontend/src/App.jsx': APP_JSX,
+            'node_modules/lib/index.js': SERVER_JS,
+            'frontend/public/vendor.js': minified,
+        }),
+        write_project(root, 'Team_B', {
+            'server/routes.js': SERVER_JS.replace('votes', 'score').replace('/vote', '/upvote'),
+            'client/App.jsx': APP_JSX.replace('QuestionList', 'Questions'),
+            'client/styles.css': 'body { margin: 0; }\n',
+        }),
+        write_project(root, 'Team_C', {
+            'index.js': "const app = require('express')();\napp.delete('/api/items/:itemId', h);\n",
+            'package.json': '{"name": "team-c"}\n',
+        }),
+        write_project(root, 'Team_D', {
+            'src/App.jsx': APP_JSX,
+            'dist/bundle.js': SERVER_JS,
+        }),
+    ]
+
+
+@pytest.fixture
+def configured(tmp_path, monkeypatch):
+    """Point every output of the script into a temporary results directory."""
+    results = tmp_path / 'results'
+    results.mkdir()
+    monkeypatch.setattr(a, 'RESULTS_DIR', str(results))
+    monkeypatch.setattr(a, 'SIMILARITY_STATE_DIR', str(results / 'similarity_state'))
+    monkeypatch.setattr(a, 'PREPROCESS_CACHE_PATH', None)
+    return results
+
+
+def comparable(metrics: dict) -> dict:
+    """Project metrics without the fields that describe how they were obtained."""
+    skip = ('analysis_time', 'bytes_read', 'cache_hits', 'cache_misses')
+    return {key: list(value) if key == 'all_code' else value
+            for key, value in metrics.items() if key not in skip}
+
+
+# ---------------------------------------------------------------------------
+# Preprocessing cache
+# ---------------------------------------------------------------------------
+
+def test_cache_hit_matches_fresh_scan(projects, configured):
+    """Projects served from the cache report exactly what a fresh scan reports."""
+    cache_path = str(configured / 'cache.sqlite')
+    fresh = [a.analyze_project(path) for path in projects]
+    first = [a.analyze_project(path, cache_path) for path in projects]
+    second = [a.analyze_project(path, cache_path) for path in projects]
+
+    # Team_D's App.jsx has the same content as Team_A's, so even the first run has a hit
+    assert sum(m['cache_hits'] for m in first) == 1
+    assert sum(m['cache_misses'] for m in second) == 0
+    assert sum(m['bytes_read'] for m in second) == 0
+    for expected, miss, hit in zip(fresh, first, second):
+        assert comparable(miss) == comparable(expected)
+        assert comparable(hit) == comparable(expected)
+
+
+def test_cache_keys_follow_minification_threshold(projects, configured, monkeypatch):
+    """Changing the minification threshold is not answered with cached verdicts."""
+    cache_path = str(configured / 'cache.sqlite')
+    a.analyze_project(projects[0], cache_path)
+    monkeypatch.setattr(a, 'MINIFIED_AVG_LINE_LENGTH', 20)
+    cached = a.analyze_project(projects[0], cache_path)
+    assert comparable(cached) == comparable(a.analyze_project(projects[0]))
+    assert cached['minified_files'] > 1
+
+
+def test_spilled_code_matches_list(projects, configured, monkeypatch):
+    """Spilled projects read back the same code by iteration, index and slice."""
+    expected = a.analyze_project(projects[0])['all_code']
+    monkeypatch.setattr(a, 'SPILL_PREPROCESSED', True)
+    monkeypatch.setattr(a, 'SPILL_DIR', str(configured / 'spill'))
+    spilled = a.analyze_project(projects[0])['all_code']
+    assert isinstance(spilled, a.SpilledCode)
+    assert list(spilled) == expected
+    assert [spilled[i] for i in range(-len(expected), len(expected))] == expected * 2
+    assert spilled[1:] == expected[1:] and spilled[::-1] == expected[::-1]
+
+
+# ---------------------------------------------------------------------------
+# Minification check
+# ---------------------------------------------------------------------------
+
+def random_source(rng, line_length: int, lines: int) -> bytes:
+    """ASCII source with line lengths scattered around line_length."""
+    lengths = rng.integers(0, 2 * line_length + 1, size=lines)
+    return '\n'.join('x' * int(n) for n in lengths).encode('ascii')
+
+
+def test_sniff_minified_agrees_with_is_minified(tmp_path, monkeypatch):
+    """The streaming check gives the whole-buffer verdict for files inside its window."""
+    monkeypatch.setattr(a, 'READ_CHUNK_BYTES', 256)
+    monkeypatch.setattr(a, 'MINIFIED_SNIFF_BYTES', 1 << 30)
+    rng = np.random.default_rng(0)
+    path = tmp_path / 'sample.js'
+    verdicts = set()
+    for _ in range(300):
+        line_length = int(rng.choice([50, 400, 500, 600, 3000]))
+        data = random_source(rng, line_length, int(rng.integers(1, 60)))
+        path.write_bytes(data)
+        with open(path, 'rb') as f:
+            minified, chunks = a.sniff_minified(f, len(data))
+        expected = a.is_minified(data.decode('ascii'))
+        assert minified == expected
+        assert data.startswith(b''.join(chunks))
+        verdicts.add(expected)
+    assert verdicts == {True, False}
+
+
+def test_late_minified_file_is_counted(tmp_path, monkeypatch):
+    """A file whose head looks normal but whose whole buffer is minified is counted."""
+    monkeypatch.setattr(a, 'MINIFIED_SNIFF_BYTES', 1024)
+    path = tmp_path / 'late.js'
+    path.write_text('var a = 1;\n' * 200 + 'x' * 200000 + '\n')
+    with open(path, 'rb') as f:
+        assert not a.sniff_minified(f, os.path.getsize(path))[0]
+    scan = a.scan_file(str(path), '.js')
+    assert scan['minified'] and scan['preprocessed'] == ''
+    assert scan['loc'] == 201 and scan['routes'] == []
+
+
+# ---------------------------------------------------------------------------
+# Path rules
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize('rules, rel_path, is_dir, expected', [
+    (['node_modules/'], 'node_modules', True, True),
+    (['node_modules/'], 'frontend/node_modules', True, True),
+    (['node_modules/'], 'node_modules', False, False),
+    (['*.min.js'], 'public/js/app.min.js', False, True),
+    (['*.min.js'], 'public/js/app.js', False, False),
+    (['dist/', '!dist/'], 'dist', True, False),
+    (['*.js', '!keep.js'], 'src/keep.js', False, False),
+    (['!keep.js', '*.js'], 'src/keep.js', False, True),
+    (['src/gen/'], 'src/gen', True, True),
+    (['src/gen/'], 'app/src/gen', True, False),
+    (['/build'], 'build', True, True),
+    (['/build'], 'app/build', True, False),
+    (['docs/**/*.md'], 'docs/a/b/c.md', False, True),
+    (['docs/**/*.md'], 'docs/c.md', False, True),
+    (['docs/*.md'], 'docs/a/c.md', False, False),
+    (['file?.js'], 'file1.js', False, True),
+    (['file?.js'], 'file10.js', False, False),
+    (['[ab].css'], 'b.css', False, True),
+    (['[!ab].css'], 'b.css', False, False),
+    (['# comment', '', '.*/'], '.git', True, True),
+])
+def test_path_rules(rules, rel_path, is_dir, expected):
+    """Gitignore semantics: last match wins, '!' re-includes, '/' anchors and restricts."""
+    assert a.PathRules(rules).excluded(rel_path, is_dir) is expected
+
+
+def test_walk_project_prunes_and_caps(projects, monkeypatch):
+    """Excluded folders are never entered and files above the size cap are skipped."""
+    monkeypatch.setattr(a, 'PROJECT_PATH_RULES', {'Team_A': {'max_file_bytes': 300}})
+    skipped = {}
+    walked = [os.path.relpath(path, projects[0]).replace(os.sep, '/')
+              for _, _, files in a.walk_project(projects[0], a.project_path_rules('Team_A'),
+                                                skipped=skipped)
+              for path, _ in files]
+    assert sorted(walked) == ['frontend/src/App.jsx']
+    assert skipped['dirs'] == 1
+    assert skipped['files'] == 2
+
+
+# ---------------------------------------------------------------------------
+# Incremental similarity
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize('metric, transform, pairwise, compute', [
+    ('token', a.minhash_vectors, a.minhash_similarity, a.compute_token_similarity),
+    ('route', a.route_vectors, a.jaccard_similarity, a.compute_route_similarity),
+])
+def test_incremental_update_matches_full(projects, configured, capsys, metric, transform,
+                                         pairwise, compute):
+    """Updating one changed project gives the matrix a full recompute gives."""
+    project_metrics = [a.analyze_project(path) for path in projects]
+    a.update_similarity_incrementally(metric, project_metrics, transform, pairwise=pairwise)
+
+    changed = dict(project_metrics[1])
+    changed['all_code'] = changed['all_code'] + ["router.put('/api/items/:id', update);"]
+    changed['api_routes'] = sorted(changed['api_routes'] + ['PUT /api/items/:'])
+    project_metrics[1] = changed
+    capsys.readouterr()
+    updated = a.update_similarity_incrementally(metric, project_metrics, transform, pairwise=pairwise)
+
+    assert '1 of 4 projects recomputed' in capsys.readouterr().out
+    np.testing.assert_allclose(updated, compute(project_metrics), atol=1e-12)
+
+
+def test_incremental_update_refits_on_new_settings(projects, configured, capsys):
+    """A state saved with other settings is refit instead of reused."""
+    project_metrics = [a.analyze_project(path) for path in projects]
+    a.update_similarity_incrementally('route', project_metrics, a.route_vectors,
+                                      pairwise=a.jaccard_similarity, settings={'v': 1})
+    capsys.readouterr()
+    a.update_similarity_incrementally('route', project_metrics, a.route_vectors,
+                                      pairwise=a.jaccard_similarity, settings={'v': 2})
+    assert 'built with other settings' in capsys.readouterr().out
+
+
+# ---------------------------------------------------------------------------
+# Extreme pairs
+# ---------------------------------------------------------------------------
+
+def pair_list(frame) -> list:
+    return [(int(i), int(j), value) for i, j, value in
+            frame[['Project 1', 'Project 2', 'Similarity']].itertuples(index=False)]
+
+
+@pytest.mark.parametrize('block_cells', [1, 37, 4 * 1024 * 1024])
+def test_extreme_pairs_matches_dataframe(configured, block_cells):
+    """Blocked extraction (dense, memory-mapped and condensed) equals the full DataFrame sort."""
+    rng = np.random.default_rng(7)
+    matrix = rng.random((40, 40))
+    matrix = (matrix + matrix.T) / 2
+    reference_top, reference_bottom = a._extreme_pairs_dataframe(matrix, 5)
+    expected = (pair_list(reference_top), pair_list(reference_bottom)[::-1])
+
+    path = str(configured / 'matrix.npy')
+    np.save(path, matrix)
+    a.save_similarity_matrix(matrix, [str(i) for i in range(40)], 'pairs',
+                             formats=('condensed',), dtype='float64')
+    for source in (matrix, np.load(path, mmap_mode='r'), a.load_similarity_matrix('pairs')):
+        top, bottom = a.extreme_pairs(source, 5, block_cells=block_cells)
+        assert ([(i, j, float(v)) for i, j, v in top],
+                [(i, j, float(v)) for i, j, v in bottom]) == expected